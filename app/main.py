@@ -1,14 +1,31 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.routers.file_upload import router as file_upload
 from app.routers.transactions import router as transactions
 from app.routers.financial_institutions import router as financial_institutions
 from app.routers.lifestyle import router as lifestyle
 from app.routers.utility import router as utility
 from app.routers.credit_score import router as credit_score
+from app.routers.helpers import extraction_helper
+from app.routers.helpers.serializer_helper import FastJSONResponse
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # warm up the extraction engines (JVM boot included) without blocking the event loop,
+    # /health reports not-ready until this finishes
+    loop = asyncio.get_running_loop()
+    warmup = loop.run_in_executor(None, extraction_helper.warm_up_engines)
+    yield
+    await warmup
+    extraction_helper.shutdown_process_pool()
+
+
+# responses are written with orjson, numpy values included
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Explicitly allow only your frontend URLs
 origins = [
@@ -42,3 +59,15 @@ app.include_router(credit_score)
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
+
+
+@app.get("/health")
+def health():
+    if not extraction_helper.is_ready():
+        return JSONResponse(status_code=503, content={"status": "starting"})
+
+    return {
+        "status": "ok",
+        "default_engine": extraction_helper.DEFAULT_ENGINE,
+        "tabula_available": extraction_helper.tabula_available
+    }
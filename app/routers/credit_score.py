@@ -1,9 +1,8 @@
 from fastapi import FastAPI, APIRouter, HTTPException
 from typing import Annotated
 import pandas as pd
-from . import file_upload
 import re
-from .state import shared_state
+from .helpers.dataset_helper import dataset_store
 import numpy as np
 from .helpers import credit_score_helper
 import logging
@@ -16,8 +15,6 @@ router = APIRouter(
     tags=['Credit Score Module']
 )
 
-data = shared_state.mpesa_statement_df
-
 # Add OPTIONS handler for CORS preflight requests
 @router.options("/get_credit_score")
 async def options_get_credit_score():
@@ -31,24 +28,26 @@ async def options_get_credit_score():
         }
     )
 
+def credit_score_report(data):
+    credit_score = credit_score_helper.calculate_mpesa_fico_score(data)
+
+    credit_score_status = credit_score_helper.credit_score_status(credit_score)
+
+    return {
+                "credit_score": credit_score,
+                "credit_score_status": credit_score_status
+            }
+
 @router.get("/get_credit_score")
-def get_credit_score():
+def get_credit_score(dataset_id: str):
     try:
-        data = shared_state.mpesa_statement_df
+        data = dataset_store.get(dataset_id)
 
         if data is None or data.empty:
             return {"message": "No transaction data available. Please upload a PDF statement first."}
 
-        data["save/spend"] = data.apply(credit_score_helper.save_or_spend, axis=1)
-
-        credit_score = credit_score_helper.calculate_mpesa_fico_score(data)
-
-        credit_score_status = credit_score_helper.credit_score_status(credit_score)
-
-        return {
-                    "credit_score": credit_score,
-                    "credit_score_status": credit_score_status
-                }
+        # a statement's score never changes, it is computed once per snapshot
+        return dataset_store.derived(data, "credit_score", credit_score_report)
     
     except Exception as e:
         print(f"Error in get_credit_score: {e}")
@@ -1,18 +1,21 @@
-from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException, Form, BackgroundTasks
+from fastapi import APIRouter, UploadFile, HTTPException, Form
 from typing import Annotated
-import PyPDF2 as py
-import io
-import tabula
 import pandas as pd
-from .state import shared_state
-from .helpers import get_name_helper
+from .helpers import get_name_helper, extraction_helper, schema_helper
+from .helpers.enrichment_helper import enrichment_stage
+from .helpers.cache_helper import parse_cache, page_cache, parse_cache_key
+from .helpers.pdf_helper import StatementDocument
+from .helpers.scheduler_helper import upload_scheduler, Job, JobCancelled, QueueFull
+from .helpers.task_store_helper import task_store
+from .helpers.dataset_helper import dataset_store
+from .helpers.export_helper import EXPORT_FORMATS, export_chunks
+from .helpers.serializer_helper import FastJSONResponse, check_listing, dumps, frame_content, frame_page, ndjson_response
+from functools import partial
 import uuid
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import asyncio
-from starlette.background import BackgroundTask
+import time
 import concurrent.futures
-import re
 
 router = APIRouter(
     #router tags
@@ -43,8 +46,8 @@ async def options_upload_file():
         }
     )
 
-@router.options("/status/{task_id}")
-async def options_status(task_id: str):
+@router.options("/status/{task_id}/stream")
+async def options_status_stream(task_id: str):
     return JSONResponse(
         content={"message": "OK"},
         headers={
@@ -55,106 +58,124 @@ async def options_status(task_id: str):
         }
     )
 
-# convert to a df
-def dict_to_dataframe(data: dict) -> pd.DataFrame:
-    if data is None:
-        return {"message": "No data available"}
-    try:
-        dataframe = pd.DataFrame(data["dataframe"])
-        return dataframe
-    except KeyError:
-        raise ValueError("The provided dictionary does not contain the key 'dataframe'")
+@router.options("/{dataset_id}/export")
+async def options_export(dataset_id: str):
+    return JSONResponse(
+        content={"message": "OK"},
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, OPTIONS",
+            "Access-Control-Allow-Headers": "Content-Type",
+            "Access-Control-Max-Age": "3600",
+        }
+    )
+
+@router.options("/status/{task_id}")
+async def options_status(task_id: str):
+    return JSONResponse(
+        content={"message": "OK"},
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, DELETE, OPTIONS",
+            "Access-Control-Allow-Headers": "Content-Type",
+            "Access-Control-Max-Age": "3600",
+        }
+    )
 
-mpesa_statement_dictionary = None
-mpesa_statement_dataframe = dict_to_dataframe(mpesa_statement_dictionary)
+# Task status and results live in the shared task store, so any worker can answer a poll.
+# Queue positions are only known to the worker holding the queue, it publishes them there.
+upload_scheduler.on_queue_change = task_store.set_queue_positions
 
-# Task status storage
-task_status = {}
+# Thread pool for CPU-intensive operations, one thread per job the scheduler may run at once
+thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=upload_scheduler.max_concurrent)
 
-# Thread pool for CPU-intensive operations
-thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+# share of the progress bar covered by the two long stages: page extraction and categorization
+EXTRACTION_PROGRESS_START, EXTRACTION_PROGRESS_END = 10, 70
+CATEGORIZATION_PROGRESS_START, CATEGORIZATION_PROGRESS_END = 80, 92
 
-# Cache for category mapping to avoid recreating it
-CATEGORY_MAPPING_CACHE = None
+# how often the status stream checks for changes, and how long it stays quiet before a keep-alive
+STREAM_POLL_SECONDS = 0.25
+STREAM_KEEPALIVE_SECONDS = 15
 
 @router.get("/")
 def read_root():
     return {"Testing Setup": "File Upload Logic"}
 
-def process_pdf_sync(pdf_content: bytes, password: str, progress_callback=None):
-    """Synchronous version of process_pdf for thread pool execution"""
-    try:
-        pdf_file = io.BytesIO(pdf_content)
-        pdf_reader = py.PdfReader(pdf_file)
+def publish_statement(dataset_id: str, mpesa_df: pd.DataFrame):
+    """Make a cleaned statement available to the analysis modules under its dataset id"""
+    dataset_store.put(dataset_id, mpesa_df)
 
-        if pdf_reader.is_encrypted:
-            if not pdf_reader.decrypt(password):
-                raise HTTPException(status_code=401, detail="Incorrect PDF password. Please check your password and try again.")
+def statement_result(dataset_id: str, client_details: dict, mpesa_df: pd.DataFrame, format: str = "records") -> dict:
+    """Build the result reported with a completed task, the statement as records or columns"""
+    # column arrays go to the encoder as they are, without building a dict per cell
+    dataframe_dict = frame_content(mpesa_df, format)
+    
+    return {
+        "dataset_id": dataset_id,
+        "client_name": client_details['customer_name'] or "Not Found",
+        "mobile_number": client_details['mobile_number'] or "Not Found",
+        "email": client_details['email'],
+        "statement_period": client_details['statement_period'],
+        "request_date": client_details['request_date'],
+        "summary": client_details['summary'],
+        "dataframe": dataframe_dict
+    }
 
-        # Create a properly decrypted PDF for both operations
-        decrypted_pdf = io.BytesIO()
-        pdf_writer = py.PdfWriter()
+def process_pdf_sync(pdf_content: bytes, password: str, progress_callback=None, engine: str | None = None, cache_key: str | None = None, dataset_id: str | None = None) -> tuple[dict, pd.DataFrame]:
+    """Synchronous version of process_pdf for thread pool execution, returns the header and the cleaned statement"""
+    try:
+        # Decrypt once: the same open document feeds both the header parser and the table extractor
+        with StatementDocument(pdf_content, password) as document:
+            if progress_callback:
+                progress_callback(5, f"Decrypted statement, {document.page_count} pages")
 
-        for page_num in range(len(pdf_reader.pages)):
-            pdf_writer.add_page(pdf_reader.pages[page_num])
+            # header fields and the summary table, read from the first page only
+            client_details = get_name_helper.extract_statement_header(document)
+            if progress_callback:
+                progress_callback(EXTRACTION_PROGRESS_START, "Read client information")
 
-        pdf_writer.write(decrypted_pdf)
-        decrypted_pdf.seek(0)
+            # pages extracted out of the total drive the bar through the extraction stage
+            def pages_extracted(done, total):
+                if progress_callback:
+                    span = EXTRACTION_PROGRESS_END - EXTRACTION_PROGRESS_START
+                    progress_callback(EXTRACTION_PROGRESS_START + span * done // max(total, 1), f"Extracted {done} of {total} pages")
 
-        client_details = get_name_helper.extract_client_name(decrypted_pdf)
-        if progress_callback:
-            progress_callback(30, "Extracting client information...")
-            
-        # Original simple tabula extraction that was working
-        dfs = tabula.read_pdf(decrypted_pdf, pages='all')
+            # Table extraction with the requested engine ("native" word layer or "tabula")
+            dfs = extraction_helper.extract_tables(document, engine, pages_extracted)
         
         if not dfs:
             raise HTTPException(status_code=400, detail="No tables found in PDF")
-
-        if progress_callback:
-            progress_callback(40, "Parsing transaction tables...")
             
         mpesa_df = pd.concat(dfs, axis=0, ignore_index=True)
         
         mpesa_df = mpesa_df[mpesa_df['Transaction Status'] == 'Completed']
         
         if progress_callback:
-            progress_callback(50, "Filtering completed transactions...")
-
-        # Highly optimized column processing - batch operations
-        if progress_callback:
-            progress_callback(55, "Optimizing data types...")
-        
-        # Convert all columns at once for better performance
-        string_columns = ["Paid In", "Withdrawn", "Balance", "Details"]
-        numeric_columns = ["Paid In", "Withdrawn", "Balance"]
+            progress_callback(72, f"Cleaning {len(mpesa_df)} completed transactions...")
         
-        # Batch string conversion
-        for col in string_columns:
-            if col in mpesa_df.columns:
-                mpesa_df[col] = mpesa_df[col].astype('string')  # Use pandas string dtype for better performance
+        if 'Details' in mpesa_df.columns:
+            mpesa_df['Details'] = mpesa_df['Details'].astype('string')  # Use pandas string dtype for better performance
         
-        # Batch numeric conversion with optimized operations
-        for col in numeric_columns:
+        # Money is parsed straight into integer cents
+        for col in schema_helper.MONEY_COLUMNS:
             if col in mpesa_df.columns:
-                # Use vectorized operations for better performance
-                mpesa_df[col] = pd.to_numeric(
-                    mpesa_df[col].str.replace(',', '', regex=False), 
-                    errors='coerce'
-                ).fillna(0)
+                mpesa_df[col] = schema_helper.parse_cents(mpesa_df[col])
         
         # Clean Details column
         if 'Details' in mpesa_df.columns:
             mpesa_df['Details'] = mpesa_df['Details'].str.replace('\r', ' ', regex=False)
 
-        if progress_callback:
-            progress_callback(60, "Cleaning and formatting data...")
+        # Parsed once with the statement's own format, and kept as datetime64 from here on
+        mpesa_df['Completion Time'] = schema_helper.parse_completion_time(mpesa_df['Completion Time'])
+
+        # a row without a valid completion time cannot be placed in time (nor serialized)
+        mpesa_df = mpesa_df.dropna(subset=['Completion Time'])
 
-        # Optimized datetime conversion
-        mpesa_df['Completion Time'] = pd.to_datetime(mpesa_df['Completion Time'], errors='coerce')
+        # oldest transaction first, so time ranges are contiguous slices of the statement
+        mpesa_df = mpesa_df.sort_values('Completion Time', kind='stable')
 
         if progress_callback:
-            progress_callback(65, "Processing datetime fields...")
+            progress_callback(75, "Converted amounts and dates")
 
         # Optimized column dropping - vectorized approach
         missing_threshold = len(mpesa_df) * 0.5
@@ -176,9 +197,6 @@ def process_pdf_sync(pdf_content: bytes, password: str, progress_callback=None):
                 mpesa_df[numeric_columns_to_fill].mean()
             )
 
-        if progress_callback:
-            progress_callback(70, "Cleaning missing data...")
-
         # Dropping duplicates
         mpesa_df.drop_duplicates(inplace=True)
         
@@ -189,117 +207,35 @@ def process_pdf_sync(pdf_content: bytes, password: str, progress_callback=None):
         mpesa_df.drop(['Transaction Status'], axis=1, inplace=True)  
 
         if progress_callback:
-            progress_callback(72, "Preparing transaction data...")
+            progress_callback(CATEGORIZATION_PROGRESS_START, f"Cleaned {len(mpesa_df)} rows")
 
         # converting the withdrawn mpesa_df into  an abs value 
         mpesa_df["Withdrawn"] = mpesa_df["Withdrawn"].abs()
 
-        # getting the month from the completion time column
-        mpesa_df['month_name'] = mpesa_df['Completion Time'].dt.month_name()
-        
-        # Getting the day name
-        mpesa_df['day_name'] = mpesa_df['Completion Time'].dt.day_name()
-        # getting the hour the transaction was created
-        mpesa_df['Hour']= mpesa_df['Completion Time'].dt.hour
+        # Every column the modules read is derived here once, see enrichment_helper
+        mpesa_df = enrichment_stage.enrich(mpesa_df)
 
-        if progress_callback:
-            progress_callback(74, "Extracting time-based features...")
-
-        # Use cached category mapping for better performance
-        global CATEGORY_MAPPING_CACHE
-        if CATEGORY_MAPPING_CACHE is None:
-            CATEGORY_MAPPING_CACHE = {
-                'Customer Transfer to': 'Send Money',
-                'Pay Bill Fuliza M-Pesa to' : 'Fuliza Loan',
-                'Customer Transfer Fuliza MPesa': 'Send Money',
-                'Pay Bill Online': 'Pay Bill',
-                'Pay Bill to': 'Pay Bill',
-                'Customer Transfer of Funds Charge': 'Mpesa Charges',
-                'Pay Bill Charge': 'Mpesa Charges',
-                'Merchant Payment Online': 'Till No',
-                'Customer Send Money to Micro': 'Pochi',
-                'M-Shwari Withdraw': 'Mshwari Withdraw',
-                'Business Payment from': 'Bank Transfer',
-                'Airtime Purchase': 'Airtime Purchase',
-                'Airtime Purchase For Other': 'Airtime Purchase',
-                'Recharge for Customer': 'safaricom bundles',
-                'Customer Bundle Purchase with Fuliza': 'safaricom bundles',
-                'Funds received from': 'Received Money',
-                'Merchant Payment': 'Till No',
-                'Customer Withdrawal': 'Cash Withdrawal',
-                'Withdrawal Charge': 'Mpesa Charges',
-                'Pay Merchant Charge': 'Mpesa Charges',
-                'M-Shwari Deposit': 'Mshwari Deposit',
-                'M-Shwari Loan': 'M-Shwari Loan',
-                'M-Shwari Loan Repayment':'M-Shwari Repayment',
-                'Deposit of Funds at Agent': 'Customer Deposit',
-                'OD Loan Repayment to': 'Fuliza Loan Repayment',
-                'OverDraft of Credit Party': 'Fuliza Loan',
-                'Customer Transfer Fuliza M-Pesa to':'Send Money',
-                'Customer Transfer of Funds Charge':'Mpesa Charges',
-                'KCB M-PESA Withdraw': 'KCB M-PESA Withdraw',
-                'KCB M-PESA Deposit': 'KCB M-PESA Deposit',
-                'KCB M-PESA Target Deposit': 'KCB M-PESA Deposit',	
-                'Recharge for Customer With Fuliza': 'Fuliza Airtime',
-                'Promotion Payment':'Received Money',
-                'KCB M-PESA Target First Deposit':'KCB M-PESA Deposit',
-                'Customer Payment to Small Business':'Pochi',
-                'Merchant Customer Payment from': 'Till No',
-                'Reversal':'Reversal',
-                'Merchant Payment Fuliza M-Pesa':'Till No',
-                'Other': 'Other'
-            }
-        
-        mapped_categories = CATEGORY_MAPPING_CACHE
-        
-        # Category mapping
-        mpesa_df['Category'] = 'Other'  # Default value
-        
-        if progress_callback:
-            progress_callback(75, "Starting category mapping...")
-        
-        # Original category mapping that was working
-        for phrase, category in mapped_categories.items():
-            mask = mpesa_df['Details'].str.contains(phrase, case=False, na=False)
-            mpesa_df.loc[mask, 'Category'] = phrase
-
-        if progress_callback:
-            progress_callback(85, "Category mapping completed!")
-
-        # Map 'Category' to user-friendly names in 'Transaction_Type' column
-        mpesa_df['Transaction_Type'] = mpesa_df['Category'].map(mapped_categories)
-
-        mpesa_df.drop(['Category'], axis=1, inplace=True)  
         # Remove rows where 'Transaction_Type' is "Mpesa Charges"
         mpesa_df = mpesa_df.drop(mpesa_df[mpesa_df['Transaction_Type'] == "Mpesa Charges"].index)
-        
-        if progress_callback:
-            progress_callback(87, "Filtering transaction types...")
-        
-        # Convert 'Completion Time' to ISO string for JSON serialization
-        mpesa_df['Completion Time'] = mpesa_df['Completion Time'].dt.strftime('%Y-%m-%dT%H:%M:%S')
-
-        if progress_callback:
-            progress_callback(90, "Preparing final data format...")
-
-        print(mpesa_df)
-
-        shared_state.mpesa_statement_df = mpesa_df
 
-        # Optimize JSON serialization
         if progress_callback:
-            progress_callback(95, "Serializing data...")
-        
-        # Use more efficient serialization
-        dataframe_dict = mpesa_df.to_dict(orient="records")
-        
-        return {
-            "client_name": client_details['customer_name'],
-            "mobile_number": client_details['mobile_number'],
-            "dataframe": dataframe_dict
-        }
-    except HTTPException:
-        # Re-raise HTTP exceptions (like 401 for wrong password)
+            progress_callback(CATEGORIZATION_PROGRESS_END, "Derived columns computed")
+
+        # Fixed statement schema: categoricals, Arrow strings, small ints, numeric money columns
+        mpesa_df = schema_helper.enforce_statement_schema(mpesa_df)
+
+        # Keep the cleaned statement so a re-upload of the same file skips the whole pipeline
+        if cache_key:
+            try:
+                parse_cache.put(cache_key, client_details, mpesa_df)
+            except Exception as e:
+                print(f"Error writing parse cache: {e}")
+
+        if dataset_id:
+            publish_statement(dataset_id, mpesa_df)
+        return client_details, mpesa_df
+    except (HTTPException, JobCancelled):
+        # Re-raise HTTP exceptions (like 401 for wrong password) and cancellations
         raise
     except Exception as e:
         print(f"Error in process_pdf_sync: {str(e)}")
@@ -313,66 +249,51 @@ def process_pdf_sync(pdf_content: bytes, password: str, progress_callback=None):
         
         raise HTTPException(status_code=500, detail=str(e))
 
-async def process_pdf_background(pdf_content: bytes, password: str, task_id: str):
+async def process_pdf_background(pdf_content: bytes, password: str, task_id: str, engine: str | None = None, job: Job | None = None):
     """Background task for processing PDF with detailed progress updates"""
+    def check_cancelled():
+        # cancelled on this worker, or through the task store by another one
+        if job is not None:
+            job.check_cancelled()
+        if task_store.cancel_requested(task_id):
+            raise JobCancelled(f"Task {task_id} was cancelled")
+
     try:
         print(f"Starting background processing for task {task_id}")
-        
-        # Initial setup
-        task_status[task_id]["progress"] = 5
-        task_status[task_id]["status"] = "processing"
-        task_status[task_id]["message"] = "Initializing PDF processing..."
-        await asyncio.sleep(0.1)
-        
-        # PDF decryption and reading
-        task_status[task_id]["progress"] = 15
-        task_status[task_id]["message"] = "Decrypting PDF and extracting content..."
-        await asyncio.sleep(0.1)
-        
-        # Extract tables
-        task_status[task_id]["progress"] = 25
-        task_status[task_id]["message"] = "Extracting transaction tables from PDF..."
-        await asyncio.sleep(0.1)
-        
-        # Data cleaning and processing
-        task_status[task_id]["progress"] = 40
-        task_status[task_id]["message"] = "Processing transaction data..."
-        await asyncio.sleep(0.1)
-        
-        # Category mapping
-        task_status[task_id]["progress"] = 60
-        task_status[task_id]["message"] = "Categorizing transactions..."
-        await asyncio.sleep(0.1)
-        
-        # Final processing
-        task_status[task_id]["progress"] = 80
-        task_status[task_id]["message"] = "Finalizing data processing..."
-        await asyncio.sleep(0.1)
-        
+        check_cancelled()
+
+        # A statement we have already parsed is served straight from the cache, no thread pool involved
+        cache_key = parse_cache_key(pdf_content, password, engine or extraction_helper.DEFAULT_ENGINE)
+        cached = parse_cache.get(cache_key)
+        if cached is not None:
+            client_details, mpesa_df = cached
+            publish_statement(task_id, mpesa_df)
+            task_store.complete(task_id, client_details, mpesa_df, "Processing completed successfully!")
+            print(f"Served task {task_id} from the parse cache")
+            return
+        
+        task_store.update(task_id, status="processing", progress=0, message="Decrypting PDF...")
         print(f"Processing PDF for task {task_id}")
         
-        # Create a progress callback function
+        # Create a progress callback function, it is also where a cancelled job stops
         def update_progress(progress_value, message=None):
-            task_status[task_id]["progress"] = progress_value
+            check_cancelled()
             if message:
-                task_status[task_id]["message"] = message
+                task_store.update(task_id, progress=progress_value, message=message)
+            else:
+                task_store.update(task_id, progress=progress_value)
         
         # Run the heavy PDF processing in a thread pool to avoid blocking the server
         loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(thread_pool, process_pdf_sync, pdf_content, password, update_progress)
-        
-        # Final steps
-        task_status[task_id]["progress"] = 95
-        task_status[task_id]["message"] = "Almost done! Finalizing results..."
-        await asyncio.sleep(0.1)
-        
-        task_status[task_id] = {
-            "status": "completed",
-            "progress": 100,
-            "message": "Processing completed successfully!",
-            "result": result
-        }
+        client_details, mpesa_df = await loop.run_in_executor(thread_pool, process_pdf_sync, pdf_content, password, update_progress, engine, cache_key, task_id)
+
+        task_store.update(task_id, progress=95, message="Storing results...")
+        task_store.complete(task_id, client_details, mpesa_df, "Processing completed successfully!")
         print(f"Background processing completed for task {task_id}")
+
+    except JobCancelled:
+        print(f"Background processing cancelled for task {task_id}")
+        task_store.update(task_id, status="cancelled", message="Processing cancelled", queue_position=None)
         
     except Exception as e:
         print(f"Error in background processing for task {task_id}: {str(e)}")
@@ -383,67 +304,237 @@ async def process_pdf_background(pdf_content: bytes, password: str, task_id: str
         # Check if it's a password-related error
         error_message = str(e)
         if "401" in error_message or "PDFPasswordIncorrect" in error_message or "Incorrect PDF password" in error_message:
-            task_status[task_id] = {
-                "status": "failed",
-                "progress": 100,
-                "message": "Incorrect PDF password. Please check your password and try again.",
-                "error": "Incorrect PDF password"
-            }
+            task_store.update(
+                task_id,
+                status="failed",
+                progress=100,
+                message="Incorrect PDF password. Please check your password and try again.",
+                error="Incorrect PDF password",
+                queue_position=None
+            )
         else:
-            task_status[task_id] = {
-                "status": "failed",
-                "progress": 100,
-                "message": f"Processing failed: {str(e)}",
-                "error": str(e)
-            }
+            task_store.update(
+                task_id,
+                status="failed",
+                progress=100,
+                message=f"Processing failed: {str(e)}",
+                error=str(e),
+                queue_position=None
+            )
 
-@router.get("/status/{task_id}")
-async def get_task_status(task_id: str):
-    """Get the status of a background processing task"""
-    if task_id not in task_status:
+@router.get("/cache/stats")
+def parse_cache_stats():
+    """Hit/miss counters (per worker) and size of the statement, page and dataset caches"""
+    return {
+        "parse_cache": parse_cache.stats(),
+        "page_cache": page_cache.stats(),
+        "dataset_store": dataset_store.stats(),
+        "task_store": task_store.stats(),
+        "enrichment": enrichment_stage.stats()
+    }
+
+@router.get("/{dataset_id}/export")
+def export_dataset(dataset_id: str, format: str = "arrow"):
+    """Download a cleaned statement as an Arrow IPC stream, Parquet or CSV, money in cents"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid export format, expected one of {list(EXPORT_FORMATS)}")
+
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type",
+    }
+
+    snapshot = dataset_store.snapshot(dataset_id)
+    if snapshot is None:
+        return JSONResponse(status_code=404, content={"detail": "Dataset not found"}, headers=headers)
+
+    # Parquet is the format snapshots are stored in, their file is sent as it is
+    stored_file = dataset_store.stored_file(snapshot) if format == "parquet" else None
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        export_chunks(snapshot.frame, format, stored_file),
+        media_type=media_type,
+        headers={**headers, "Content-Disposition": f'attachment; filename="{dataset_id}.{extension}"'}
+    )
+
+def current_status(task_id: str, format: str = "records", limit: int | None = None, cursor: int | None = None) -> tuple[dict, dict]:
+    """Status of a processing task as reported to clients, and the headers pointing to the next page of its rows"""
+    status = task_store.get(task_id)
+    if status is None:
         # Return a default processing status instead of 404
         # This handles race conditions where client polls before task is initialized
-        return JSONResponse(
-            content={
-                "status": "processing",
-                "progress": 0,
-                "message": "Task is being initialized"
-            },
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type",
-            }
-        )
-    
-    return JSONResponse(
-        content=task_status[task_id],
+        return {
+            "status": "processing",
+            "progress": 0,
+            "message": "Task is being initialized"
+        }, {}
+
+    headers = {}
+    if status["status"] == "completed":
+        result = task_store.result(task_id)
+        if result is not None:
+            client_details, mpesa_df = result
+            # one page of the rows, all of them without a limit
+            rows, headers = frame_page(mpesa_df, limit, cursor)
+            status["result"] = statement_result(task_id, client_details, rows, format=format)
+
+    return status, headers
+
+@router.get("/status/{task_id}")
+async def get_task_status(task_id: str, format: str = "records", limit: int | None = None, cursor: int | None = None):
+    """Get the status of a background processing task.
+
+    ?format=columns returns the statement as column arrays, ?format=ndjson streams its rows once
+    the task has completed, and ?limit=&cursor= pages through them.
+    """
+    check_listing(format, limit)
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, DELETE, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type",
+    }
+
+    result = task_store.result(task_id) if format == "ndjson" else None
+    if result is not None:
+        rows, page_headers = frame_page(result[1], limit, cursor)
+        return ndjson_response(rows, {**headers, **page_headers})
+
+    status, page_headers = current_status(task_id, format, limit, cursor)
+    return FastJSONResponse(content=status, headers={**headers, **page_headers})
+
+@router.get("/status/{task_id}/stream")
+async def stream_task_status(task_id: str):
+    """Push status changes of a processing task as Server-Sent Events until it finishes"""
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type",
+    }
+    if task_store.get(task_id) is None:
+        return JSONResponse(status_code=404, content={"detail": "Task not found"}, headers=headers)
+
+    async def events():
+        last_event = None
+        quiet_since = time.monotonic()
+        while True:
+            if task_store.get(task_id) is None:
+                # expired or deleted while streaming, it will never finish
+                yield f"event: not_found\ndata: {dumps({'status': 'not_found', 'message': 'Task not found'}).decode()}\n\n"
+                return
+            status, _ = current_status(task_id)
+            event = f"event: {status['status']}\ndata: {dumps(status).decode()}\n\n"
+            if event != last_event:
+                yield event
+                last_event = event
+                quiet_since = time.monotonic()
+            elif time.monotonic() - quiet_since >= STREAM_KEEPALIVE_SECONDS:
+                # a comment line keeps proxies from closing an idle stream while the job waits in the queue
+                yield ": keep-alive\n\n"
+                quiet_since = time.monotonic()
+
+            if status["status"] != "processing":
+                return
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
         headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type",
+            **headers,
+            "Cache-Control": "no-cache",
+            # stop nginx from buffering the stream
+            "X-Accel-Buffering": "no",
         }
     )
 
+@router.delete("/status/{task_id}")
+async def cancel_task(task_id: str):
+    """Cancel a queued or running processing task"""
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, DELETE, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type",
+    }
+
+    job = upload_scheduler.cancel(task_id)
+    if job is None:
+        status = task_store.get(task_id)
+        if status is None:
+            return JSONResponse(status_code=404, content={"detail": "Task not found"}, headers=headers)
+        if not task_store.request_cancel(task_id):
+            return JSONResponse(status_code=409, content={"detail": f"Task is already {status['status']}"}, headers=headers)
+        # queued or running on another worker, which stops it at its next check
+        message = "Cancellation requested, the task stops at its next processing step"
+    elif job.task is None:
+        # never started, nothing else will update its status
+        task_store.update(task_id, status="cancelled", progress=0, message="Processing cancelled", queue_position=None)
+        message = "Queued task cancelled"
+    else:
+        message = "Cancellation requested, the task stops at its next processing step"
+
+    return JSONResponse(content={"task_id": task_id, "message": message}, headers=headers)
+
 @router.post("/uploadfileandclean")
 @router.post("/uploadfileandclean/")
-async def upload_file(file: UploadFile, password: Annotated[str, Form()], background_tasks: BackgroundTasks):
+async def upload_file(
+    file: UploadFile,
+    password: Annotated[str, Form()],
+    engine: Annotated[str | None, Form()] = None,
+):
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Invalid file type, only PDFs are accepted")
+
+    if engine is not None and engine not in extraction_helper.EXTRACTION_ENGINES:
+        raise HTTPException(status_code=400, detail=f"Invalid extraction engine, expected one of {sorted(extraction_helper.EXTRACTION_ENGINES)}")
     
+    cors_headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "POST, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type",
+    }
+
+    if not extraction_helper.engine_ready.is_set():
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Worker is still starting up, please retry shortly"},
+            headers={**cors_headers, "Retry-After": "5"}
+        )
+
+    if not extraction_helper.is_ready(engine):
+        # the requested engine failed to start on this worker, the job would only fail later
+        return JSONResponse(
+            status_code=503,
+            content={"detail": f"Extraction engine '{engine or extraction_helper.DEFAULT_ENGINE}' is unavailable, please retry with another engine"},
+            headers=cors_headers
+        )
+
     try:
         pdf_content = await file.read()
         
-        # Start processing in background
+        # Queue the processing job, small statements get the fast lane
         task_id = str(uuid.uuid4())
-        task_status[task_id] = {"status": "processing", "progress": 0}
-        background_tasks.add_task(process_pdf_background, pdf_content, password, task_id)
+        lane = upload_scheduler.lane_for(len(pdf_content))
+        job = Job(task_id, lane, partial(process_pdf_background, pdf_content, password, task_id, engine))
+        task_store.create(task_id, "processing", "Waiting in queue", lane)
+        try:
+            upload_scheduler.submit(job)
+        except QueueFull as e:
+            task_store.delete(task_id)
+            return JSONResponse(
+                status_code=429,
+                content={"detail": str(e)},
+                headers={**cors_headers, "Retry-After": str(e.retry_after)}
+            )
         
         response_data = {
             "message": "File upload accepted, processing started",
             "task_id": task_id,
+            # the analysis endpoints take this as ?dataset_id= once the task has completed
+            "dataset_id": task_id,
             "filename": file.filename,
-            "status": "processing"
+            "status": "processing",
+            "queue_position": upload_scheduler.position(task_id)
         }
         
         print(f"Returning response: {response_data}")  # Debug log
@@ -1,7 +1,11 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query
 from typing import Annotated
 import pandas as pd
-from .state import shared_state
+from .helpers.dataset_helper import dataset_store
+from .helpers.financial_institutions_helper import bank_report
+from .helpers.schema_helper import to_iso, to_kes
+from .helpers.summary_helper import summarize
+from .helpers.serializer_helper import FastJSONResponse, check_listing, frame_content, frame_page, ndjson_response
 from fastapi.responses import Response, JSONResponse
 
 router = APIRouter(
@@ -11,120 +15,16 @@ router = APIRouter(
     tags=['Financial Institutions Module']
 )
 
-data = shared_state.mpesa_statement_df
-
-banks_in_kenya = [
-    "Kenya Commercial Bank", "KCB", "KCB Bank",
-    "Equity Bank Kenya", "Equity Bank", "Equity",
-    "Cooperative Bank of Kenya", "Co-op Bank", "Coop Bank",
-    "Absa Bank Kenya", "Absa", 
-    "Standard Chartered Bank Kenya", "Standard Chartered", "StanChart",
-    "NCBA Bank Kenya", "NCBA", 
-    "Diamond Trust Bank Kenya", "Diamond Trust Bank", "DTB",
-    "I&M Bank Kenya", "I&M Bank", "I&M",
-    "Stanbic Bank Kenya", "Stanbic",
-    "Family Bank Kenya", "Family Bank", 
-    "National Bank of Kenya", "National Bank", "NBK",
-    "Bank of Africa Kenya", "Bank of Africa", "BOA",
-    "CitiBank Kenya", "CitiBank", "Citi",
-    "Housing Finance Group Kenya", "HF Group", "HF",
-    "Prime Bank Kenya", "Prime Bank",
-    "Spire Bank Kenya", "Spire Bank",
-    "Gulf African Bank", "Gulf Bank", 
-    "Credit Bank Kenya", "Credit Bank",
-    "First Community Bank", "FCB",
-    "Victoria Commercial Bank", "Victoria Bank",
-    "Consolidated Bank of Kenya", "Consolidated Bank",
-    "SBM Bank Kenya", "SBM",
-    "Ecobank Kenya", "Ecobank",
-    "Guaranty Trust Bank Kenya", "GT Bank", "GTB",
-    "Sidian Bank Kenya", "Sidian Bank",
-    "Mayfair CIB Bank Kenya", "Mayfair Bank",
-    "UBA Kenya Bank", "United Bank for Africa", "UBA",
-    "ABC Bank Kenya", "ABC Bank",
-    "Transnational Bank Kenya", "Transnational Bank"
-]
-
-banks_in_kenya_grouped = {
-    "Kenya Commercial Bank": "KCB",
-    "KCB": "KCB", 
-    "KCB Bank": "KCB",
-    "Equity Bank Kenya": "Equity", 
-    "Equity Bank": "Equity", 
-    "Equity": "Equity",
-    "Cooperative Bank of Kenya": "Co-op Bank", 
-    "Co-op Bank":  "Co-op Bank", 
-    "Coop Bank":  "Co-op Bank",
-    "Absa Bank Kenya":  "Absa", 
-    "Absa":  "Absa", 
-    "Standard Chartered Bank Kenya": "StanChart", 
-    "Standard Chartered": "StanChart", 
-    "StanChart": "StanChart",
-    "NCBA Bank Kenya":   "NCBA", 
-    "NCBA":   "NCBA", 
-    "Diamond Trust Bank Kenya": "DTB", 
-    "Diamond Trust Bank": "DTB", 
-    "DTB": "DTB",
-    "I&M Bank Kenya":  "I&M", 
-    "I&M Bank":  "I&M", 
-    "I&M":  "I&M",
-    "Stanbic Bank Kenya": "Stanbic", 
-    "Stanbic": "Stanbic",
-    "Family Bank Kenya": "Family Bank", 
-    "Family Bank": "Family Bank", 
-    "National Bank of Kenya":  "National Bank", 
-    "National Bank":  "National Bank", 
-    "NBK":  "National Bank",
-    "Bank of Africa Kenya": "Bank of Africa", 
-    "Bank of Africa": "Bank of Africa", 
-    "BOA": "Bank of Africa",
-    "CitiBank Kenya": "CitiBank", 
-    "CitiBank": "CitiBank", 
-    "Citi": "CitiBank",
-    "Housing Finance Group Kenya": "HF Group", 
-    "HF Group": "HF Group", 
-    "HF": "HF Group",
-    "Prime Bank Kenya":  "Prime Bank", 
-    "Prime Bank":  "Prime Bank",
-    "Spire Bank Kenya": "Spire Bank", 
-    "Spire Bank": "Spire Bank",
-    "Gulf African Bank":  "Gulf Bank", 
-    "Gulf Bank":  "Gulf Bank", 
-    "Credit Bank Kenya":  "Credit Bank", 
-    "Credit Bank":  "Credit Bank",
-    "First Community Bank":   "First Community Bank", 
-    "FCB":   "First Community Bank",
-    "Victoria Commercial Bank": "Victoria Bank", 
-    "Victoria Bank": "Victoria Bank",
-    "Consolidated Bank of Kenya": "Consolidated Bank", 
-    "Consolidated Bank": "Consolidated Bank",
-    "SBM Bank Kenya": "SBM Bank Kenya", 
-    "SBM": "SBM Bank Kenya",
-    "Ecobank Kenya": "Ecobank", 
-    "Ecobank": "Ecobank",
-    "Guaranty Trust Bank Kenya": "GT Bank", 
-    "GT Bank": "GT Bank", 
-    "GTB" : "GT Bank",
-    "Sidian Bank Kenya": "Sidian Bank", 
-    "Sidian Bank": "Sidian Bank",
-    "Mayfair CIB Bank Kenya": "Mayfair Bank", 
-    "Mayfair Bank": "Mayfair Bank",
-    "UBA Kenya Bank": "UBA Kenya Bank", 
-    "United Bank for Africa": "UBA Kenya Bank", 
-    "UBA": "UBA Kenya Bank",
-    "ABC Bank Kenya": "ABC Bank", 
-    "ABC Bank": "ABC Bank",
-    "Transnational Bank Kenya": "Transnational Bank", 
-    "Transnational Bank": "Transnational Bank"
-}
+def statement_data(dataset_id: str) -> pd.DataFrame | None:
+    """The statement of a dataset, None without data"""
+    data = dataset_store.get(dataset_id)
+    if data is None or data.empty:
+        return None
+    return data
 
-safaricom_financial_services = {
-    "M-Shwari":"MShwari", 
-    "KCB M-Pesa":"KCB Mpesa",
-    "Fuliza" :"M-Pesa Fuliza", 
-    "M-Pesa Global" :"Global M-Pesa",
-    "H- Fund":"HustlerFund"
-}
+def statement_bank_report(data: pd.DataFrame) -> pd.DataFrame:
+    """The bank report of a statement, computed once per snapshot"""
+    return dataset_store.derived(data, 'bank_report', bank_report)
 
 @router.get("/")
 def read_root():
@@ -150,14 +50,27 @@ def cors_options_response():
     )
 
 # Helper for JSON responses with CORS headers
-def cors_json_response(content, status_code: int = 200):
-    return JSONResponse(
+def cors_json_response(content, status_code: int = 200, headers: dict | None = None):
+    return FastJSONResponse(
         content=content,
         status_code=status_code,
         headers={
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Methods": "GET, OPTIONS",
             "Access-Control-Allow-Headers": "Content-Type",
+            **(headers or {}),
+        }
+    )
+
+# Helper for NDJSON streams of statement rows with CORS headers
+def cors_ndjson_response(rows: pd.DataFrame, headers: dict | None = None):
+    return ndjson_response(
+        rows,
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, OPTIONS",
+            "Access-Control-Allow-Headers": "Content-Type",
+            **(headers or {}),
         }
     )
 
@@ -214,449 +127,344 @@ async def options_fuliza_usage():
 async def options_fuliza_loan_summary():
     return cors_options_response()
 
+@router.options("/summary/")
+async def options_summary():
+    return cors_options_response()
+
 
 # Identify Banks Customer Transacts to/from
 @router.get('/client_banks/')
-def identify_banks():
+def identify_banks(dataset_id: str, format: str = "records", limit: int | None = None, cursor: int | None = None):
+    check_listing(format, limit)
     try:
-        data = shared_state.mpesa_statement_df
+        data = dataset_store.get(dataset_id)
 
         if data is None or data.empty:
             return cors_json_response([[], {"message": "No data available. Please upload a PDF statement first."}])
         
-        #create a new column 'Bank' initialized with None
-        data['Bank'] = None
-
-        #populate 'Bank' column
-        for keyword in banks_in_kenya:
-            data.loc[data['Details'].str.contains(keyword, case=False, na=False), 'Bank'] = keyword
-    
+        #'Bank' column, tagged when the statement was uploaded
         #filter rows where 'Bank' is not None
         bank_transactions = data[data['Bank'].notna()]
 
         unique_banks = bank_transactions['Bank'].unique().tolist()
 
+        # one page of the rows, all of them without a limit
+        rows, headers = frame_page(bank_transactions, limit, cursor)
+        if format == "ndjson":
+            return cors_ndjson_response(rows, headers)
+
         return cors_json_response([
             unique_banks,
             {
-                "transactions": bank_transactions.to_dict(orient='records'),
+                "transactions": frame_content(rows, format),
                 "count": len(bank_transactions)
             }
-        ])
+        ], headers=headers)
     
     except Exception as e:
         print(f"Error identifying banks: {e}")
         return cors_json_response([[], {"message": "Error processing bank data", "error": str(e)}])
 
 
-# lowest amount received through bank
-@router.get('/lowest_amount_received_through_bank/')
-def lowest_amount_received_through_bank():
-    try:
-        _, client_bank_transactions = identify_banks()
-        
-        if 'transactions' not in client_bank_transactions or not client_bank_transactions['transactions']:
-            return cors_json_response({"message": "No bank transaction data available"})
-        
-        client_bank_transactions = client_bank_transactions['transactions']
-        data_df = pd.DataFrame(client_bank_transactions)
-
-        if data_df is None or data_df.empty:
-            return cors_json_response({"message": "No data available"})
-        
-        # to prevent getting zero as the result
-        received_df = data_df[data_df['Paid In'] != 0.00]
-        
-        if received_df.empty:
-            return cors_json_response({"message": "No received amounts found"})
-        
-        lowest_received_amount = received_df['Paid In'].min()
-        return cors_json_response({"lowest_received_amount": lowest_received_amount})
-    
-    except Exception as e:
-        print(f"Error getting lowest amount: {e}")
-        return cors_json_response({"message": "Error processing bank data", "error": str(e)})
+# Metrics, each computed from the statement and returned as its route's content
 
+# lowest amount received through bank
+def lowest_received_metric(data: pd.DataFrame):
+    report = statement_bank_report(data)
 
-def lowest_amount_received_through_bank(data):
+    if report.empty:
+        return {"message": "No bank transaction data available"}
 
-    if data is None:
-        return {"error":"No data available"}
-    
-    try:
-        # to prevent getting zero as the result
-        received_df = data[data['Paid In'] != 0.00]
-        lowest_received_amount = received_df['Paid In'].min()
-        return lowest_received_amount
-    
-    except Exception as e:
-        print(f"Error getting lowest amount: {e}")
-        return { "error": str(e)}
+    # to prevent getting zero as the result, the report leaves zero amounts out
+    if not report['received_count'].any():
+        return {"message": "No received amounts found"}
 
+    lowest_received_amount = report['received_min'].min()
+    return {"lowest_received_amount": to_kes(lowest_received_amount)}
 
 # bank summary metrics for recieved
-@router.get('/bank_received_summary_metrics/')
-def bank_received_summary_metrics():
-    try:
-        _, client_bank_transactions = identify_banks()
-
-        # Check if we got valid data
-        if not client_bank_transactions or 'transactions' not in client_bank_transactions:
-            return cors_json_response({"message": "No bank transaction data available. Please upload a PDF statement first."})
-
-        client_bank_transactions = client_bank_transactions['transactions']
-        
-        # Check if transactions list is empty
-        if not client_bank_transactions:
-            return cors_json_response({"message": "No bank transactions found"})
-        
-        client_bank_transactions_df = pd.DataFrame(client_bank_transactions)
-
-        # Check if DataFrame is empty
-        if client_bank_transactions_df.empty:
-            return cors_json_response({"message": "No transaction data available"})
-
-        # debugging
-        # print("===============================================")
-        # print(f"{client_bank_transactions_df.columns.tolist()}")
-        # print("===============================================")
-
-        total_amount_received = client_bank_transactions_df['Paid In'].sum()
-        highest_amount_received = client_bank_transactions_df['Paid In'].max()
-        lowest_amount_received = lowest_amount_received_through_bank(client_bank_transactions_df)
-
-        highest_amount_bank = client_bank_transactions_df.loc[client_bank_transactions_df['Paid In'].idxmax(), 'Bank']
-        lowest_amount_bank = client_bank_transactions_df.loc[client_bank_transactions_df['Paid In'].idxmin(), 'Bank']
-
-        return cors_json_response({
-            "total_amount_received": total_amount_received,
-            "highest_amount_received": highest_amount_received,
-            "lowest_amount_received": lowest_amount_received,
-            "highest_amount_bank": highest_amount_bank,
-            "lowest_amount_bank":  lowest_amount_bank
-        })
-    
-    except Exception as e:
-        print(f"Error in bank_received_summary_metrics: {e}")
-        return cors_json_response({"message": "Error processing bank summary metrics", "error": str(e)})
-
+def bank_received_metric(data: pd.DataFrame):
+    report = statement_bank_report(data)
+    received = report[report['received_count'] > 0]
+
+    # Check if there are received bank transactions
+    if received.empty:
+        return {"message": "No bank transactions found"}
+
+    return {
+        "total_amount_received": to_kes(received['received_total'].sum()),
+        "highest_amount_received": to_kes(received['received_max'].max()),
+        "lowest_amount_received": to_kes(received['received_min'].min()),
+        "highest_amount_bank": received['received_max'].idxmax(),
+        "lowest_amount_bank": received['received_min'].idxmin()
+    }
 
 # lowest amount sent through bank
-@router.get('/lowest_amount_sent_through_bank/')
-def lowest_amount_sent_through_bank():
-    try:
-        _, client_bank_transactions = identify_banks()
-        
-        if not client_bank_transactions or 'transactions' not in client_bank_transactions:
-            return cors_json_response({"message": "No bank transaction data available. Please upload a PDF statement first."})
-        
-        client_bank_transactions = client_bank_transactions['transactions']
-        
-        if not client_bank_transactions:
-            return cors_json_response({"message": "No bank transactions found"})
-        
-        data_df = pd.DataFrame(client_bank_transactions)
-
-        if data_df is None or data_df.empty:
-            return cors_json_response({"message": "No data available"})
-        
-        # to prevent getting zero as the result
-        sent_df = data_df[data_df['Withdrawn'] != 0.00]
-        
-        if sent_df.empty:
-            return cors_json_response({"message": "No sent amounts found"})
-        
-        lowest_sent_amount = sent_df['Withdrawn'].min()
-        return cors_json_response({"lowest_sent_amount": lowest_sent_amount})
-    
-    except Exception as e:
-        print(f"Error getting lowest amount sent through bank: {e}")
-        return cors_json_response({"message": "Error processing bank data", "error": str(e)})
-    
+def lowest_sent_metric(data: pd.DataFrame):
+    report = statement_bank_report(data)
+
+    if report.empty:
+        return {"message": "No bank transactions found"}
+
+    # to prevent getting zero as the result, the report leaves zero amounts out
+    if not report['sent_count'].any():
+        return {"message": "No sent amounts found"}
+
+    lowest_sent_amount = report['sent_min'].min()
+    return {"lowest_sent_amount": to_kes(lowest_sent_amount)}
+
+# bank summary metrics for sent
+def bank_sent_metric(data: pd.DataFrame):
+    report = statement_bank_report(data)
+    sent = report[report['sent_count'] > 0]
+
+    if sent.empty:
+        return {"message": "No bank transactions found"}
+
+    return {
+        "total_amount_sent": to_kes(sent['sent_total'].sum()),
+        "highest_amount_sent": to_kes(sent['sent_max'].max()),
+        "lowest_amount_sent": to_kes(sent['sent_min'].min()),
+        "highest_amount_bank": sent['sent_max'].idxmax(),
+        "lowest_amount_bank": sent['sent_min'].idxmin()
+    }
+
+def top_five_banks(report: pd.DataFrame, count_column: str) -> dict:
+    """The five banks with the most transactions in count_column, most first"""
+    counts = report.loc[report[count_column] > 0, count_column]
+
+    # sort the counts in descending order & select top 5
+    top_five = counts.sort_values(ascending=False).head(5)
+
+    # Convert to dictionary with bank names as keys
+    return {
+        "top_five_banks": [
+            {"bank": bank, "count": int(count)}
+            for bank, count in top_five.items()
+        ]
+    }
 
-def lowest_amount_sent_through_bank(data):
-
-    if data is None:
-        return {"error": "No data available"}
-    
-    try:
-        # to prevent getting zero as the result
-        sent_df = data[data['Withdrawn'] != 0.00]
-        lowest_sent_amount = sent_df['Withdrawn'].min()
-        return {"lowest_sent_amount":  lowest_sent_amount}
-    except Exception as e:
-        print(f"Error getting lowest amount sent through bank: {e}")
-        return {"error": str(e)}
+# top five received (from bank) count
+def top_five_received_metric(data: pd.DataFrame):
+    return top_five_banks(statement_bank_report(data), 'received_count')
 
+# top five sent (from bank) count
+def top_five_sent_metric(data: pd.DataFrame):
+    return top_five_banks(statement_bank_report(data), 'sent_count')
+
+def loan_summary(disbursements: pd.DataFrame, repayments: pd.DataFrame) -> dict:
+    """Count, highest, last and total of the loans disbursed and paid back"""
+    disbursed = not disbursements.empty
+    paid = not repayments.empty
+
+    return {
+        "total_loan_count": len(disbursements),
+        "highest_loan_disbursed": to_kes(disbursements["Paid In"].max() if disbursed else 0),
+        "highest_loan_paid_back": to_kes(repayments["Withdrawn"].max() if paid else 0),
+        "date_of_last_loan_disbursement": to_iso(disbursements['Completion Time'].max() if disbursed else None),
+        "date_of_last_loan_repayment": to_iso(repayments['Completion Time'].max() if paid else None),
+        "last_amount_borrowed": to_kes(disbursements.loc[disbursements['Completion Time'].idxmax(), 'Paid In'] if disbursed else 0),
+        "last_amount_paid_back": to_kes(repayments.loc[repayments['Completion Time'].idxmax(), 'Withdrawn'] if paid else 0),
+        "total_loan_disbursed_amount": to_kes(disbursements["Paid In"].sum()),
+        "total_loan_paid_back_amount": to_kes(repayments["Withdrawn"].sum()),
+    }
 
-# bank summary metrics for recieved
-@router.get('/bank_sent_summary_metrics/')
-def bank_sent_summary_metrics():
-    _, client_bank_transactions = identify_banks()
+# mshwari loan summary
+def mshwari_loan_metric(data: pd.DataFrame):
+    mshwari_transactions = data[data['Mshwari_Service'].notna()]
 
-    client_bank_transactions = client_bank_transactions['transactions']
-    client_bank_transactions_df = pd.DataFrame(client_bank_transactions)
+    if mshwari_transactions.empty:
+        return {"message": "Empty DataFrame"}
 
-    total_amount_sent = client_bank_transactions_df['Withdrawn'].sum()
-    highest_amount_sent = client_bank_transactions_df['Withdrawn'].max()
-    lowest_amount_sent = lowest_amount_sent_through_bank(client_bank_transactions_df)
+    # Filter for loan disbursements and repayments
+    return loan_summary(
+        mshwari_transactions[mshwari_transactions['Transaction_Type'] == 'M-Shwari Loan'],
+        mshwari_transactions[mshwari_transactions['Transaction_Type'] == 'Mshwari Loan Repayment'],
+    )
 
-    highest_amount_bank = client_bank_transactions_df.loc[client_bank_transactions_df['Withdrawn'].idxmax(), 'Bank']
-    lowest_amount_bank = client_bank_transactions_df.loc[client_bank_transactions_df['Withdrawn'].idxmin(), 'Bank']
+def fuliza_transactions(data: pd.DataFrame) -> pd.DataFrame:
+    return data[data["Financial_Service"] == 'Fuliza']
 
-    return cors_json_response({
-        "total_amount_sent": total_amount_sent,
-        "highest_amount_sent": highest_amount_sent,
-        "lowest_amount_sent": lowest_amount_sent,
-        "highest_amount_bank": highest_amount_bank,
-        "lowest_amount_bank":  lowest_amount_bank
-    })
+# How our users are using fuliza
+def fuliza_usage_metric(data: pd.DataFrame):
+    fuliza_data = fuliza_transactions(data)
 
-# Identify Saf Financial Services/Transactions
-@router.get('/identify_safaricom_financial_services/')
-def identify_safaricom_financial_services():
+    if fuliza_data.empty:
+        return {"message": "No Fuliza usage found"}
 
-    data_df = shared_state.mpesa_statement_df
+    return {"fuliza_usage": frame_content(fuliza_data)}
 
-    #create a new column 'Bank' initialized with None
-    data_df['Financial_Service'] = None
+# fuliza loan summary
+def fuliza_loan_metric(data: pd.DataFrame):
+    # Filter for loan disbursements and repayments
+    loan_disbursements = data[data['Transaction_Type'] == 'Fuliza Loan']
+    loan_repayments = data[data['Transaction_Type'] == 'Fuliza Loan Repayment']
+
+    summary = loan_summary(loan_disbursements, loan_repayments)
+    summary["total_loan_balance"] = to_kes(loan_disbursements["Paid In"].sum() - loan_repayments["Withdrawn"].sum())
+    return summary
+
+# metric name (the route it is served on) -> metric
+FINANCIAL_METRICS = {
+    "lowest_amount_received_through_bank": lowest_received_metric,
+    "bank_received_summary_metrics": bank_received_metric,
+    "lowest_amount_sent_through_bank": lowest_sent_metric,
+    "bank_sent_summary_metrics": bank_sent_metric,
+    "top_five_received_count": top_five_received_metric,
+    "top_five_sent_count": top_five_sent_metric,
+    "mshwari_loan_summary": mshwari_loan_metric,
+    "fuliza_usage": fuliza_usage_metric,
+    "fuliza_loan_summary": fuliza_loan_metric,
+}
 
-    #populate 'Financial_Service' column
-    for keyword in safaricom_financial_services:
-        data_df.loc[data_df['Details'].str.contains(keyword, case=False, na=False), 'Financial_Service'] = keyword
-    
-    #filter rows where 'Financial_Service' is not None
-    bank_transactions = data_df[data_df['Financial_Service'].notna()]
+def statement_metric(dataset_id: str, metric, no_data_message: str, error_message: str):
+    try:
+        data = statement_data(dataset_id)
 
-    return cors_json_response({"transactions": bank_transactions.to_dict(orient='records')})
+        if data is None:
+            return cors_json_response({"message": no_data_message})
 
+        return cors_json_response(metric(data))
 
-# M-Shwari
-# identify mshwari financial transactions
-@router.get('/identify_mshwari_financial_transactions/')
-def identify_mshwari_financial_transactions():
-
-    mshwari_financial_services = ["M-Shwari", "MShwari"]
-    data_df = shared_state.mpesa_statement_df
+    except Exception as e:
+        print(f"Error in {metric.__name__}: {e}")
+        return cors_json_response({"message": error_message, "error": str(e)})
 
-    data_df['Mshwari_Service'] = None
 
-    for keyword in mshwari_financial_services:
-        data_df.loc[data_df['Details'].str.contains(keyword, case=False, na=False), 'Mshwari_Service'] = keyword
-    
-    mshwari_transactions = data_df[data_df['Mshwari_Service'].notna()]
+# all the requested bank, M-Shwari and Fuliza metrics in one document
+@router.get('/summary/')
+def summary(dataset_id: str, metrics: Annotated[list[str] | None, Query()] = None):
+    data = statement_data(dataset_id)
 
-    return cors_json_response({"mshwari_transactions": mshwari_transactions.to_dict(orient='records'),
-            "count": len(mshwari_transactions)})
+    if data is None:
+        return cors_json_response({"message": "No transaction data available. Please upload a PDF statement first."})
 
+    return cors_json_response(summarize(FINANCIAL_METRICS, metrics, data))
 
-def identify_mshwari_financial_transactions_2():
 
-    mshwari_financial_services = ["M-Shwari", "MShwari"]
-    data_df = shared_state.mpesa_statement_df
+# lowest amount received through bank
+@router.get('/lowest_amount_received_through_bank/')
+def lowest_amount_received_through_bank(dataset_id: str):
+    return statement_metric(dataset_id, lowest_received_metric,
+                            "No bank transaction data available", "Error processing bank data")
 
-    data_df['Mshwari_Service'] = None
 
-    for keyword in mshwari_financial_services:
-        data_df.loc[data_df['Details'].str.contains(keyword, case=False, na=False), 'Mshwari_Service'] = keyword
-    
-    mshwari_transactions = data_df[data_df['Mshwari_Service'].notna()]
+# bank summary metrics for recieved
+@router.get('/bank_received_summary_metrics/')
+def bank_received_summary_metrics(dataset_id: str):
+    return statement_metric(dataset_id, bank_received_metric,
+                            "No bank transaction data available. Please upload a PDF statement first.",
+                            "Error processing bank summary metrics")
 
-    return cors_json_response({"transactions": mshwari_transactions.to_dict(orient='records')})
 
+# lowest amount sent through bank
+@router.get('/lowest_amount_sent_through_bank/')
+def lowest_amount_sent_through_bank(dataset_id: str):
+    return statement_metric(dataset_id, lowest_sent_metric,
+                            "No bank transaction data available. Please upload a PDF statement first.",
+                            "Error processing bank data")
 
-# mshwari loan summary
-@router.get('/mshwari_loan_summary/')
-def mshwari_loan_summary():
-    # Identify M-Shwari financial transactions
-    mshwari_transactions = identify_mshwari_financial_transactions_2()
-    mshwari_transactions = mshwari_transactions['transactions']
-    mshwari_transactions_df = pd.DataFrame(mshwari_transactions)
 
-    if mshwari_transactions_df.empty:
-        return {"message": "Empty DataFrame"}
-    
-    # Filter for loan disbursements and repayments
-    loan_disbursements = mshwari_transactions_df[mshwari_transactions_df['Transaction_Type'] == 'M-Shwari Loan']
-    loan_repayments = mshwari_transactions_df[mshwari_transactions_df['Transaction_Type'] == 'Mshwari Loan Repayment']
-    
-    # Calculate the required metrics
-    total_loan_count = loan_disbursements.shape[0]
-    highest_loan_disbursed = loan_disbursements['Paid In'].max() if not loan_disbursements.empty else 0
-    highest_loan_paid_back = loan_repayments['Withdrawn'].max() if not loan_repayments.empty else 0
-    date_of_last_loan_disbursement = loan_disbursements['Completion Time'].max() if not loan_disbursements.empty else None
-    date_of_last_loan_repayment = loan_repayments['Completion Time'].max() if not loan_repayments.empty else None
-    last_amount_borrowed = loan_disbursements.loc[loan_disbursements['Completion Time'].idxmax(), 'Paid In'] if not loan_disbursements.empty else 0
-    last_amount_paid_back = loan_repayments.loc[loan_repayments['Completion Time'].idxmax(), 'Withdrawn'] if not loan_repayments.empty else 0
-    total_loan_disbursed_amount = loan_disbursements['Paid In'].sum() if not loan_disbursements.empty else 0
-    total_loan_paid_back_amount = loan_repayments['Withdrawn'].sum() if not loan_repayments.empty else 0
-    
-    return cors_json_response({
-        "total_loan_count": total_loan_count,
-        "highest_loan_disbursed": highest_loan_disbursed,
-        "highest_loan_paid_back": highest_loan_paid_back,
-        "date_of_last_loan_disbursement": date_of_last_loan_disbursement,
-        "date_of_last_loan_repayment": date_of_last_loan_repayment,
-        "last_amount_borrowed": last_amount_borrowed,
-        "last_amount_paid_back": last_amount_paid_back,
-        "total_loan_disbursed_amount": total_loan_disbursed_amount,
-        "total_loan_paid_back_amount": total_loan_paid_back_amount
-    })
-
-
-def group_bank_mappings(data, mapping):
-    # Create a new column 'Grouped_Bank' initialized with None
-    data['Grouped_Bank'] = None
-
-    # Populate 'Grouped_Bank' column using the mapping
-    for key, value in mapping.items():
-        data.loc[data['Details'].str.contains(key, case=False, na=False), 'Grouped_Bank'] = value
-    
-    # remove rows where 'Grouped_Bank' is None
-    data = data.dropna(subset=['Grouped_Bank'])
-    
-    return data
+# bank summary metrics for sent
+@router.get('/bank_sent_summary_metrics/')
+def bank_sent_summary_metrics(dataset_id: str):
+    return statement_metric(dataset_id, bank_sent_metric,
+                            "No bank transaction data available. Please upload a PDF statement first.",
+                            "Error processing bank summary metrics")
 
-# top five received (from bank) count
-@router.get('/top_five_received_count/')
-def top_five_received_count():
+# Identify Saf Financial Services/Transactions
+@router.get('/identify_safaricom_financial_services/')
+def identify_safaricom_financial_services(dataset_id: str, format: str = "records", limit: int | None = None, cursor: int | None = None):
+    check_listing(format, limit)
     try:
-        data_df = shared_state.mpesa_statement_df
+        data_df = statement_data(dataset_id)
 
-        if data_df is None or data_df.empty:
+        if data_df is None:
             return cors_json_response({"message": "No data available. Please upload a PDF statement first."})
 
-        df_grouped = group_bank_mappings(data_df, banks_in_kenya_grouped)
-
-        if df_grouped is None:
-            return cors_json_response({"message": "No amount received through the bank"})
-        
-        # filter transactions with Paid In values
-        paid_in_bank_transactions = df_grouped[df_grouped['Paid In'] != 0.0]
+        #'Financial_Service' column, tagged when the statement was uploaded
+        #filter rows where 'Financial_Service' is not None
+        bank_transactions = data_df[data_df['Financial_Service'].notna()]
 
-        # group by 'Grouped Bank' and count number of transactions
-        bank_transaction_counts = paid_in_bank_transactions.groupby('Grouped_Bank').size()
+        rows, headers = frame_page(bank_transactions, limit, cursor)
+        if format == "ndjson":
+            return cors_ndjson_response(rows, headers)
 
-        # sort the counts in descending order & select top 5
-        top_five_banks = bank_transaction_counts.sort_values(ascending=False).head(5)
+        return cors_json_response({"transactions": frame_content(rows, format)}, headers=headers)
 
-        # Convert to dictionary with bank names as keys
-        result = {
-                "top_five_banks": [
-                    {"bank": bank, "count": count} 
-                    for bank, count in top_five_banks.items()
-                ]
-        }
-
-        return cors_json_response(result)
-    
     except Exception as e:
-        print(f"Error in top_five_received_count: {e}")
-        return cors_json_response({"message": "Error processing bank data", "error": str(e)})
+        print(f"Error identifying Safaricom financial services: {e}")
+        return cors_json_response({"message": "Error processing financial services data", "error": str(e)})
 
 
-# top five sent (from bank) count
-@router.get('/top_five_sent_count/')
-def top_five_sent_count():
+# M-Shwari
+# identify mshwari financial transactions
+@router.get('/identify_mshwari_financial_transactions/')
+def identify_mshwari_financial_transactions(dataset_id: str, format: str = "records", limit: int | None = None, cursor: int | None = None):
+    check_listing(format, limit)
     try:
-        data_df = shared_state.mpesa_statement_df
+        data_df = statement_data(dataset_id)
 
-        if data_df is None or data_df.empty:
+        if data_df is None:
             return cors_json_response({"message": "No data available. Please upload a PDF statement first."})
 
-        df_grouped = group_bank_mappings(data_df, banks_in_kenya_grouped)
+        mshwari_transactions = data_df[data_df['Mshwari_Service'].notna()]
 
-        if df_grouped is None:
-            return cors_json_response({"message": "No amount received through the bank"})    
-        
-        # filter transactions with Withdrawn values
-        paid_in_bank_transactions = df_grouped[df_grouped['Withdrawn'] != 0.0]
+        rows, headers = frame_page(mshwari_transactions, limit, cursor)
+        if format == "ndjson":
+            return cors_ndjson_response(rows, headers)
 
-        # group by 'Grouped Bank' and count number of transactions
-        bank_transaction_counts = paid_in_bank_transactions.groupby('Grouped_Bank').size()
+        return cors_json_response({"mshwari_transactions": frame_content(rows, format),
+                "count": len(mshwari_transactions)}, headers=headers)
 
-        # sort the counts in descending order & select top 5
-        top_five_banks = bank_transaction_counts.sort_values(ascending=False).head(5)
+    except Exception as e:
+        print(f"Error identifying M-Shwari transactions: {e}")
+        return cors_json_response({"message": "Error processing M-Shwari data", "error": str(e)})
 
-        # Convert to dictionary with bank names as keys
-        result = {
-                "top_five_banks": [
-                    {"bank": bank, "count": count} 
-                    for bank, count in top_five_banks.items()
-                ]
-        }
 
-        return cors_json_response(result)
-    
-    except Exception as e:
-        print(f"Error in top_five_sent_count: {e}")
-        return cors_json_response({"message": "Error processing bank data", "error": str(e)})
+# mshwari loan summary
+@router.get('/mshwari_loan_summary/')
+def mshwari_loan_summary(dataset_id: str):
+    return statement_metric(dataset_id, mshwari_loan_metric,
+                            "Empty DataFrame", "Error processing M-Shwari loan summary")
 
 
-def identify_safaricom_financial_services_2():
-    # Get DataFrame
-    data_df = shared_state.mpesa_statement_df
-    
-    if data_df is None or data_df.empty:
-        return {"transactions": [], "message": "No data available"}
-    
-    try:
-        # Work with copy
-        df = data_df.copy()
-        
-        # Initialize service column
-        df['Financial_Service'] = None
-        
-        # Map services
-        for keyword in safaricom_financial_services:
-            mask = df['Details'].str.contains(keyword, case=False, na=False)
-            df.loc[mask, 'Financial_Service'] = keyword
-        
-        # Filter services
-        services_df = df[df['Financial_Service'].notna()]
-        
-        # Return with column info
-        return cors_json_response({
-            "transactions": services_df.to_dict(orient='records'),
-            "columns": services_df.columns.tolist()
-        })
-    except Exception as e:
-        print(f"Error in identify_safaricom_financial_services_2: {e}")
-        return cors_json_response({"transactions": [], "error": str(e)})
+# top five received (from bank) count
+@router.get('/top_five_received_count/')
+def top_five_received_count(dataset_id: str):
+    return statement_metric(dataset_id, top_five_received_metric,
+                            "No data available. Please upload a PDF statement first.", "Error processing bank data")
+
+
+# top five sent (from bank) count
+@router.get('/top_five_sent_count/')
+def top_five_sent_count(dataset_id: str):
+    return statement_metric(dataset_id, top_five_sent_metric,
+                            "No data available. Please upload a PDF statement first.", "Error processing bank data")
 
 
 # fuliza transaction ( How are customers using fuliza)
 #How our users are using fuliza 
 @router.get('/fuliza_usage/')
-def fuliza_usage():
+def fuliza_usage(dataset_id: str, format: str = "records", limit: int | None = None, cursor: int | None = None):
+    check_listing(format, limit)
     try:
-        #returns banks client uses, and all the bank transactions
-        client_saf_transactions = identify_safaricom_financial_services_2()
+        data = statement_data(dataset_id)
 
-        if client_saf_transactions is None:
-            return cors_json_response({"message": "Client does not use Fuliza"})
-
-        # Check if transactions key exists and has data
-        if 'transactions' not in client_saf_transactions or not client_saf_transactions['transactions']:
-            return cors_json_response({"message": "No Safaricom financial services data available"})
-
-        data_df = pd.DataFrame(client_saf_transactions['transactions'])
-        
-        # Check if DataFrame is empty
-        if data_df.empty:
+        if data is None:
             return cors_json_response({"message": "No transaction data available"})
-        
-        # Check if Financial_Service column exists
-        if 'Financial_Service' not in data_df.columns:
-            return cors_json_response({"message": "No financial service data available"})
-        
-        fuliza_data = data_df[data_df["Financial_Service"] == 'Fuliza']
+
+        fuliza_data = fuliza_transactions(data)
 
         if fuliza_data.empty:
             return cors_json_response({"message": "No Fuliza usage found"})
-        
-        return cors_json_response({"fuliza_usage": fuliza_data.to_dict(orient='records')})
-    
+
+        rows, headers = frame_page(fuliza_data, limit, cursor)
+        if format == "ndjson":
+            return cors_ndjson_response(rows, headers)
+
+        return cors_json_response({"fuliza_usage": frame_content(rows, format)}, headers=headers)
+
     except Exception as e:
         print(f"Error in fuliza_usage: {e}")
         return cors_json_response({"message": "Error processing Fuliza usage data", "error": str(e)})
@@ -664,44 +472,7 @@ def fuliza_usage():
 
 # fuliza loan summary
 @router.get('/fuliza_loan_summary/')
-def fuliza_loan_summary():
-    try:
-        data_df = shared_state.mpesa_statement_df
-        
-        if data_df is None or data_df.empty:
-            return cors_json_response({"message": "No transaction data available. Please upload a PDF statement first."})
-        
-        # Identify M-Shwari financial transactions
-        
-        # Filter for loan disbursements and repayments
-        loan_disbursements = data_df[data_df['Transaction_Type'] == 'Fuliza Loan']
-        loan_repayments = data_df[data_df['Transaction_Type'] == 'Fuliza Loan Repayment']
-        
-        # Calculate the required metrics
-        loan_count = len(loan_disbursements)
-        highest_amount_paid = loan_repayments["Withdrawn"].max() if not loan_repayments.empty else 0
-        highest_amount_disbured = loan_disbursements["Paid In"].max() if not loan_disbursements.empty else 0
-        date_of_last_loan_disbursement = loan_disbursements['Completion Time'].max() if not loan_disbursements.empty else None
-        date_of_last_loan_repayment = loan_repayments['Completion Time'].max() if not loan_repayments.empty else None
-        last_amount_borrowed = loan_disbursements.loc[loan_disbursements['Completion Time'].idxmax(), 'Paid In'] if not loan_disbursements.empty else 0
-        last_amount_paid_back = loan_repayments.loc[loan_repayments['Completion Time'].idxmax(), 'Withdrawn'] if not loan_repayments.empty else 0
-        total_disbursed = loan_disbursements["Paid In"].sum() if not loan_disbursements.empty else 0
-        total_paid = loan_repayments["Withdrawn"].sum() if not loan_repayments.empty else 0
-        Total_balance = total_disbursed - total_paid
-        
-        return cors_json_response({
-            "total_loan_count": loan_count,
-            "highest_loan_disbursed": highest_amount_disbured,
-            "highest_loan_paid_back": highest_amount_paid,
-            "date_of_last_loan_disbursement": date_of_last_loan_disbursement,
-            "date_of_last_loan_repayment": date_of_last_loan_repayment,
-            "last_amount_borrowed": last_amount_borrowed,
-            "last_amount_paid_back": last_amount_paid_back,
-            "total_loan_disbursed_amount": total_disbursed,
-            "total_loan_paid_back_amount": total_paid,
-            "total_loan_balance": Total_balance
-        })
-    
-    except Exception as e:
-        print(f"Error in fuliza_loan_summary: {e}")
-        return cors_json_response({"message": "Error processing Fuliza loan summary", "error": str(e)})
+def fuliza_loan_summary(dataset_id: str):
+    return statement_metric(dataset_id, fuliza_loan_metric,
+                            "No transaction data available. Please upload a PDF statement first.",
+                            "Error processing Fuliza loan summary")
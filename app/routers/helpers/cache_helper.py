@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .schema_helper import SCHEMA_VERSION, table_to_statement
+
+CACHE_ROOT = os.getenv("CACHE_ROOT", os.path.join(tempfile.gettempdir(), "pesabu"))
+
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", os.path.join(CACHE_ROOT, "parse_cache"))
+PARSE_CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join(CACHE_ROOT, "page_cache"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# parquet schema metadata key holding the statement header
+HEADER_METADATA_KEY = b"statement_header"
+
+
+def parse_cache_key(pdf_content: bytes, password: str, engine: str) -> str:
+    """Content address of an upload: the PDF bytes, the password, the extraction engine and the statement schema"""
+    pdf_digest = hashlib.sha256(pdf_content).hexdigest()
+    password_digest = hashlib.sha256(password.encode()).hexdigest()[:16]
+    return f"{pdf_digest}-{password_digest}-{engine}-v{SCHEMA_VERSION}"
+
+
+class DiskCache:
+    """Files on local disk keyed by a content hash, evicted least recently used first.
+
+    The file's modification time is the LRU clock, so all workers sharing the directory share the cache.
+    """
+
+    suffix = ""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def record(self, hit: bool):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def touch(self, key: str):
+        """Mark an entry as recently used"""
+        try:
+            os.utime(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def write(self, key: str, writer):
+        """Write an entry through a temporary file so other workers never read a half written one"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            writer(tmp_path)
+            os.replace(tmp_path, self.path(key))
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def entries(self) -> list[os.DirEntry]:
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith(self.suffix)]
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for entry in self.entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                # another worker evicted it first
+                continue
+            logging.info(f"Evicted cache entry {os.path.basename(path)}")
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        size = 0
+        for entry in entries:
+            try:
+                size += entry.stat().st_size
+            except FileNotFoundError:
+                continue
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else None,
+            "entries": len(entries),
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "worker_pid": os.getpid(),
+        }
+
+
+class ParseCache(DiskCache):
+    """Cleaned statements stored as parquet files, keyed by parse_cache_key"""
+
+    suffix = ".parquet"
+
+    def get(self, key: str) -> tuple[dict, pd.DataFrame] | None:
+        """Return the cached (header, statement) for a key, or None on a miss"""
+        try:
+            table = pq.read_table(self.path(key))
+        except (FileNotFoundError, OSError, pa.ArrowInvalid):
+            self.record(hit=False)
+            return None
+
+        self.touch(key)
+        self.record(hit=True)
+        header = json.loads(table.schema.metadata[HEADER_METADATA_KEY])
+        return header, table_to_statement(table)
+
+    def put(self, key: str, header: dict, mpesa_df: pd.DataFrame):
+        """Store a cleaned statement, then evict old entries if the cache is over its size cap"""
+        table = pa.Table.from_pandas(mpesa_df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[HEADER_METADATA_KEY] = json.dumps(header).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        self.write(key, lambda path: pq.write_table(table, path))
+        self.evict()
+
+
+class PageCache(DiskCache):
+    """Table rows extracted from single pages, stored as JSON and keyed by the page fingerprint"""
+
+    suffix = ".json"
+
+    def get(self, key: str) -> dict | None:
+        try:
+            with open(self.path(key)) as page_file:
+                entry = json.load(page_file)
+        except (FileNotFoundError, ValueError):
+            self.record(hit=False)
+            return None
+
+        self.touch(key)
+        self.record(hit=True)
+        return entry
+
+    def put(self, key: str, entry: dict):
+        def writer(path):
+            with open(path, "w") as page_file:
+                json.dump(entry, page_file)
+
+        self.write(key, writer)
+
+
+parse_cache = ParseCache(PARSE_CACHE_DIR, PARSE_CACHE_MAX_BYTES)
+page_cache = PageCache(PAGE_CACHE_DIR, PAGE_CACHE_MAX_BYTES)
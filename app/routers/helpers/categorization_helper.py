@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+class PhraseTable:
+    """Rules mapping a phrase found in a text to a value, where the last rule that matches wins.
+
+    Phrases are case-insensitive RE2 patterns, matched the way Series.str.contains(case=False) matches
+    Arrow strings. Each distinct text is classified once: a text's winning rule is found by halving
+    its candidate range, testing the upper half as one alternation of its phrases, so a text goes
+    through about log2(rules) alternation scans instead of one scan per rule.
+    """
+
+    def __init__(self, rules: dict, default=None):
+        self.phrases = list(rules)
+        self.values = list(rules.values())
+        self.default = default
+        self.alternations = {}
+
+        # sorted like the categories pandas infers, so grouped results keep their order
+        categories = sorted(set(self.values + ([default] if default is not None else [])))
+        self.dtype = pd.CategoricalDtype(categories)
+        # category code of each rule's value, the extra last slot is for texts no rule matches
+        self.rule_codes = np.array(
+            [categories.index(value) for value in self.values]
+            + [categories.index(default) if default is not None else -1],
+            dtype=np.intp,
+        )
+
+    def matches(self, texts: pa.Array, first: int, last: int) -> np.ndarray:
+        """Whether any of the phrases of rules first..last occurs in each text"""
+        alternation = self.alternations.get((first, last))
+        if alternation is None:
+            alternation = self.alternations[(first, last)] = "|".join(
+                f"(?:{phrase})" for phrase in self.phrases[first:last + 1]
+            )
+        found = pc.match_substring_regex(texts, alternation, ignore_case=True)
+        return pc.fill_null(found, False).to_numpy(zero_copy_only=False)
+
+    def rules(self, texts: pa.Array) -> np.ndarray:
+        """Index of the last rule whose phrase occurs in each text, -1 where none does"""
+        rules = np.full(len(texts), -1, dtype=np.intp)
+        if not self.phrases or len(texts) == 0:
+            return rules
+
+        # every text on the stack has a phrase within first..last, the winner is in the upper half
+        # if any upper phrase occurs, otherwise in the lower half
+        candidates = [(np.flatnonzero(self.matches(texts, 0, len(self.phrases) - 1)), 0, len(self.phrases) - 1)]
+        while candidates:
+            rows, first, last = candidates.pop()
+            if first == last:
+                rules[rows] = first
+                continue
+
+            middle = (first + last) // 2
+            upper = self.matches(texts.take(rows), middle + 1, last)
+            for part, part_first, part_last in ((rows[upper], middle + 1, last), (rows[~upper], first, middle)):
+                if len(part):
+                    candidates.append((part, part_first, part_last))
+        return rules
+
+    def classify(self, texts: pd.Series) -> pd.Series:
+        """Value of the winning rule for every text, the default where no rule matches or the text is missing"""
+        codes, uniques = pd.factorize(texts)
+        rules = np.append(self.rules(pa.array(uniques, type=pa.string())), -1)
+
+        # missing texts have code -1, as do unmatched rules, and both land on the last slot
+        return pd.Series(
+            pd.Categorical.from_codes(self.rule_codes[rules[codes]], dtype=self.dtype),
+            index=texts.index,
+        )
+
+
+# Details phrase -> Transaction_Type of a cleaned statement
+TRANSACTION_CATEGORIES = {
+    'Customer Transfer to': 'Send Money',
+    'Pay Bill Fuliza M-Pesa to' : 'Fuliza Loan',
+    'Customer Transfer Fuliza MPesa': 'Send Money',
+    'Pay Bill Online': 'Pay Bill',
+    'Pay Bill to': 'Pay Bill',
+    'Customer Transfer of Funds Charge': 'Mpesa Charges',
+    'Pay Bill Charge': 'Mpesa Charges',
+    'Merchant Payment Online': 'Till No',
+    'Customer Send Money to Micro': 'Pochi',
+    'M-Shwari Withdraw': 'Mshwari Withdraw',
+    'Business Payment from': 'Bank Transfer',
+    'Airtime Purchase': 'Airtime Purchase',
+    'Airtime Purchase For Other': 'Airtime Purchase',
+    'Recharge for Customer': 'safaricom bundles',
+    'Customer Bundle Purchase with Fuliza': 'safaricom bundles',
+    'Funds received from': 'Received Money',
+    'Merchant Payment': 'Till No',
+    'Customer Withdrawal': 'Cash Withdrawal',
+    'Withdrawal Charge': 'Mpesa Charges',
+    'Pay Merchant Charge': 'Mpesa Charges',
+    'M-Shwari Deposit': 'Mshwari Deposit',
+    'M-Shwari Loan': 'M-Shwari Loan',
+    'M-Shwari Loan Repayment':'M-Shwari Repayment',
+    'Deposit of Funds at Agent': 'Customer Deposit',
+    'OD Loan Repayment to': 'Fuliza Loan Repayment',
+    'OverDraft of Credit Party': 'Fuliza Loan',
+    'Customer Transfer Fuliza M-Pesa to':'Send Money',
+    'Customer Transfer of Funds Charge':'Mpesa Charges',
+    'KCB M-PESA Withdraw': 'KCB M-PESA Withdraw',
+    'KCB M-PESA Deposit': 'KCB M-PESA Deposit',
+    'KCB M-PESA Target Deposit': 'KCB M-PESA Deposit',
+    'Recharge for Customer With Fuliza': 'Fuliza Airtime',
+    'Promotion Payment':'Received Money',
+    'KCB M-PESA Target First Deposit':'KCB M-PESA Deposit',
+    'Customer Payment to Small Business':'Pochi',
+    'Merchant Customer Payment from': 'Till No',
+    'Reversal':'Reversal',
+    'Merchant Payment Fuliza M-Pesa':'Till No',
+    'Other': 'Other'
+}
+
+transaction_types = PhraseTable(TRANSACTION_CATEGORIES, default='Other')
@@ -1,60 +1,78 @@
+from typing import NamedTuple
+import numpy as np
 import pandas as pd
+from .schema_helper import to_kes
+
+# Transaction_Type values counted as loans taken, and as loans paid back
+LOAN_TYPES = "Fuliza Loan|Hustler"
+REPAYMENT_TYPES = "Fuliza Loan Repayment|Hustler Repayment"
+
+
+class CreditFeatures(NamedTuple):
+    """What the score is computed from, amounts in KES"""
+    transactions: int
+    loan_requests: int
+    total_income: float
+    total_expense: float
+    total_saved: float
+    total_loans: float
+    total_repayments: float
+
+
+def category_mask(column: pd.Series, pattern: str) -> np.ndarray:
+    """str.contains(pattern, case=False) of a categorical column, evaluated once per category"""
+    if not isinstance(column.dtype, pd.CategoricalDtype):
+        return column.str.contains(pattern, case=False, na=False).to_numpy(dtype=bool)
+
+    matches = np.asarray(column.cat.categories.str.contains(pattern, case=False, regex=True), dtype=bool)
+    # missing values have code -1 and take the trailing False
+    return np.append(matches, False)[column.cat.codes.to_numpy()]
+
+
+def credit_features(data: pd.DataFrame) -> CreditFeatures:
+    """Every feature of the score in one pass over the statement's arrays"""
+    paid_in = data["Paid In"].to_numpy(dtype=np.int64)
+    withdrawn = data["Withdrawn"].to_numpy(dtype=np.int64)
+    save_or_spend = data["save/spend"]
+    spent = (save_or_spend == "spend").to_numpy(dtype=bool)
+    saved = (save_or_spend == "save").to_numpy(dtype=bool)
+    loans = category_mask(data["Transaction_Type"], LOAN_TYPES)
+    repayments = category_mask(data["Transaction_Type"], REPAYMENT_TYPES)
+
+    # sums in cents, each converted to KES once
+    return CreditFeatures(
+        transactions=len(data),
+        loan_requests=int(np.count_nonzero(loans)),
+        total_income=to_kes(paid_in.sum()),
+        total_expense=to_kes(withdrawn[spent].sum()),
+        total_saved=to_kes(withdrawn[saved].sum()),
+        total_loans=to_kes(paid_in[loans].sum()),
+        total_repayments=to_kes(withdrawn[repayments].sum()),
+    )
 
 
-# A function to determine whether  a user spends or save 
-def save_or_spend(row):
-    # Identify the keywords
-    keywords = "M-Shwari Lock Deposit|Saving|savings|mmf|M-shwari Deposit|Sanlam"
-    
-    # Check if the current row's 'Details' contains any of the keywords
-    if pd.Series(row['Details']).str.contains(keywords, case=False, regex=True, na=False).any():
-        return 'save'
-    else:
-        return 'spend'
-    
-
-# total amount transacted - received
-def total_received(data):
-    total = data['Paid In'].sum()
-    return total
-
-
-# total amount transacted - withdrawn
-def total_withdrawn(data):
-    total = data['Withdrawn'].sum()
-    return total
-
-
-def calculate_mpesa_fico_score(data):
+def credit_score_from_features(features: CreditFeatures) -> int:
     """
-    Calculate a FICO-like credit score using M-Pesa transactions.
+    Calculate a FICO-like credit score from the features of a statement.
     """
-    # Filtering transactions
-    data_spent = data[data["save/spend"] == "spend"]
-    data_save = data[data["save/spend"] == "save"]
-    data_loans = data[data["Transaction_Type"].str.contains("Fuliza Loan|Hustler", case=False, na=False)]
-    data_fuliza_loans = data[data["Transaction_Type"].str.contains("Fuliza Loan Repayment|Hustler Repayment", case=False, na=False)]
-
-    # Summing financial data
-    total_loans = total_received(data_loans)
-    total_repayments = total_withdrawn(data_fuliza_loans)
-    loan_requests = len(data_loans)
-    total_income = total_received(data)
-    total_expense = total_withdrawn(data_spent)
-    total_saved = total_withdrawn(data_save)
-    total_loan_income = total_received(data_loans)
+    total_loans = features.total_loans
+    total_repayments = features.total_repayments
+    loan_requests = features.loan_requests
+    total_expense = features.total_expense
+    total_saved = features.total_saved
+    total_loan_income = features.total_loans
 
     # Prevent division by zero
-    total_income = max(total_income, 1)
+    total_income = max(features.total_income, 1)
 
-    # **1. Payment History (25%)** → More repayments = higher score
-    payment_history_score = min(1, total_repayments / (total_loan_income * 0.3))
+    # **1. Payment History (25%)** → More repayments = higher score, nothing to repay without loans
+    payment_history_score = min(1, total_repayments / (total_loan_income * 0.3)) if total_loan_income else 1
 
     # **2. Income Spending Ratio (20%)** → Less spending = better score
     income_spending_ratio = max(0, (total_income - total_expense) / total_income)
 
-    loan_usage_ratio = loan_requests / max(1, len(data))  # Adjust for frequent usage
-    credit_score = max(0, 1 - loan_usage_ratio) 
+    loan_usage_ratio = loan_requests / max(1, features.transactions)  # Adjust for frequent usage
+    credit_score = max(0, 1 - loan_usage_ratio)
     # **4. Savings Ratio (10%)** → Higher savings = better score
     saving_ratio = min(1, total_saved / total_income)
 
@@ -77,6 +95,13 @@ def calculate_mpesa_fico_score(data):
     return  credit_score_final
 
 
+def calculate_mpesa_fico_score(data):
+    """
+    Calculate a FICO-like credit score using M-Pesa transactions.
+    """
+    return credit_score_from_features(credit_features(data))
+
+
 def credit_score_status(final_score):
     if final_score >= 800:
         return "Excellent"
@@ -87,4 +112,4 @@ def credit_score_status(final_score):
     elif final_score >= 580:
         return "Fair"
     else:
-        return "Poor"
\ No newline at end of file
+        return "Poor"
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# a cube cell is one combination of these, the counterparty being the (names, numbers) pair, where
+# numbers is the paybill/till number or, for transfers, the masked phone
+CUBE_DIMENSIONS = ["Transaction_Type", "month_name", "day_name", "Hour", "names", "numbers"]
+
+# money columns summarised in every cell, the prefix of their measures
+CUBE_MEASURES = {"Paid In": "paid_in", "Withdrawn": "withdrawn", "amount": "amount"}
+
+HOURS_PER_DAY = 24
+NO_VALUE = np.iinfo(np.int64).max
+
+
+def category_codes(column: pd.Series) -> tuple[np.ndarray, int]:
+    """Codes of a categorical dimension shifted by one, so 0 stands for a missing value, and their count"""
+    return column.cat.codes.to_numpy(dtype=np.int64) + 1, len(column.cat.categories) + 1
+
+
+def reduce_cells(values: np.ndarray, order: np.ndarray, starts: np.ndarray, ufunc) -> np.ndarray:
+    """ufunc over the rows of each cell, order sorting the rows by cell and starts marking where each begins"""
+    if not len(starts):
+        return np.empty(0, dtype=values.dtype)
+    return ufunc.reduceat(values[order], starts)
+
+
+def build_cube(data: pd.DataFrame) -> pd.DataFrame:
+    """Count, sum, min and max of the money columns per Transaction_Type x month x weekday x hour x counterparty.
+
+    Rows are reduced to their cell in one pass: cells are numbered with np.unique, counts and sums
+    come from np.bincount, max and the smallest nonzero amount from ufunc.reduceat over the rows
+    sorted by cell. min_nonzero leaves out the 0 of the other side of a transaction.
+    """
+    types, type_size = category_codes(data["Transaction_Type"])
+    months, month_size = category_codes(data["month_name"])
+    days, day_size = category_codes(data["day_name"])
+    hours = data["Hour"].to_numpy(dtype=np.int64)
+
+    # counterparty code: 0 where names or numbers is missing, 1 + the (names, numbers) pair otherwise
+    names, name_values = pd.factorize(data["names"].array)
+    numbers, number_values = pd.factorize(data["numbers"].fillna(data["phone"]).array)
+    width = max(len(number_values), 1)
+    parties = np.where((names >= 0) & (numbers >= 0), names * width + numbers + 1, 0)
+
+    shape = (type_size, month_size, day_size, HOURS_PER_DAY, len(name_values) * width + 1)
+    cells, cell_of_row = np.unique(
+        np.ravel_multi_index((types, months, days, hours, parties), shape), return_inverse=True
+    )
+    groups = len(cells)
+    order = np.argsort(cell_of_row, kind="stable")
+    starts = np.flatnonzero(np.diff(cell_of_row[order], prepend=-1))
+
+    type_code, month_code, day_code, hour, party = np.unravel_index(cells, shape)
+    # -1 takes a missing value
+    pair = np.where(party > 0, party - 1, -1)
+    cube = pd.DataFrame({
+        "Transaction_Type": pd.Categorical.from_codes(type_code - 1, dtype=data["Transaction_Type"].dtype),
+        "month_name": pd.Categorical.from_codes(month_code - 1, dtype=data["month_name"].dtype),
+        "day_name": pd.Categorical.from_codes(day_code - 1, dtype=data["day_name"].dtype),
+        "Hour": hour.astype(data["Hour"].dtype),
+        "names": name_values.take(np.where(pair >= 0, pair // width, -1), allow_fill=True),
+        "numbers": number_values.take(np.where(pair >= 0, pair % width, -1), allow_fill=True),
+        "count": np.bincount(cell_of_row, minlength=groups),
+    })
+
+    for column, prefix in CUBE_MEASURES.items():
+        values = data[column].to_numpy(dtype=np.int64)
+        nonzero = values != 0
+        cube[f"{prefix}_count"] = np.bincount(cell_of_row, weights=nonzero, minlength=groups).astype(np.int64)
+        # per-cell sums of cents are far below 2**53, float64 holds them exactly
+        cube[f"{prefix}_sum"] = np.rint(np.bincount(cell_of_row, weights=values, minlength=groups)).astype(np.int64)
+        cube[f"{prefix}_max"] = reduce_cells(values, order, starts, np.maximum)
+        lowest = reduce_cells(np.where(nonzero, values, NO_VALUE), order, starts, np.minimum)
+        cube[f"{prefix}_min_nonzero"] = pd.arrays.IntegerArray(lowest, lowest == NO_VALUE)
+    return cube
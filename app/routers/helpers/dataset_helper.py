@@ -0,0 +1,213 @@
+import collections
+import logging
+import os
+import re
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .cache_helper import CACHE_ROOT, DiskCache
+from .schema_helper import enforce_statement_schema, table_to_statement
+from .enrichment_helper import enrichment_stage
+from .export_helper import MONEY_UNIT_METADATA
+
+DATASET_DIR = os.getenv("DATASET_DIR", os.path.join(CACHE_ROOT, "datasets"))
+DATASET_DISK_MAX_BYTES = int(os.getenv("DATASET_DISK_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+# statements each worker keeps in memory, least recently used ones are dropped and reloaded from disk
+DATASET_MEMORY_BUDGET_BYTES = int(os.getenv("DATASET_MEMORY_BUDGET_BYTES", 512 * 1024 * 1024))
+
+# dataset ids end up in file names
+DATASET_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# parquet schema metadata key holding the snapshot version
+VERSION_METADATA_KEY = b"snapshot_version"
+
+
+def value_bytes(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    return 0
+
+
+class Snapshot:
+    """A published statement, never modified once published, and the values derived from it"""
+
+    def __init__(self, dataset_id: str, version: int, frame: pd.DataFrame):
+        self.dataset_id = dataset_id
+        self.version = version
+        self.frame = frame
+        self.frame.attrs.update(dataset_id=dataset_id, snapshot_version=version)
+        self.derived = {}
+        self.size = value_bytes(frame)
+
+    def view(self) -> pd.DataFrame:
+        """A frame for one request, sharing the snapshot's column buffers.
+
+        Assigning a column (frame[name] = ...) only changes the view. Code reading a view
+        must not write into an existing column in place (loc/iloc assignment, inplace=True).
+        """
+        return self.frame.copy(deep=False)
+
+
+class DatasetStore(DiskCache):
+    """Cleaned statements keyed by dataset id (the upload's task id).
+
+    Every statement is written to local disk when it is published, so any worker can serve it.
+    Each worker keeps the statements it has used recently in memory, up to memory_budget bytes,
+    and loads the others back from disk on access.
+
+    A published statement is an immutable snapshot with a version number. Columns derived from it
+    are computed once per snapshot version with derived() and kept alongside it, instead of being
+    written onto the shared frame by every request.
+    """
+
+    suffix = ".parquet"
+
+    def __init__(self, directory: str, max_bytes: int, memory_budget: int):
+        super().__init__(directory, max_bytes)
+        self.memory_budget = memory_budget
+        self.memory = collections.OrderedDict()
+        self.memory_bytes = 0
+
+        # earlier releases served the upload named here to requests without a dataset id
+        try:
+            os.remove(os.path.join(directory, "LATEST"))
+        except FileNotFoundError:
+            pass
+
+    def shrink(self):
+        """Drop the least recently used snapshots while over the budget, the newest one always stays"""
+        while self.memory_bytes > self.memory_budget and len(self.memory) > 1:
+            evicted_id, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= evicted.size
+            logging.info(f"Dropped dataset {evicted_id} from memory, it stays on disk")
+
+    def remember(self, snapshot: Snapshot):
+        """Keep a snapshot in memory, replacing older versions of the same dataset"""
+        with self.lock:
+            if snapshot.dataset_id in self.memory:
+                self.memory_bytes -= self.memory.pop(snapshot.dataset_id).size
+            self.memory[snapshot.dataset_id] = snapshot
+            self.memory_bytes += snapshot.size
+            self.shrink()
+
+    def put(self, dataset_id: str, mpesa_df: pd.DataFrame):
+        """Publish a statement as a new snapshot of its dataset"""
+        version = time.time_ns()
+        snapshot = Snapshot(dataset_id, version, mpesa_df.copy(deep=False))
+
+        table = pa.Table.from_pandas(snapshot.frame, preserve_index=False)
+        metadata = {**(table.schema.metadata or {}), **MONEY_UNIT_METADATA}
+        metadata[VERSION_METADATA_KEY] = str(version).encode()
+        table = table.replace_schema_metadata(metadata)
+        self.write(dataset_id, lambda path: pq.write_table(table, path))
+        self.remember(snapshot)
+        self.evict()
+
+    def snapshot(self, dataset_id: str) -> Snapshot | None:
+        """Return the snapshot of a dataset, None if unknown"""
+        if not dataset_id or not DATASET_ID_PATTERN.fullmatch(dataset_id):
+            return None
+
+        with self.lock:
+            snapshot = self.memory.get(dataset_id)
+            if snapshot is not None:
+                self.memory.move_to_end(dataset_id)
+        if snapshot is not None:
+            self.record(hit=True)
+            return snapshot
+
+        try:
+            table = pq.read_table(self.path(dataset_id))
+        except (FileNotFoundError, OSError, pa.ArrowInvalid):
+            self.record(hit=False)
+            return None
+
+        # a reload from disk counts as a miss of the in-memory layer
+        self.record(hit=False)
+        self.touch(dataset_id)
+        version = int((table.schema.metadata or {}).get(VERSION_METADATA_KEY, b"0"))
+        frame = table_to_statement(table)
+        if not set(enrichment_stage.columns).issubset(frame.columns):
+            # published before some derived columns existed, they are added once as it is loaded
+            frame = enforce_statement_schema(enrichment_stage.enrich(frame, missing_only=True))
+        snapshot = Snapshot(dataset_id, version, frame)
+        self.remember(snapshot)
+        return snapshot
+
+    def stored_file(self, snapshot: Snapshot):
+        """The snapshot's Parquet file opened for reading, None when the file on disk holds another
+        version or lacks columns added as it was loaded. An open file stays readable if it is evicted.
+        """
+        try:
+            stored = open(self.path(snapshot.dataset_id), "rb")
+        except FileNotFoundError:
+            return None
+
+        try:
+            schema = pq.read_schema(stored)
+            version = int((schema.metadata or {}).get(VERSION_METADATA_KEY, b"0"))
+        except (OSError, pa.ArrowInvalid, ValueError):
+            version = None
+        if version != snapshot.version or schema.names != snapshot.frame.columns.tolist():
+            stored.close()
+            return None
+
+        stored.seek(0)
+        return stored
+
+    def get(self, dataset_id: str) -> pd.DataFrame | None:
+        """Return a statement by dataset id, None if unknown.
+
+        The frame is the caller's view of the snapshot, see Snapshot.view().
+        """
+        snapshot = self.snapshot(dataset_id)
+        return snapshot.view() if snapshot is not None else None
+
+    def derived(self, data: pd.DataFrame, name: str, compute):
+        """Return compute(statement) for the snapshot data was read from, computed once per snapshot version.
+
+        data must be a frame returned by get(), or a frame derived from one, compute always runs on the
+        whole statement. Frames that are not from the store are computed on directly and not cached.
+        """
+        dataset_id = data.attrs.get("dataset_id")
+        version = data.attrs.get("snapshot_version")
+        snapshot = self.snapshot(dataset_id) if dataset_id else None
+        if snapshot is None or snapshot.version != version:
+            return compute(data)
+
+        if name in snapshot.derived:
+            value = snapshot.derived[name]
+        else:
+            # two requests may both compute it, they produce the same value
+            value = compute(snapshot.view())
+            size = value_bytes(value)
+            with self.lock:
+                if name not in snapshot.derived:
+                    snapshot.derived[name] = value
+                    snapshot.size += size
+                    if self.memory.get(dataset_id) is snapshot:
+                        self.memory_bytes += size
+                        self.shrink()
+
+        # like get(), hand out a view so columns the caller assigns do not end up in the cache
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return value.copy(deep=False)
+        return value
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self.lock:
+            stats.update({
+                "in_memory": len(self.memory),
+                "memory_bytes": self.memory_bytes,
+                "memory_budget": self.memory_budget,
+            })
+        return stats
+
+
+dataset_store = DatasetStore(DATASET_DIR, DATASET_DISK_MAX_BYTES, DATASET_MEMORY_BUDGET_BYTES)
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from .schema_helper import ARROW_STRING
+
+# Details as printed on M-Pesa statements: the transaction phrase, then the counterparty as a
+# paybill/till number or a masked phone, its name after " - " and an account after "Acc.", e.g.
+#   Pay Bill Online to 888880 - KPLC PREPAID Acc. 37211
+#   Customer Transfer to 2547******123 - JOHN DOE
+DETAILS_PATTERN = (
+    r"^(?P<phrase>.*?)\s*"
+    r"(?:(?:(?P<phone>\d+\*+\d+)|(?P<numbers>\d+))"
+    r"(?:\s*-\s*(?P<names>.*?))?"
+    r"(?:\s+Acc\.\s*(?P<account>.*?))?)?\s*$"
+)
+
+# columns parse_details adds to a statement, everything but the phrase is missing where not printed
+PARSED_COLUMNS = ["phrase", "numbers", "account", "phone", "names"]
+
+
+def parse_details(details: pd.Series) -> pd.DataFrame:
+    """Split Details into PARSED_COLUMNS, one RE2 pass over the distinct texts"""
+    codes, uniques = pd.factorize(details)
+    # a Details cell wrapped over lines in the PDF reads the same as on one line
+    texts = pc.utf8_trim_whitespace(
+        pc.replace_substring_regex(pa.array(uniques, type=pa.string()), r"\s+", " ")
+    )
+    fields = pc.extract_regex(texts, DETAILS_PATTERN)
+
+    # missing details have code -1 and take the extra null slot at the end
+    rows = np.where(codes < 0, len(uniques), codes)
+    parsed = {}
+    for name in PARSED_COLUMNS:
+        field = fields.field(name)
+        field = pc.if_else(pc.equal(field, ""), pa.scalar(None, field.type), field)
+        values = pa.concat_arrays([field, pa.nulls(1, field.type)]).take(rows)
+        parsed[name] = pd.Series(pd.array(values, dtype=ARROW_STRING), index=details.index)
+
+    parsed["phrase"] = parsed["phrase"].astype("category")
+    return pd.DataFrame(parsed)
+
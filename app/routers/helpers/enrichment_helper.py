@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+import pandas as pd
+from .categorization_helper import transaction_types
+from .financial_institutions_helper import bank_names, financial_service_keywords, mshwari_service_keywords
+from .details_helper import PARSED_COLUMNS, parse_details
+from .schema_helper import SAVE_OR_SPEND, TIME_OF_DAY
+
+# Details that mark a transaction as saving rather than spending
+SAVING_KEYWORDS = "M-Shwari Lock Deposit|Saving|savings|mmf|M-shwari Deposit|Sanlam"
+
+# part of the day a transaction falls in, by its hour: 5-11, 12-16, 17-20 and 21-4
+TIME_OF_DAY_BINS = [-1, 4, 11, 16, 20, 23]
+TIME_OF_DAY_LABELS = ["Night", "Morning", "Afternoon", "Evening", "Night"]
+
+
+class EnrichmentStage:
+    """The columns derived from a cleaned statement, each computed by a registered enricher.
+
+    An enricher takes the statement and returns its columns (a Series for one column, a DataFrame
+    for several). Enrichers run in registration order, so one may read the columns of an earlier one.
+    Each run is timed, the totals per enricher are kept for stats().
+    """
+
+    def __init__(self):
+        self.enrichers = []
+        self.lock = threading.Lock()
+        self.runs = {}
+        self.seconds = {}
+
+    def register(self, *columns: str):
+        """Decorator registering an enricher for the given columns"""
+        def decorator(function):
+            self.enrichers.append((function.__name__, list(columns), function))
+            return function
+        return decorator
+
+    @property
+    def columns(self) -> list[str]:
+        return [column for _, columns, _ in self.enrichers for column in columns]
+
+    def enrich(self, mpesa_df: pd.DataFrame, missing_only: bool = False) -> pd.DataFrame:
+        """Add every derived column to a statement, only those it does not have yet with missing_only"""
+        for name, columns, function in self.enrichers:
+            if missing_only and set(columns).issubset(mpesa_df.columns):
+                continue
+
+            start = time.perf_counter()
+            values = function(mpesa_df)
+            if isinstance(values, pd.Series):
+                mpesa_df[columns[0]] = values
+            else:
+                mpesa_df[columns] = values
+            elapsed = time.perf_counter() - start
+
+            with self.lock:
+                self.runs[name] = self.runs.get(name, 0) + 1
+                self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+            logging.info(f"Enricher {name}: {len(mpesa_df)} rows in {elapsed * 1000:.1f} ms")
+        return mpesa_df
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                name: {"columns": columns, "runs": self.runs.get(name, 0), "seconds": round(self.seconds.get(name, 0.0), 6)}
+                for name, columns, _ in self.enrichers
+            }
+
+
+enrichment_stage = EnrichmentStage()
+
+
+@enrichment_stage.register("month_name", "day_name", "Hour")
+def calendar_columns(mpesa_df: pd.DataFrame) -> pd.DataFrame:
+    times = mpesa_df["Completion Time"]
+    return pd.DataFrame({
+        "month_name": times.dt.month_name(),
+        "day_name": times.dt.day_name(),
+        "Hour": times.dt.hour,
+    }, index=mpesa_df.index)
+
+
+@enrichment_stage.register("Transaction_Type")
+def transaction_type(mpesa_df: pd.DataFrame) -> pd.Series:
+    # each distinct Details is classified once, the last phrase found wins
+    return transaction_types.classify(mpesa_df["Details"])
+
+
+@enrichment_stage.register("Bank")
+def bank(mpesa_df: pd.DataFrame) -> pd.Series:
+    # canonical bank name, missing for non-bank transactions
+    return bank_names.classify(mpesa_df["Details"])
+
+
+@enrichment_stage.register("Financial_Service")
+def financial_service(mpesa_df: pd.DataFrame) -> pd.Series:
+    return financial_service_keywords.classify(mpesa_df["Details"])
+
+
+@enrichment_stage.register("Mshwari_Service")
+def mshwari_service(mpesa_df: pd.DataFrame) -> pd.Series:
+    return mshwari_service_keywords.classify(mpesa_df["Details"])
+
+
+@enrichment_stage.register(*PARSED_COLUMNS)
+def counterparty(mpesa_df: pd.DataFrame) -> pd.DataFrame:
+    return parse_details(mpesa_df["Details"])
+
+
+@enrichment_stage.register("amount")
+def amount(mpesa_df: pd.DataFrame) -> pd.Series:
+    # one side of a transaction is always 0, in cents like the columns it comes from
+    return mpesa_df["Paid In"] + mpesa_df["Withdrawn"]
+
+
+@enrichment_stage.register("save/spend")
+def save_or_spend(mpesa_df: pd.DataFrame) -> pd.Series:
+    saving = mpesa_df["Details"].str.contains(SAVING_KEYWORDS, case=False, regex=True, na=False)
+    return pd.Series(
+        pd.Categorical.from_codes((~saving).astype("int8"), dtype=SAVE_OR_SPEND),
+        index=mpesa_df.index,
+    )
+
+
+@enrichment_stage.register("time_day")
+def time_of_day(mpesa_df: pd.DataFrame) -> pd.Series:
+    buckets = pd.cut(mpesa_df["Hour"], TIME_OF_DAY_BINS, labels=TIME_OF_DAY_LABELS, ordered=False)
+    return buckets.astype(TIME_OF_DAY)
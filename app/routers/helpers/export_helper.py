@@ -0,0 +1,113 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from .schema_helper import to_kes
+
+# export format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "csv": ("text/csv", "csv"),
+}
+
+# rows written per Arrow record batch, CSV block or Parquet row group
+EXPORT_BATCH_ROWS = 64 * 1024
+
+# bytes read per chunk when a stored file is sent as it is
+FILE_CHUNK_BYTES = 1024 * 1024
+
+EXPORT_WRITE_OPTIONS = pa.ipc.IpcWriteOptions(compression="zstd")
+
+# Arrow and Parquet exports keep money columns as stored, in int64 cents, and say so in their metadata
+MONEY_UNIT_METADATA = {b"money_unit": b"cents"}
+
+
+class ChunkSink:
+    """File-like target for a pyarrow writer, what it has written is taken out chunk by chunk"""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def statement_table(mpesa_df: pd.DataFrame) -> pa.Table:
+    """A statement as an Arrow table, sharing the frame's buffers where the types allow"""
+    table = pa.Table.from_pandas(mpesa_df, preserve_index=False)
+    return table.replace_schema_metadata({**(table.schema.metadata or {}), **MONEY_UNIT_METADATA})
+
+
+def arrow_chunks(table: pa.Table):
+    """The table as an Arrow IPC stream, one record batch at a time"""
+    sink = ChunkSink()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), table.schema, options=EXPORT_WRITE_OPTIONS) as writer:
+        for batch in table.to_batches(max_chunksize=EXPORT_BATCH_ROWS):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def parquet_chunks(table: pa.Table):
+    """The table as a Parquet file, one row group at a time"""
+    sink = ChunkSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), table.schema, compression="zstd") as writer:
+        for batch in table.to_batches(max_chunksize=EXPORT_BATCH_ROWS):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def csv_chunks(table: pa.Table):
+    """The table as CSV, one block of rows at a time, times to the second like the statement prints them"""
+    schema = pa.schema([
+        field.with_type(pa.timestamp("s")) if pa.types.is_timestamp(field.type) else field
+        for field in table.schema
+    ])
+    table = table.cast(schema, safe=False)
+
+    sink = ChunkSink()
+    with pa_csv.CSVWriter(pa.PythonFile(sink, mode="w"), table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=EXPORT_BATCH_ROWS):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def file_chunks(stored_file):
+    """An open file, read and sent as it is"""
+    with stored_file:
+        while chunk := stored_file.read(FILE_CHUNK_BYTES):
+            yield chunk
+
+
+def export_chunks(mpesa_df: pd.DataFrame, format: str, stored_file=None):
+    """A statement in one of EXPORT_FORMATS, written straight from its column buffers.
+
+    A Parquet export sends stored_file, the snapshot's own file, when there is one.
+    """
+    if format == "parquet" and stored_file is not None:
+        return file_chunks(stored_file)
+
+    if format == "csv":
+        # a CSV file has no metadata to carry the unit, its amounts are in KES like the JSON responses
+        return csv_chunks(pa.Table.from_pandas(to_kes(mpesa_df), preserve_index=False))
+
+    table = statement_table(mpesa_df)
+    if format == "parquet":
+        return parquet_chunks(table)
+    return arrow_chunks(table)
@@ -0,0 +1,439 @@
+import concurrent.futures
+import io
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from typing import NamedTuple
+import pandas as pd
+import tabula
+from .pdf_helper import StatementDocument
+from .cache_helper import page_cache
+
+# Column layout of the M-Pesa "Detailed Statement" table
+STATEMENT_COLUMNS = [
+    "Receipt No.",
+    "Completion Time",
+    "Details",
+    "Transaction Status",
+    "Paid In",
+    "Withdrawn",
+    "Balance",
+]
+
+# first word of every header label, in column order
+HEADER_KEYWORDS = ["receipt", "completion", "details", "transaction", "paid", "withdrawn", "balance"]
+
+# money columns are right aligned, everything else is left aligned
+RIGHT_ALIGNED_COLUMNS = {"Paid In", "Withdrawn", "Balance"}
+
+RECEIPT_PATTERN = re.compile(r"^[A-Z0-9]{10}$")
+MONEY_PATTERN = re.compile(r"^-?[\d,]+\.\d{2}$")
+
+# words whose tops are this close (in points) belong to the same line
+LINE_TOLERANCE = 3
+# a line further than this many line heights below the previous one ends the table (page footer)
+MAX_LINE_GAP = 2.5
+# how far (in points) a right aligned number may sit from its header's right edge
+RIGHT_ALIGN_TOLERANCE = 40
+
+DEFAULT_ENGINE = os.getenv("PDF_EXTRACTION_ENGINE", "native")
+
+# bump whenever the native extractor changes, so cached pages from older versions are not reused
+EXTRACTOR_VERSION = 1
+
+# tiny statement bundled with the app, extracted once per worker to warm up both engines
+WARMUP_PDF_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "assets", "warmup_statement.pdf")
+TABULA_WARMUP = os.getenv("TABULA_WARMUP", "1") != "0"
+
+# page-parallel extraction for the native engine, pages are handed out in runs of PDF_PAGES_PER_CHUNK
+EXTRACTION_PROCESSES = int(os.getenv("PDF_EXTRACTION_PROCESSES", min(4, os.cpu_count() or 1)))
+PAGES_PER_CHUNK = int(os.getenv("PDF_PAGES_PER_CHUNK", "4"))
+
+# created lazily, one pool per worker
+process_pool = None
+
+# set once the worker has finished warming up, tabula is unavailable only if its warm-up failed
+engine_ready = threading.Event()
+tabula_available = False
+
+
+class ColumnLayout(NamedTuple):
+    """Left and right edges of every header label, in column order"""
+    x0: list[float]
+    x1: list[float]
+
+
+class PageTable(NamedTuple):
+    """Rows extracted from a single page of the statement"""
+    rows: list[list[str | None]]
+    # wrapped cell fragments at the top of the page that belong to the last row of the previous page
+    continuation: list[list[str | None]]
+    layout: ColumnLayout | None
+    # whether the layout came from this page's own header row
+    has_header: bool = False
+
+
+def group_lines(words: list[dict]) -> list[list[dict]]:
+    """Group words into text lines, top to bottom and left to right"""
+    lines = []
+    for word in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        if lines and word["top"] - lines[-1][0]["top"] <= LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+
+    return [sorted(line, key=lambda w: w["x0"]) for line in lines]
+
+
+def find_column_layout(lines: list[list[dict]]) -> tuple[ColumnLayout | None, int]:
+    """Locate the table header and return its column layout and the index of the first line below it"""
+    for index, line in enumerate(lines):
+        texts = [word["text"].lower() for word in line]
+        if not all(keyword in texts for keyword in HEADER_KEYWORDS):
+            continue
+
+        x0 = []
+        for keyword in HEADER_KEYWORDS:
+            word = next(w for w in line if w["text"].lower() == keyword and (not x0 or w["x0"] > x0[-1]))
+            x0.append(word["x0"])
+
+        # header labels may wrap onto a second line ("Receipt" / "No.")
+        header_words = list(line)
+        first_row = index + 1
+        line_height = line[0]["bottom"] - line[0]["top"]
+        if first_row < len(lines):
+            next_line = lines[first_row]
+            is_receipt = any(RECEIPT_PATTERN.match(w["text"]) for w in next_line)
+            if not is_receipt and next_line[0]["top"] - line[0]["bottom"] < line_height:
+                header_words.extend(next_line)
+                first_row += 1
+
+        x1 = []
+        for i, left in enumerate(x0):
+            right = x0[i + 1] if i + 1 < len(x0) else float("inf")
+            x1.append(max(w["x1"] for w in header_words if left <= w["x0"] < right))
+
+        return ColumnLayout(x0, x1), first_row
+
+    return None, 0
+
+
+def assign_column(word: dict, layout: ColumnLayout) -> int:
+    """Return the index of the column a word falls into"""
+    # right aligned numbers line up with the right edge of their header
+    if MONEY_PATTERN.match(word["text"]):
+        candidates = [
+            (abs(word["x1"] - layout.x1[i]), i)
+            for i, column in enumerate(STATEMENT_COLUMNS)
+            if column in RIGHT_ALIGNED_COLUMNS
+        ]
+        distance, index = min(candidates)
+        if distance <= RIGHT_ALIGN_TOLERANCE:
+            return index
+
+    # left aligned text starts at (or just after) the left edge of its header
+    column = 0
+    for i, left in enumerate(layout.x0):
+        if STATEMENT_COLUMNS[i] in RIGHT_ALIGNED_COLUMNS:
+            # anything past the status column that is not a number stays with the status text
+            break
+        if word["x0"] >= left - LINE_TOLERANCE:
+            column = i
+
+    return column
+
+
+def line_cells(line: list[dict], layout: ColumnLayout) -> list[str | None]:
+    """Split a text line into the statement columns"""
+    cells = [[] for _ in STATEMENT_COLUMNS]
+    for word in line:
+        cells[assign_column(word, layout)].append(word["text"])
+
+    return [" ".join(cell) if cell else None for cell in cells]
+
+
+def merge_cells(row: list[str | None], fragment: list[str | None]):
+    """Append a wrapped line to the row it belongs to"""
+    for i, text in enumerate(fragment):
+        if text:
+            row[i] = f"{row[i]} {text}" if row[i] else text
+
+
+def extract_page_table(words: list[dict], layout: ColumnLayout | None = None) -> PageTable:
+    """Extract the detailed statement rows from the words of a single page.
+
+    Pages without their own header row reuse the layout of a previous page.
+    """
+    lines = group_lines(words)
+    page_layout, first_row = find_column_layout(lines)
+    if page_layout is not None:
+        layout = page_layout
+    if layout is None:
+        return PageTable([], [], None, False)
+
+    rows = []
+    continuation = []
+    previous_bottom = lines[first_row - 1][-1]["bottom"] if first_row else None
+
+    for line in lines[first_row:]:
+        top = min(w["top"] for w in line)
+        line_height = max(w["bottom"] - w["top"] for w in line)
+        if previous_bottom is not None and top - previous_bottom > MAX_LINE_GAP * line_height:
+            # the table has ended, whatever follows is the page footer
+            break
+        previous_bottom = max(w["bottom"] for w in line)
+
+        cells = line_cells(line, layout)
+        receipt = cells[0]
+        if receipt and RECEIPT_PATTERN.match(receipt):
+            rows.append(cells)
+        elif rows:
+            merge_cells(rows[-1], cells)
+        else:
+            continuation.append(cells)
+
+    return PageTable(rows, continuation, layout, page_layout is not None)
+
+
+def stitch_page_tables(tables: list[PageTable]) -> pd.DataFrame:
+    """Merge per page results in page order, joining rows that wrap across page breaks"""
+    rows = []
+    for table in tables:
+        if rows:
+            for fragment in table.continuation:
+                merge_cells(rows[-1], fragment)
+        rows.extend([list(row) for row in table.rows])
+
+    return pd.DataFrame(rows, columns=STATEMENT_COLUMNS)
+
+
+def extract_document_pages(document: StatementDocument, page_numbers: list[int], on_page=None) -> list[PageTable]:
+    """Extract a run of consecutive pages of an open document, calling on_page() after each one"""
+    tables = []
+    layout = None
+    for number in page_numbers:
+        table = extract_page_table(document.page_words(number), layout)
+        layout = table.layout
+        tables.append(table)
+        if on_page:
+            on_page()
+
+    return tables
+
+
+def extract_page_range(content: bytes, password: str | None, page_numbers: list[int]) -> list[PageTable]:
+    """Unit of work of the process pool: open the original upload and extract a run of pages"""
+    with StatementDocument(content, password) as document:
+        return extract_document_pages(document, page_numbers)
+
+
+def get_process_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """Return the worker's extraction pool, spawning it on first use"""
+    global process_pool
+    if process_pool is None:
+        # spawn, not fork: the parent holds threads (and possibly a JVM) that must not be copied
+        process_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=EXTRACTION_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    return process_pool
+
+
+def shutdown_process_pool():
+    global process_pool
+    if process_pool is not None:
+        process_pool.shutdown(cancel_futures=True)
+        process_pool = None
+
+
+def fill_missing_layouts(tables: list[PageTable], document: StatementDocument) -> list[PageTable]:
+    """Re-extract pages that had no header of their own and started a chunk.
+
+    Such pages could not know the column layout inside the pool, so they are redone
+    here with the layout of the page before them.
+    """
+    layout = None
+    for number, table in enumerate(tables):
+        if table.layout is None and layout is not None:
+            table = extract_page_table(document.page_words(number), layout)
+            tables[number] = table
+        layout = table.layout or layout
+
+    return tables
+
+
+def page_cache_key(document: StatementDocument, number: int) -> str:
+    return f"{document.page_fingerprint(number)}-v{EXTRACTOR_VERSION}"
+
+
+def load_cached_page(key: str) -> PageTable | None:
+    entry = page_cache.get(key)
+    if entry is None:
+        return None
+
+    layout = ColumnLayout(*entry["layout"]) if entry["layout"] else None
+    return PageTable(entry["rows"], entry["continuation"], layout, entry["has_header"])
+
+
+def store_cached_page(key: str, table: PageTable):
+    # a page without its own header was read with a borrowed layout, so its rows depend on more than its content
+    if not table.has_header:
+        return
+
+    page_cache.put(key, {
+        "rows": table.rows,
+        "continuation": table.continuation,
+        "layout": list(table.layout),
+        "has_header": table.has_header,
+    })
+
+
+def consecutive_chunks(page_numbers: list[int], chunk_size: int | None = None) -> list[list[int]]:
+    """Split page numbers into runs of consecutive pages, at most chunk_size long"""
+    chunks = []
+    for number in page_numbers:
+        if chunks and number == chunks[-1][-1] + 1 and (chunk_size is None or len(chunks[-1]) < chunk_size):
+            chunks[-1].append(number)
+        else:
+            chunks.append([number])
+
+    return chunks
+
+
+def extract_tables_native(document: StatementDocument, progress_callback=None) -> list[pd.DataFrame]:
+    """Extract the statement table from the PDFium word layer, no JVM involved.
+
+    Pages seen in an earlier upload come from the page cache. The remaining pages are
+    split into runs and, for long statements, extracted in the process pool. Everything
+    is merged back in page order. progress_callback(done, total) is called as pages finish.
+    """
+    page_count = document.page_count
+    keys = [page_cache_key(document, number) for number in range(page_count)]
+    tables = [load_cached_page(key) for key in keys]
+
+    missing = [number for number, table in enumerate(tables) if table is None]
+    pages_done = page_count - len(missing)
+
+    def report(pages: int = 1):
+        nonlocal pages_done
+        pages_done += pages
+        if progress_callback:
+            progress_callback(pages_done, page_count)
+
+    # cached pages count as done straight away
+    report(0)
+
+    chunks = consecutive_chunks(missing, PAGES_PER_CHUNK)
+    if EXTRACTION_PROCESSES > 1 and len(chunks) > 1:
+        # workers get the original upload and the password, never a re-serialized copy
+        pool = get_process_pool()
+        futures = {
+            pool.submit(extract_page_range, document.content, document.password, chunk): chunk
+            for chunk in chunks
+        }
+        results = {}
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                chunk = futures[future]
+                results[chunk[0]] = future.result()
+                report(len(chunk))
+        except BaseException:
+            # e.g. the job was cancelled from the progress callback: drop the chunks not started yet
+            for future in futures:
+                future.cancel()
+            raise
+        results = [results[chunk[0]] for chunk in chunks]
+    else:
+        chunks = consecutive_chunks(missing)
+        results = [extract_document_pages(document, chunk, report) for chunk in chunks]
+
+    for chunk, chunk_tables in zip(chunks, results):
+        for number, table in zip(chunk, chunk_tables):
+            tables[number] = table
+            store_cached_page(keys[number], table)
+
+    if missing:
+        page_cache.evict()
+
+    tables = fill_missing_layouts(tables, document)
+
+    mpesa_df = stitch_page_tables(tables)
+    return [mpesa_df] if not mpesa_df.empty else []
+
+
+def extract_tables_tabula(document: StatementDocument, progress_callback=None) -> list[pd.DataFrame]:
+    """Extract every table in the document with tabula (generic table detection on the JVM)"""
+    # tabula reads the whole document in one call, so progress jumps straight to all pages
+    # tabula decrypts the original upload itself, BytesIO shares the uploaded bytes without copying
+    # jpype keeps one JVM inside the worker process instead of spawning java per call
+    tables = tabula.read_pdf(
+        io.BytesIO(document.content),
+        pages='all',
+        password=document.password if document.is_encrypted else None,
+        force_subprocess=False,
+    )
+    if progress_callback:
+        progress_callback(document.page_count, document.page_count)
+
+    return tables
+
+
+EXTRACTION_ENGINES = {
+    "native": extract_tables_native,
+    "tabula": extract_tables_tabula,
+}
+
+
+def extract_tables(document: StatementDocument, engine: str | None = None, progress_callback=None) -> list[pd.DataFrame]:
+    """Extract the statement tables with the selected engine, reporting progress_callback(pages_done, page_count)"""
+    engine = engine or DEFAULT_ENGINE
+    if engine not in EXTRACTION_ENGINES:
+        raise ValueError(f"Unknown extraction engine '{engine}', expected one of {sorted(EXTRACTION_ENGINES)}")
+
+    return EXTRACTION_ENGINES[engine](document, progress_callback)
+
+
+def warm_up_engines():
+    """Boot the in-process JVM and run a warm-up extraction on the bundled statement.
+
+    Runs once per worker at startup; the worker reports not-ready until it returns.
+    """
+    global tabula_available
+    try:
+        with open(WARMUP_PDF_PATH, "rb") as pdf_file:
+            warmup_pdf = pdf_file.read()
+
+        with StatementDocument(warmup_pdf) as document:
+            extract_tables_native(document)
+
+        if EXTRACTION_PROCESSES > 1:
+            # start the pool processes now rather than on the first long statement
+            pool = get_process_pool()
+            warmups = [pool.submit(extract_page_range, warmup_pdf, None, [0]) for _ in range(EXTRACTION_PROCESSES)]
+            concurrent.futures.wait(warmups)
+
+        if TABULA_WARMUP:
+            try:
+                with StatementDocument(warmup_pdf) as document:
+                    extract_tables_tabula(document)
+                tabula_available = True
+                logging.info("Tabula JVM warmed up")
+            except Exception as e:
+                logging.error(f"Tabula warm-up failed: {e}")
+        else:
+            # the JVM boots on the first tabula extraction instead
+            tabula_available = True
+            logging.info("Tabula warm-up skipped, the JVM starts on first use")
+    finally:
+        engine_ready.set()
+
+
+def is_ready(engine: str | None = None) -> bool:
+    """Whether the worker can serve uploads with an engine, its default engine when none is given"""
+    if not engine_ready.is_set():
+        return False
+
+    return (engine or DEFAULT_ENGINE) != "tabula" or tabula_available
@@ -0,0 +1,146 @@
+import pandas as pd
+from .categorization_helper import PhraseTable
+
+banks_in_kenya = [
+    "Kenya Commercial Bank", "KCB", "KCB Bank",
+    "Equity Bank Kenya", "Equity Bank", "Equity",
+    "Cooperative Bank of Kenya", "Co-op Bank", "Coop Bank",
+    "Absa Bank Kenya", "Absa", 
+    "Standard Chartered Bank Kenya", "Standard Chartered", "StanChart",
+    "NCBA Bank Kenya", "NCBA", 
+    "Diamond Trust Bank Kenya", "Diamond Trust Bank", "DTB",
+    "I&M Bank Kenya", "I&M Bank", "I&M",
+    "Stanbic Bank Kenya", "Stanbic",
+    "Family Bank Kenya", "Family Bank", 
+    "National Bank of Kenya", "National Bank", "NBK",
+    "Bank of Africa Kenya", "Bank of Africa", "BOA",
+    "CitiBank Kenya", "CitiBank", "Citi",
+    "Housing Finance Group Kenya", "HF Group", "HF",
+    "Prime Bank Kenya", "Prime Bank",
+    "Spire Bank Kenya", "Spire Bank",
+    "Gulf African Bank", "Gulf Bank", 
+    "Credit Bank Kenya", "Credit Bank",
+    "First Community Bank", "FCB",
+    "Victoria Commercial Bank", "Victoria Bank",
+    "Consolidated Bank of Kenya", "Consolidated Bank",
+    "SBM Bank Kenya", "SBM",
+    "Ecobank Kenya", "Ecobank",
+    "Guaranty Trust Bank Kenya", "GT Bank", "GTB",
+    "Sidian Bank Kenya", "Sidian Bank",
+    "Mayfair CIB Bank Kenya", "Mayfair Bank",
+    "UBA Kenya Bank", "United Bank for Africa", "UBA",
+    "ABC Bank Kenya", "ABC Bank",
+    "Transnational Bank Kenya", "Transnational Bank"
+]
+
+banks_in_kenya_grouped = {
+    "Kenya Commercial Bank": "KCB",
+    "KCB": "KCB", 
+    "KCB Bank": "KCB",
+    "Equity Bank Kenya": "Equity", 
+    "Equity Bank": "Equity", 
+    "Equity": "Equity",
+    "Cooperative Bank of Kenya": "Co-op Bank", 
+    "Co-op Bank":  "Co-op Bank", 
+    "Coop Bank":  "Co-op Bank",
+    "Absa Bank Kenya":  "Absa", 
+    "Absa":  "Absa", 
+    "Standard Chartered Bank Kenya": "StanChart", 
+    "Standard Chartered": "StanChart", 
+    "StanChart": "StanChart",
+    "NCBA Bank Kenya":   "NCBA", 
+    "NCBA":   "NCBA", 
+    "Diamond Trust Bank Kenya": "DTB", 
+    "Diamond Trust Bank": "DTB", 
+    "DTB": "DTB",
+    "I&M Bank Kenya":  "I&M", 
+    "I&M Bank":  "I&M", 
+    "I&M":  "I&M",
+    "Stanbic Bank Kenya": "Stanbic", 
+    "Stanbic": "Stanbic",
+    "Family Bank Kenya": "Family Bank", 
+    "Family Bank": "Family Bank", 
+    "National Bank of Kenya":  "National Bank", 
+    "National Bank":  "National Bank", 
+    "NBK":  "National Bank",
+    "Bank of Africa Kenya": "Bank of Africa", 
+    "Bank of Africa": "Bank of Africa", 
+    "BOA": "Bank of Africa",
+    "CitiBank Kenya": "CitiBank", 
+    "CitiBank": "CitiBank", 
+    "Citi": "CitiBank",
+    "Housing Finance Group Kenya": "HF Group", 
+    "HF Group": "HF Group", 
+    "HF": "HF Group",
+    "Prime Bank Kenya":  "Prime Bank", 
+    "Prime Bank":  "Prime Bank",
+    "Spire Bank Kenya": "Spire Bank", 
+    "Spire Bank": "Spire Bank",
+    "Gulf African Bank":  "Gulf Bank", 
+    "Gulf Bank":  "Gulf Bank", 
+    "Credit Bank Kenya":  "Credit Bank", 
+    "Credit Bank":  "Credit Bank",
+    "First Community Bank":   "First Community Bank", 
+    "FCB":   "First Community Bank",
+    "Victoria Commercial Bank": "Victoria Bank", 
+    "Victoria Bank": "Victoria Bank",
+    "Consolidated Bank of Kenya": "Consolidated Bank", 
+    "Consolidated Bank": "Consolidated Bank",
+    "SBM Bank Kenya": "SBM Bank Kenya", 
+    "SBM": "SBM Bank Kenya",
+    "Ecobank Kenya": "Ecobank", 
+    "Ecobank": "Ecobank",
+    "Guaranty Trust Bank Kenya": "GT Bank", 
+    "GT Bank": "GT Bank", 
+    "GTB" : "GT Bank",
+    "Sidian Bank Kenya": "Sidian Bank", 
+    "Sidian Bank": "Sidian Bank",
+    "Mayfair CIB Bank Kenya": "Mayfair Bank", 
+    "Mayfair Bank": "Mayfair Bank",
+    "UBA Kenya Bank": "UBA Kenya Bank", 
+    "United Bank for Africa": "UBA Kenya Bank", 
+    "UBA": "UBA Kenya Bank",
+    "ABC Bank Kenya": "ABC Bank", 
+    "ABC Bank": "ABC Bank",
+    "Transnational Bank Kenya": "Transnational Bank", 
+    "Transnational Bank": "Transnational Bank"
+}
+
+# Bank of each transaction under its canonical name, tagged once at ingestion
+bank_names = PhraseTable(banks_in_kenya_grouped)
+
+safaricom_financial_services = {
+    "M-Shwari":"MShwari", 
+    "KCB M-Pesa":"KCB Mpesa",
+    "Fuliza" :"M-Pesa Fuliza", 
+    "M-Pesa Global" :"Global M-Pesa",
+    "H- Fund":"HustlerFund"
+}
+
+# Keyword tables, the last keyword found in a row's Details wins, rows matching none are left missing
+financial_service_keywords = PhraseTable({service: service for service in safaricom_financial_services})
+mshwari_service_keywords = PhraseTable({service: service for service in ["M-Shwari", "MShwari"]})
+
+
+def bank_report(data: pd.DataFrame) -> pd.DataFrame:
+    """Every bank metric in one groupby, one row per bank with amounts in cents.
+
+    Counts, minimums and maximums cover the transactions with a non-zero amount on that side,
+    the lowest amounts leave out the zero of the other side.
+    """
+    # nullable integers keep the cents exact where the other side's zeros are masked out
+    received = data['Paid In'].astype('Int64').where(data['Paid In'] != 0)
+    sent = data['Withdrawn'].astype('Int64').where(data['Withdrawn'] != 0)
+    amounts = pd.DataFrame({"Bank": data['Bank'], "received": received, "sent": sent})
+
+    report = amounts.groupby('Bank', observed=True).agg(
+        received_count=('received', 'count'),
+        received_total=('received', 'sum'),
+        received_min=('received', 'min'),
+        received_max=('received', 'max'),
+        sent_count=('sent', 'count'),
+        sent_total=('sent', 'sum'),
+        sent_min=('sent', 'min'),
+        sent_max=('sent', 'max'),
+    )
+    return report
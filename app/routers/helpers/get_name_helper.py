@@ -1,22 +1,70 @@
-import pdfplumber as pr
 import re
 
-def extract_client_name(pdf_file):
-    with pr.open(pdf_file) as pdf:
-        text = ""
-        for page in pdf.pages:
-            extracted_text = page.extract_text()
-            if extracted_text:
-                text += extracted_text + "\n"
-
-    # Extract customer name and mobile number using regex
-    name_match = re.search(r"Customer Name:\s+(.+)", text)
-    number_match = re.search(r"Mobile Number:\s+(\d+)", text)
-
-    customer_name = name_match.group(1) if name_match else "Not Found"
-    mobile_number = number_match.group(1) if number_match else "Not Found"
-
-    return {
-        'customer_name': customer_name,
-        'mobile_number': mobile_number
-    }
\ No newline at end of file
+HEADER_PATTERNS = {
+    'customer_name': re.compile(r"Customer Name:[ \t]*(.+)"),
+    'mobile_number': re.compile(r"Mobile Number:[ \t]*(\d+)"),
+    'email': re.compile(r"Email Address:[ \t]*(\S+@\S+)"),
+    'statement_period': re.compile(r"Statement Period:[ \t]*(.+)"),
+    'request_date': re.compile(r"Request Date:[ \t]*(.+)"),
+}
+
+# a row of the SUMMARY table: transaction type followed by the paid in and paid out totals
+SUMMARY_ROW_PATTERN = re.compile(r"^(?P<transaction_type>[A-Za-z][A-Za-z &/:\-]*?)\s+(?P<paid_in>-?[\d,]+\.\d{2})\s+(?P<paid_out>-?[\d,]+\.\d{2})$")
+
+# these fields must be found before the parser stops reading pages
+REQUIRED_FIELDS = ['customer_name', 'mobile_number']
+
+# pages read at most while looking for them, the header is printed at the top of the statement
+HEADER_PAGES = 2
+
+
+def parse_summary_table(text: str) -> list[dict]:
+    """Parse the SUMMARY table of totals that sits above the detailed statement"""
+    summary = []
+    in_summary = False
+    for line in text.splitlines():
+        line = line.strip()
+        if line.upper() == "SUMMARY":
+            in_summary = True
+            continue
+        if not in_summary:
+            continue
+        if line.upper().startswith("DETAILED STATEMENT"):
+            break
+
+        match = SUMMARY_ROW_PATTERN.match(line)
+        if match:
+            summary.append({
+                'transaction_type': match.group('transaction_type').rstrip(':'),
+                'paid_in': float(match.group('paid_in').replace(',', '')),
+                'paid_out': float(match.group('paid_out').replace(',', '')),
+            })
+
+    return summary
+
+
+def extract_statement_header(document) -> dict:
+    """Parse the statement header from an open StatementDocument.
+
+    The header lives on the first page, later ones are only read while a required field is missing,
+    and never past HEADER_PAGES, so a statement without a header is not read to its end.
+    """
+    header = {field: None for field in HEADER_PATTERNS}
+    header['summary'] = []
+
+    for number in range(min(document.page_count, HEADER_PAGES)):
+        text = document.page_text(number)
+
+        for field, pattern in HEADER_PATTERNS.items():
+            if header[field] is None:
+                match = pattern.search(text)
+                if match:
+                    header[field] = match.group(1).strip()
+
+        if not header['summary']:
+            header['summary'] = parse_summary_table(text)
+
+        if all(header[field] is not None for field in REQUIRED_FIELDS):
+            break
+
+    return header
\ No newline at end of file
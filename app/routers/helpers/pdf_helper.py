@@ -0,0 +1,109 @@
+import hashlib
+import threading
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+from fastapi import HTTPException
+
+# PDFium is not thread-safe: every call into it from this process goes through this lock
+pdfium_lock = threading.RLock()
+
+# a gap wider than this fraction of the line height splits two words even without a space
+WORD_GAP_RATIO = 0.5
+
+
+class StatementDocument:
+    """A statement opened and decrypted once, shared by the header parser and the table extractor.
+
+    PDFium reads straight from the uploaded bytes, so nothing is re-written or copied,
+    and an unencrypted file is simply opened as is.
+    """
+
+    def __init__(self, content: bytes, password: str | None = None):
+        self.content = content
+        self.password = password or None
+
+        with pdfium_lock:
+            try:
+                self.pdf = pdfium.PdfDocument(content, password=self.password)
+            except pdfium.PdfiumError as e:
+                if "password" in str(e).lower():
+                    raise HTTPException(status_code=401, detail="Incorrect PDF password. Please check your password and try again.")
+                raise
+
+            self.page_count = len(self.pdf)
+            # -1 means the file has no security handler, i.e. it is not encrypted
+            self.is_encrypted = pdfium_c.FPDF_GetSecurityHandlerRevision(self.pdf) != -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with pdfium_lock:
+            self.pdf.close()
+
+    def page_text(self, number: int) -> str:
+        """Plain text of a page, one text line per line"""
+        with pdfium_lock:
+            page = self.pdf[number]
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_bounded()
+            finally:
+                textpage.close()
+                page.close()
+
+        return text.replace("\r\n", "\n")
+
+    def page_fingerprint(self, number: int) -> str:
+        """Hash of a page's text and of the boxes its text runs are drawn in.
+
+        PDFium does not expose raw content streams, this covers the same ground for table
+        extraction (what is written and where) and is computed entirely inside PDFium.
+        """
+        with pdfium_lock:
+            page = self.pdf[number]
+            textpage = page.get_textpage()
+            try:
+                digest = hashlib.sha256(textpage.get_text_bounded().encode())
+                for index in range(textpage.count_rects()):
+                    digest.update(("%.2f,%.2f,%.2f,%.2f;" % textpage.get_rect(index)).encode())
+            finally:
+                textpage.close()
+                page.close()
+
+        return digest.hexdigest()
+
+    def page_words(self, number: int) -> list[dict]:
+        """Words of a page with their boxes, measured from the top left corner like pdfplumber"""
+        words = []
+        with pdfium_lock:
+            page = self.pdf[number]
+            textpage = page.get_textpage()
+            try:
+                height = page.get_height()
+                current = None
+                for index in range(textpage.count_chars()):
+                    char = chr(pdfium_c.FPDFText_GetUnicode(textpage, index))
+                    if char.isspace():
+                        current = None
+                        continue
+
+                    # the loose box spans the font's ascent and descent, so it is the same for every glyph on a line
+                    left, bottom, right, top = textpage.get_charbox(index, loose=True)
+                    top, bottom = height - top, height - bottom
+                    gap_limit = (bottom - top) * WORD_GAP_RATIO
+                    if current is not None and abs(top - current["top"]) < 1 and abs(left - current["x1"]) <= gap_limit:
+                        current["text"] += char
+                        current["x1"] = right
+                    else:
+                        current = {"text": char, "x0": left, "x1": right, "top": top, "bottom": bottom}
+                        words.append(current)
+            finally:
+                textpage.close()
+                page.close()
+
+        return words
+
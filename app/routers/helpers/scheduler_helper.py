@@ -0,0 +1,171 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+
+MAX_CONCURRENT_JOBS = int(os.getenv("UPLOAD_MAX_CONCURRENT_JOBS", "2"))
+MAX_QUEUED_JOBS = int(os.getenv("UPLOAD_MAX_QUEUED_JOBS", "20"))
+
+# uploads up to this size go to the fast lane, so they are not stuck behind a 100 page statement
+SMALL_STATEMENT_BYTES = int(os.getenv("UPLOAD_SMALL_STATEMENT_BYTES", 512 * 1024))
+
+# priority lanes, lower runs first
+LANES = {"small": 0, "large": 1}
+
+# a queued large statement starts after at most this many small ones have started ahead of it
+LARGE_JOB_AGING = int(os.getenv("UPLOAD_LARGE_JOB_AGING", "4"))
+
+# starting guess for how long a job takes, refined as jobs complete
+INITIAL_JOB_SECONDS = 10.0
+
+
+class QueueFull(Exception):
+    """Raised when the scheduler's queue is at its maximum depth"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Upload queue is full, retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once it has been cancelled"""
+
+
+class Job:
+    def __init__(self, task_id: str, lane: str, run):
+        self.task_id = task_id
+        self.lane = lane
+        # coroutine function taking the job, so it can watch job.cancelled
+        self.run = run
+        self.cancelled = threading.Event()
+        self.task = None
+
+    def check_cancelled(self):
+        """Call from the job's work at convenient points to stop once cancelled"""
+        if self.cancelled.is_set():
+            raise JobCancelled(f"Task {self.task_id} was cancelled")
+
+
+class UploadScheduler:
+    """Runs upload jobs with a concurrency limit, a bounded queue and priority lanes.
+
+    Small jobs run first, but every LARGE_JOB_AGING small jobs started while a large one waits
+    let the oldest large one through, so a steady stream of small uploads cannot starve it.
+    Lives on the worker's event loop; the heavy work of a job still runs in the thread pool.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue = []
+        self.running = {}
+        self.sequence = itertools.count()
+        self.average_job_seconds = INITIAL_JOB_SECONDS
+        # small jobs started since a large one last did, counted while one is waiting
+        self.large_passed_over = 0
+        # called with positions() whenever the queue moves, e.g. to share them with other workers
+        self.on_queue_change = None
+
+    @staticmethod
+    def lane_for(size: int) -> str:
+        return "small" if size <= SMALL_STATEMENT_BYTES else "large"
+
+    def retry_after(self) -> int:
+        """Rough number of seconds until a queue slot frees up"""
+        waves = math.ceil((len(self.queue) + 1) / max(1, self.max_concurrent))
+        return max(1, int(waves * self.average_job_seconds))
+
+    def submit(self, job: Job) -> Job:
+        if len(self.queue) >= self.max_queued:
+            raise QueueFull(self.retry_after())
+
+        heapq.heappush(self.queue, (LANES[job.lane], next(self.sequence), job))
+        self.dispatch()
+        return job
+
+    def order(self) -> list[Job]:
+        """Queued jobs in the order they will start"""
+        small, large = [], []
+        for lane, _, job in sorted(self.queue):
+            (small if lane == LANES["small"] else large).append(job)
+
+        order, passed_over = [], self.large_passed_over
+        while small or large:
+            if large and (not small or passed_over >= LARGE_JOB_AGING):
+                order.append(large.pop(0))
+                passed_over = 0
+            else:
+                order.append(small.pop(0))
+                passed_over += 1 if large else 0
+        return order
+
+    def remove(self, job: Job):
+        self.queue = [entry for entry in self.queue if entry[2] is not job]
+        heapq.heapify(self.queue)
+
+    def dispatch(self):
+        """Start queued jobs while there is spare capacity"""
+        while self.queue and len(self.running) < self.max_concurrent:
+            job = self.order()[0]
+            self.remove(job)
+            if job.lane == "large":
+                self.large_passed_over = 0
+            elif any(lane == LANES["large"] for lane, _, _ in self.queue):
+                self.large_passed_over += 1
+            self.running[job.task_id] = job
+            job.task = asyncio.create_task(self.run_job(job))
+
+        if self.on_queue_change:
+            self.on_queue_change(self.positions())
+
+    async def run_job(self, job: Job):
+        started = time.monotonic()
+        try:
+            await job.run(job)
+        finally:
+            self.running.pop(job.task_id, None)
+            # exponential moving average, feeds the Retry-After estimate
+            self.average_job_seconds = 0.8 * self.average_job_seconds + 0.2 * (time.monotonic() - started)
+            self.dispatch()
+
+    def position(self, task_id: str) -> int | None:
+        """1-based position of a queued job, 0 if it is running, None if unknown"""
+        if task_id in self.running:
+            return 0
+
+        for position, job in enumerate(self.order(), start=1):
+            if job.task_id == task_id:
+                return position
+
+        return None
+
+    def positions(self) -> dict[str, int]:
+        """position() of every job this scheduler knows about"""
+        positions = {task_id: 0 for task_id in self.running}
+        for position, job in enumerate(self.order(), start=1):
+            positions[job.task_id] = position
+        return positions
+
+    def cancel(self, task_id: str) -> Job | None:
+        """Cancel a queued or running job, returning it if it was found"""
+        job = self.running.get(task_id)
+        if job is not None:
+            # the running job stops at its next check_cancelled()
+            job.cancelled.set()
+            return job
+
+        for _, _, queued in self.queue:
+            if queued.task_id == task_id:
+                self.remove(queued)
+                queued.cancelled.set()
+                if self.on_queue_change:
+                    self.on_queue_change(self.positions())
+                return queued
+
+        return None
+
+
+upload_scheduler = UploadScheduler(MAX_CONCURRENT_JOBS, MAX_QUEUED_JOBS)
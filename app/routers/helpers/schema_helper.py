@@ -0,0 +1,134 @@
+import calendar
+import logging
+import pandas as pd
+import pyarrow as pa
+from .categorization_helper import transaction_types
+from .financial_institutions_helper import bank_names, financial_service_keywords, mshwari_service_keywords
+
+MONTH_NAMES = pd.CategoricalDtype(list(calendar.month_name)[1:], ordered=True)
+DAY_NAMES = pd.CategoricalDtype(list(calendar.day_name), ordered=True)
+SAVE_OR_SPEND = pd.CategoricalDtype(["save", "spend"])
+TIME_OF_DAY = pd.CategoricalDtype(["Morning", "Afternoon", "Evening", "Night"], ordered=True)
+
+# text is held in Arrow buffers: one contiguous block per column instead of a Python object per cell
+ARROW_STRING = pd.StringDtype("pyarrow")
+
+# Arrow types read back as Arrow-backed pandas dtypes, parquet metadata alone gives Python strings
+ARROW_TYPES = {pa.string(): ARROW_STRING, pa.large_string(): ARROW_STRING}
+
+# bumped whenever the stored statement changes shape, so statements cached in an older shape are not reused
+SCHEMA_VERSION = 7
+
+# money is held as integer cents from parsing through aggregation: sums are exact and run on dense int64
+# arrays, amounts are turned into KES only when a response is built (to_kes)
+CENTS_PER_KES = 100
+MONEY_COLUMNS = ["Paid In", "Withdrawn", "Balance"]
+
+# Completion Time as printed on M-Pesa statements, parsed once into datetime64
+COMPLETION_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# and as written in responses
+RESPONSE_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# money columns added by the modules, converted with the statement ones
+DERIVED_MONEY_COLUMNS = ["amount"]
+
+# dtype of every column of a cleaned statement, enforced once at ingestion
+STATEMENT_SCHEMA = {
+    "Receipt No.": ARROW_STRING,
+    "Completion Time": "datetime64[ns]",
+    "Details": ARROW_STRING,
+    "Paid In": "int64",
+    "Withdrawn": "int64",
+    "Balance": "int64",
+    "month_name": MONTH_NAMES,
+    "day_name": DAY_NAMES,
+    "Hour": "int8",
+    "Transaction_Type": transaction_types.dtype,
+    "Bank": bank_names.dtype,
+    "Financial_Service": financial_service_keywords.dtype,
+    "Mshwari_Service": mshwari_service_keywords.dtype,
+    "phrase": "category",
+    "numbers": ARROW_STRING,
+    "account": ARROW_STRING,
+    "phone": ARROW_STRING,
+    "names": ARROW_STRING,
+    "amount": "int64",
+    "save/spend": SAVE_OR_SPEND,
+    "time_day": TIME_OF_DAY,
+}
+
+
+def bytes_per_row(mpesa_df: pd.DataFrame) -> float:
+    if mpesa_df.empty:
+        return 0.0
+    return mpesa_df.memory_usage(index=True, deep=True).sum() / len(mpesa_df)
+
+
+def parse_cents(amounts: pd.Series) -> pd.Series:
+    """Parse amounts as printed on the statement ("1,234.50") into int64 cents, 0 where unparseable"""
+    kes = pd.to_numeric(amounts.astype("string").str.replace(",", "", regex=False), errors="coerce")
+    # amounts have at most two decimals, rounding takes away the binary fraction error before the cast
+    return (kes * CENTS_PER_KES).round().fillna(0).astype("int64")
+
+
+def to_kes(value):
+    """Convert cents to KES: a scalar, a Series, or the money columns of a DataFrame"""
+    if isinstance(value, pd.DataFrame):
+        return value.assign(**{
+            column: value[column] / CENTS_PER_KES
+            for column in MONEY_COLUMNS + DERIVED_MONEY_COLUMNS if column in value.columns
+        })
+    if isinstance(value, pd.Series):
+        return value / CENTS_PER_KES
+    return float(value) / CENTS_PER_KES
+
+
+def parse_completion_time(times: pd.Series) -> pd.Series:
+    """Parse Completion Time with the statement's fixed format, NaT where it does not match"""
+    # a cell wrapped over two lines in the PDF comes out with a line break between date and time
+    times = times.astype("string").str.replace(r"\s+", " ", regex=True).str.strip()
+    return pd.to_datetime(times, format=COMPLETION_TIME_FORMAT, errors="coerce")
+
+
+def to_iso(value):
+    """Timestamp as written in responses, None when missing"""
+    if value is None or pd.isna(value):
+        return None
+    return value.strftime(RESPONSE_TIME_FORMAT)
+
+
+def to_records(mpesa_df: pd.DataFrame) -> list[dict]:
+    """Serialize statement rows for a response: money in KES, times as ISO strings and missing values as None"""
+    mpesa_df = to_kes(mpesa_df)
+    mpesa_df = mpesa_df.assign(**{
+        column: mpesa_df[column].dt.strftime(RESPONSE_TIME_FORMAT)
+        for column in mpesa_df.select_dtypes(include="datetime").columns
+    })
+    mpesa_df = mpesa_df.assign(**{
+        column: mpesa_df[column].astype(object).where(mpesa_df[column].notna(), None)
+        for column in mpesa_df.columns[mpesa_df.isna().any()]
+    })
+    return mpesa_df.to_dict(orient="records")
+
+
+def enforce_statement_schema(mpesa_df: pd.DataFrame) -> pd.DataFrame:
+    """Cast a cleaned statement to STATEMENT_SCHEMA and log its footprint before and after"""
+    before = bytes_per_row(mpesa_df)
+
+    # money columns are never missing, so they can never fall back to float or object
+    mpesa_df = mpesa_df.assign(**{
+        column: mpesa_df[column].fillna(0) for column in MONEY_COLUMNS if column in mpesa_df.columns
+    })
+    mpesa_df = mpesa_df.astype({
+        column: dtype for column, dtype in STATEMENT_SCHEMA.items() if column in mpesa_df.columns
+    })
+    mpesa_df = mpesa_df.reset_index(drop=True)
+
+    after = bytes_per_row(mpesa_df)
+    logging.info(f"Statement schema: {len(mpesa_df)} rows, {before:.0f} -> {after:.0f} bytes per row")
+    return mpesa_df
+
+
+def table_to_statement(table: pa.Table) -> pd.DataFrame:
+    """Convert a stored statement back to pandas without losing its schema"""
+    return table.to_pandas(types_mapper=ARROW_TYPES.get)
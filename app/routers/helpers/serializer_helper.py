@@ -0,0 +1,146 @@
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from .schema_helper import CENTS_PER_KES, DERIVED_MONEY_COLUMNS, MONEY_COLUMNS, RESPONSE_TIME_FORMAT
+
+# shapes a DataFrame can take in a response: a list of row objects, one array per column,
+# or one row object per line streamed in chunks
+RESPONSE_FORMATS = ("records", "columns", "ndjson")
+
+# rows encoded per chunk of an NDJSON stream
+NDJSON_CHUNK_ROWS = 2000
+
+# header carrying the cursor of the next page, absent on the last one
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# numpy arrays and scalars are written natively, NaN and inf as null
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def column_type(column: pd.Series) -> str:
+    """Type of a column as announced in the header of a columns response"""
+    if column.name in MONEY_COLUMNS + DERIVED_MONEY_COLUMNS:
+        return "kes"
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        return "datetime"
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return "category"
+    if pd.api.types.is_bool_dtype(column.dtype):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(column.dtype):
+        return "integer"
+    if pd.api.types.is_float_dtype(column.dtype):
+        return "float"
+    return "string"
+
+
+def column_values(column: pd.Series) -> np.ndarray | list:
+    """A column as written in responses: money in KES, times as ISO strings and missing values as null.
+
+    Numeric numpy columns stay arrays, their NaN and inf become null when encoded, so they are
+    never cast to object. Only text, categories and nullable extension columns become lists.
+    """
+    if column.name in MONEY_COLUMNS + DERIVED_MONEY_COLUMNS:
+        return column.to_numpy(dtype=np.float64) / CENTS_PER_KES
+    if isinstance(column.dtype, np.dtype) and column.dtype.kind == "M":
+        # RESPONSE_TIME_FORMAT is ISO 8601 to the second, which numpy writes far faster than strftime
+        times = column.to_numpy()
+        values = np.datetime_as_string(times, unit="s").astype(object)
+        values[np.isnat(times)] = None
+        return values.tolist()
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        return column.dt.strftime(RESPONSE_TIME_FORMAT).to_numpy(dtype=object, na_value=None).tolist()
+    if isinstance(column.dtype, np.dtype) and column.dtype.kind in "biuf":
+        return np.ascontiguousarray(column.to_numpy())
+    return column.to_numpy(dtype=object, na_value=None).tolist()
+
+
+def frame_records(frame: pd.DataFrame) -> list[dict]:
+    """Rows of a frame as objects, built from its columns rather than cell by cell"""
+    names = frame.columns.tolist()
+    values = [column_values(frame[name]) for name in names]
+    values = [column.tolist() if isinstance(column, np.ndarray) else column for column in values]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def frame_columns(frame: pd.DataFrame) -> dict:
+    """A frame as one array per column with a type header, the column names written once"""
+    return {
+        "format": "columns",
+        "rows": len(frame),
+        "dtypes": {name: column_type(frame[name]) for name in frame.columns},
+        "data": {name: column_values(frame[name]) for name in frame.columns},
+    }
+
+
+def frame_content(frame: pd.DataFrame, format: str = "records"):
+    """A frame as records or columns, ready for dumps"""
+    if format == "columns":
+        return frame_columns(frame)
+    return frame_records(frame)
+
+
+def encode_default(value):
+    """Types orjson does not write by itself"""
+    if isinstance(value, pd.DataFrame):
+        return frame_records(value)
+    if isinstance(value, pd.Series):
+        values = column_values(value)
+        return values.tolist() if isinstance(values, np.ndarray) else values
+    if isinstance(value, np.ndarray):
+        # object and non-contiguous arrays
+        return value.tolist()
+    if isinstance(value, pd.Timestamp):
+        return value.strftime(RESPONSE_TIME_FORMAT)
+    if value is pd.NA or value is pd.NaT:
+        return None
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=encode_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse written with orjson, taking DataFrames, numpy arrays and scalars as they are"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def check_listing(format: str, limit: int | None = None):
+    """Reject an unknown response format or a page size below one"""
+    if format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format, expected one of {list(RESPONSE_FORMATS)}")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="Invalid limit, expected at least 1")
+
+
+def frame_page(frame: pd.DataFrame, limit: int | None = None, cursor: int | None = None) -> tuple[pd.DataFrame, dict]:
+    """Rows after the cursor, at most limit of them, and the headers pointing to the next page.
+
+    The sort key is the row's index in the statement, which is sorted by Completion Time and
+    never changes for a snapshot, so a cursor stays valid between requests.
+    """
+    if not frame.index.is_monotonic_increasing:
+        frame = frame.sort_index(kind="stable")
+    if cursor is not None:
+        frame = frame.iloc[frame.index.searchsorted(cursor, side="right"):]
+    if limit is None or len(frame) <= limit:
+        return frame, {}
+
+    frame = frame.iloc[:limit]
+    return frame, {NEXT_CURSOR_HEADER: str(frame.index[-1])}
+
+
+def ndjson_chunks(frame: pd.DataFrame, chunk_rows: int = NDJSON_CHUNK_ROWS):
+    """The rows of a frame as NDJSON, encoded one chunk at a time"""
+    for start in range(0, len(frame), chunk_rows):
+        yield b"".join(dumps(record) + b"\n" for record in frame_records(frame.iloc[start:start + chunk_rows]))
+
+
+def ndjson_response(frame: pd.DataFrame, headers: dict | None = None) -> StreamingResponse:
+    """Stream the rows of a frame, only one chunk of them encoded at a time"""
+    return StreamingResponse(ndjson_chunks(frame), media_type="application/x-ndjson", headers=headers)
@@ -0,0 +1,46 @@
+import logging
+import pandas as pd
+from .schema_helper import to_kes
+
+
+def requested_metrics(metrics: list[str] | None, available: dict) -> list[str]:
+    """Metric names asked for, repeated or comma separated, in order and once each, all of them when none is"""
+    names = [name.strip() for value in metrics or [] for name in value.split(",") if name.strip()]
+    return list(dict.fromkeys(names)) or list(available)
+
+
+def summarize(available: dict, metrics: list[str] | None, source) -> dict:
+    """Compute the requested metrics of a module in one document.
+
+    Each metric is a function of the same source (a statement or an aggregate of it), returning the
+    content its own route would, so the source is fetched and built once for all of them.
+    """
+    summary, unknown = {}, []
+    for name in requested_metrics(metrics, available):
+        if name not in available:
+            unknown.append(name)
+            continue
+        try:
+            summary[name] = available[name](source)
+        except Exception as e:
+            logging.error(f"Error computing metric {name}: {e}")
+            summary[name] = {"message": f"Error computing {name}", "error": str(e)}
+
+    document = {"metrics": summary}
+    if unknown:
+        document["unknown_metrics"] = unknown
+        document["available_metrics"] = list(available)
+    return document
+
+
+def spending_stats(data: pd.DataFrame) -> dict:
+    """Transaction count, average count per month and the amount total, highest, lowest and average"""
+    transactions_per_month = data.groupby('month_name', observed=True).size()
+    return {
+        "total_transactions": int(data.shape[0]),
+        "average_transactions_per_month": float(transactions_per_month.mean()),
+        "total_tranasacted_amount": to_kes(data["amount"].sum()),
+        "highest_transacted_amount": to_kes(data["amount"].max()),
+        "minimum_transacted_amount": to_kes(data["amount"].min()),
+        "average_transacted_amount": to_kes(data["amount"].mean())
+    }
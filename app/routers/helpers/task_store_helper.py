@@ -0,0 +1,246 @@
+import collections
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+from .cache_helper import CACHE_ROOT
+from .schema_helper import table_to_statement
+
+TASK_STORE_PATH = os.getenv("TASK_STORE_PATH", os.path.join(CACHE_ROOT, "tasks.sqlite3"))
+
+# finished (and abandoned) tasks are forgotten after this long
+TASK_TTL_SECONDS = int(os.getenv("TASK_TTL_SECONDS", 60 * 60))
+
+# total size of the stored results, the oldest finished tasks go first once it is exceeded
+TASK_STORE_MAX_RESULT_BYTES = int(os.getenv("TASK_STORE_MAX_RESULT_BYTES", 256 * 1024 * 1024))
+
+# decoded results each worker keeps, so status polls of a completed task do not decode it again
+TASK_RESULT_CACHE_BYTES = int(os.getenv("TASK_RESULT_CACHE_BYTES", 128 * 1024 * 1024))
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+# results are Arrow IPC streams, compressed column by column
+RESULT_WRITE_OPTIONS = pa.ipc.IpcWriteOptions(compression="zstd")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    message TEXT,
+    lane TEXT,
+    error TEXT,
+    queue_position INTEGER,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result_header TEXT,
+    result_data BLOB,
+    result_bytes INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+)
+"""
+
+# the optional fields reported with a status, left out while they are empty
+OPTIONAL_FIELDS = ("lane", "error", "queue_position")
+
+
+def dataframe_to_ipc(mpesa_df: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(mpesa_df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema, options=RESULT_WRITE_OPTIONS) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def ipc_to_dataframe(data: bytes) -> pd.DataFrame:
+    return table_to_statement(pa.ipc.open_stream(data).read_all())
+
+
+class TaskStore:
+    """Status and results of upload tasks in a SQLite database in WAL mode.
+
+    Every worker opens the same file, so a status poll or a cancel can land on any of them.
+    Readers never block the writer in WAL mode, and each thread keeps its own connection.
+
+    Each worker also keeps the results it has decoded, up to cache_bytes, keyed by the row's
+    updated_at so a result written again is decoded again.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int, max_result_bytes: int, cache_bytes: int = TASK_RESULT_CACHE_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_result_bytes = max_result_bytes
+        self.cache_bytes = cache_bytes
+        self.decoded = collections.OrderedDict()
+        self.decoded_bytes = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.connection().execute(SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            # WAL keeps the database consistent with NORMAL, only the last commits can be lost on power failure
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def create(self, task_id: str, status: str, message: str, lane: str | None = None, queue_position: int | None = None):
+        self.connection().execute(
+            "INSERT OR REPLACE INTO tasks (task_id, status, progress, message, lane, queue_position, updated_at) "
+            "VALUES (?, ?, 0, ?, ?, ?, ?)",
+            (task_id, status, message, lane, queue_position, time.time()),
+        )
+        self.evict()
+
+    def update(self, task_id: str, **fields):
+        """Set status, progress, message, error or queue_position of a task"""
+        if not fields:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self.connection().execute(
+            f"UPDATE tasks SET {assignments}, updated_at = ? WHERE task_id = ?",
+            (*fields.values(), time.time(), task_id),
+        )
+
+    def set_queue_positions(self, positions: dict[str, int]):
+        """Record where each of a worker's jobs is in its queue, 0 once running"""
+        self.connection().executemany(
+            "UPDATE tasks SET queue_position = ? WHERE task_id = ?",
+            [(position, task_id) for task_id, position in positions.items()],
+        )
+
+    def complete(self, task_id: str, header: dict, mpesa_df: pd.DataFrame, message: str):
+        """Mark a task completed and keep its statement in columnar form"""
+        data = dataframe_to_ipc(mpesa_df)
+        self.connection().execute(
+            "UPDATE tasks SET status = 'completed', progress = 100, message = ?, error = NULL, queue_position = NULL, "
+            "result_header = ?, result_data = ?, result_bytes = ?, updated_at = ? WHERE task_id = ?",
+            (message, json.dumps(header), data, len(data), time.time(), task_id),
+        )
+        self.evict()
+
+    def delete(self, task_id: str):
+        self.connection().execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+        with self.lock:
+            if task_id in self.decoded:
+                self.decoded_bytes -= self.decoded.pop(task_id)[2]
+
+    def get(self, task_id: str) -> dict | None:
+        """Status of a task, None if it is unknown or has expired"""
+        row = self.connection().execute(
+            "SELECT status, progress, message, lane, error, queue_position FROM tasks WHERE task_id = ?",
+            (task_id,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        status = {"status": row["status"], "progress": row["progress"], "message": row["message"]}
+        for name in OPTIONAL_FIELDS:
+            if row[name] is not None:
+                status[name] = row[name]
+        return status
+
+    def result(self, task_id: str) -> tuple[dict, pd.DataFrame] | None:
+        """The (header, statement) of a completed task.
+
+        The statement is decoded once per worker and shared, callers must not modify it in place.
+        """
+        connection = self.connection()
+        row = connection.execute(
+            "SELECT result_header, updated_at FROM tasks WHERE task_id = ? AND result_data IS NOT NULL",
+            (task_id,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        with self.lock:
+            cached = self.decoded.get(task_id)
+            if cached is not None and cached[0] == row["updated_at"]:
+                self.decoded.move_to_end(task_id)
+                return json.loads(row["result_header"]), cached[1].copy(deep=False)
+
+        row = connection.execute(
+            "SELECT result_header, result_data, updated_at FROM tasks WHERE task_id = ? AND result_data IS NOT NULL",
+            (task_id,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        mpesa_df = ipc_to_dataframe(row["result_data"])
+        self.remember(task_id, row["updated_at"], mpesa_df)
+        return json.loads(row["result_header"]), mpesa_df.copy(deep=False)
+
+    def remember(self, task_id: str, version: float, mpesa_df: pd.DataFrame):
+        """Keep a decoded result, dropping the least recently used ones while over cache_bytes"""
+        size = int(mpesa_df.memory_usage(index=True, deep=True).sum())
+        with self.lock:
+            if task_id in self.decoded:
+                self.decoded_bytes -= self.decoded.pop(task_id)[2]
+            self.decoded[task_id] = (version, mpesa_df, size)
+            self.decoded_bytes += size
+            while self.decoded_bytes > self.cache_bytes and self.decoded:
+                self.decoded_bytes -= self.decoded.popitem(last=False)[1][2]
+
+    def request_cancel(self, task_id: str) -> bool:
+        """Flag a processing task for cancellation by whichever worker runs it"""
+        cursor = self.connection().execute(
+            "UPDATE tasks SET cancel_requested = 1 WHERE task_id = ? AND status = 'processing'",
+            (task_id,),
+        )
+        return cursor.rowcount > 0
+
+    def cancel_requested(self, task_id: str) -> bool:
+        row = self.connection().execute(
+            "SELECT cancel_requested FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def evict(self):
+        """Drop expired tasks, then the oldest finished ones while results exceed the size cap"""
+        connection = self.connection()
+        expired = connection.execute(
+            "DELETE FROM tasks WHERE updated_at < ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+        if expired:
+            logging.info(f"Evicted {expired} expired tasks")
+
+        total = connection.execute("SELECT COALESCE(SUM(result_bytes), 0) FROM tasks").fetchone()[0]
+        if total <= self.max_result_bytes:
+            return
+
+        finished = connection.execute(
+            f"SELECT task_id, result_bytes FROM tasks WHERE status IN ({', '.join('?' * len(FINISHED_STATUSES))}) "
+            "AND result_bytes > 0 ORDER BY updated_at",
+            FINISHED_STATUSES,
+        ).fetchall()
+        for row in finished:
+            if total <= self.max_result_bytes:
+                break
+            self.delete(row["task_id"])
+            total -= row["result_bytes"]
+            logging.info(f"Evicted task {row['task_id']} to stay under the result size cap")
+
+    def stats(self) -> dict:
+        row = self.connection().execute(
+            "SELECT COUNT(*) AS tasks, COALESCE(SUM(result_bytes), 0) AS result_bytes FROM tasks"
+        ).fetchone()
+        return {
+            "tasks": row["tasks"],
+            "result_bytes": row["result_bytes"],
+            "max_result_bytes": self.max_result_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "decoded_results": len(self.decoded),
+            "decoded_bytes": self.decoded_bytes,
+        }
+
+
+task_store = TaskStore(TASK_STORE_PATH, TASK_TTL_SECONDS, TASK_STORE_MAX_RESULT_BYTES)
@@ -1,11 +1,9 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query
 from typing import Annotated
 import pandas as pd
-from . import file_upload
-import re
-from .state import shared_state
-import numpy as np
+from .helpers.dataset_helper import dataset_store
 from .helpers import lifestyle_helper
+from .helpers.summary_helper import spending_stats, summarize
 import logging
 from fastapi.responses import Response
 
@@ -53,48 +51,79 @@ async def options_shopping_summary_stats():
         }
     )
 
+@router.options("/summary/")
+async def options_summary():
+    return Response(
+        status_code=200,
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+            "Access-Control-Allow-Headers": "*",
+            "Access-Control-Max-Age": "3600",
+        }
+    )
+
+
+# Metrics, each computed from the statement and returned as its route's content
+
+# betting summary statistics
+def betting_metric(data_df: pd.DataFrame):
+    # computed once per statement
+    gambling_data = dataset_store.derived(data_df, "gambling", lifestyle_helper.get_gambling_df)
+
+    # Check if get_gambling_df returned None or empty data
+    if gambling_data is None or gambling_data.empty:
+        return {"message": "No gambling data found"}
+
+    return {name: str(value) for name, value in spending_stats(gambling_data).items()}
+
+# saving summary statistics
+def saving_metric(data_df: pd.DataFrame):
+    data = lifestyle_helper.get_saving_df(data_df)
+
+    if data is None or data.empty:
+        return {"message": "No savings transactions found"}
+
+    return spending_stats(data)
+
+# shopping summary statistics
+def shopping_metric(data_df: pd.DataFrame):
+    data = lifestyle_helper.get_supermarket_df(data_df)
+
+    if data is None or data.empty:
+        return {"message": "No shopping transactions found"}
+
+    return spending_stats(data)
+
+# metric name (the route it is served on) -> metric
+LIFESTYLE_METRICS = {
+    "betting_summary_stats": betting_metric,
+    "saving_summary_stats": saving_metric,
+    "shopping_summary_stats": shopping_metric,
+}
+
+
+# all the requested lifestyle metrics in one document
+@router.get('/summary/')
+def summary(dataset_id: str, metrics: Annotated[list[str] | None, Query()] = None):
+    data_df = dataset_store.get(dataset_id)
+
+    if data_df is None or data_df.empty:
+        return {"message": "No transaction data available"}
+
+    return summarize(LIFESTYLE_METRICS, metrics, data_df)
+
 
 #A function to get the betting summary statistics
 @router.get('/betting_summary_stats/')
-def betting_summary_stats():
+def betting_summary_stats(dataset_id: str):
     try:
-        data_df = shared_state.mpesa_statement_df
+        data_df = dataset_store.get(dataset_id)
         
         if data_df is None or data_df.empty:
             return {"message": "No transaction data available"}
-        
-        # calculating the metrics
-        gambling_data = lifestyle_helper.get_gambling_df(data_df)
 
-        # Check if get_gambling_df returned None or empty data
-        if gambling_data is None or gambling_data.empty:
-            return {"message": "No gambling data found"}
-        
-        # Check if required columns exist
-        if 'month_name' not in gambling_data.columns:
-            return {"message": "Missing month_name column in gambling data"}
-        
-        if 'amount' not in gambling_data.columns:
-            return {"message": "Missing amount column in gambling data"}
-        
-        transactions_per_month = gambling_data.groupby('month_name').size()
-
-        # Calculate the average number of transactions per month
-        avg_no_transactions_per_month = transactions_per_month.mean()
-        transactions_count = gambling_data.shape[0]
-        transactions_amount = gambling_data["amount"].sum()
-        max_transacted = gambling_data["amount"].max()
-        min_transacted = gambling_data["amount"].min()
-        avg_transacted = gambling_data["amount"].mean()
-
-        return {
-            "total_transactions": str(transactions_count),
-            "average_transactions_per_month": str(avg_no_transactions_per_month),
-            "total_tranasacted_amount": str(transactions_amount),
-            "highest_transacted_amount": str(max_transacted),
-            "minimum_transacted_amount": str(min_transacted),
-            "average_transacted_amount": str(avg_transacted)
-        }
+        return betting_metric(data_df)
         
     except Exception as e:
         logging.error(f"Error in betting_summary_stats: {e}")
@@ -103,25 +132,14 @@ def betting_summary_stats():
 
 #A function to get the saving summary statistics
 @router.get('/saving_summary_stats/')
-def savings_analysis():
+def savings_analysis(dataset_id: str):
     try:
-        # Get savings data
-        data = lifestyle_helper.get_saving_df()
-        
-        if data is None or data.empty:
+        data_df = dataset_store.get(dataset_id)
+
+        if data_df is None or data_df.empty:
             return {"message": "No savings transactions found"}
-            
-        # Calculate metrics
-        transactions_per_month = data.groupby('month_name').size()
-        
-        return {
-            "total_transactions": int(data.shape[0]),
-            "average_transactions_per_month": float(transactions_per_month.mean()),
-            "total_tranasacted_amount": float(data["amount"].sum()),
-            "highest_transacted_amount": float(data["amount"].max()),
-            "minimum_transacted_amount": float(data["amount"].min()),
-            "average_transacted_amount": float(data["amount"].mean())
-        }
+
+        return saving_metric(data_df)
         
     except Exception as e:
         logging.error(f"Error analyzing savings: {e}")
@@ -130,26 +148,15 @@ def savings_analysis():
 
 #A function to get the shopping summary statistics
 @router.get('/shopping_summary_stats/')
-def shopping_summary_analysis():
+def shopping_summary_analysis(dataset_id: str):
     try:
-        # Get shopping data
-        data = lifestyle_helper.get_supermarket_df()
-        
-        if data is None or data.empty:
+        data_df = dataset_store.get(dataset_id)
+
+        if data_df is None or data_df.empty:
             return {"message": "No shopping transactions found"}
-            
-        # Calculate metrics
-        transactions_per_month = data.groupby('month_name').size()
-        
-        return {
-            "total_transactions": int(data.shape[0]),
-            "average_transactions_per_month": float(transactions_per_month.mean()),
-            "total_tranasacted_amount": float(data["amount"].sum()),
-            "highest_transacted_amount": float(data["amount"].max()),
-            "minimum_transacted_amount": float(data["amount"].min()),
-            "average_transacted_amount": float(data["amount"].mean())
-        }
+
+        return shopping_metric(data_df)
         
     except Exception as e:
-        logging.error(f"Error analyzing savings: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        logging.error(f"Error analyzing shopping: {e}")
+        return {"error": str(e)}
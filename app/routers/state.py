@@ -1,6 +0,0 @@
-from pandas import DataFrame
-
-class SharedState:
-    mpesa_statement_df: DataFrame | None = None
-
-shared_state = SharedState()
\ No newline at end of file
@@ -1,9 +1,11 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query
 from typing import Annotated
 import pandas as pd
-from . import file_upload
-from .state import shared_state
-from .helpers import transactions_helper
+from .helpers.dataset_helper import dataset_store
+from .helpers.schema_helper import to_kes, to_records
+from .helpers.cube_helper import build_cube
+from .helpers.enrichment_helper import time_of_day
+from .helpers.summary_helper import summarize
 from fastapi.responses import Response
 
 router = APIRouter(
@@ -13,8 +15,6 @@ router = APIRouter(
     tags=['Transaction Module']
 )
 
-data = shared_state.mpesa_statement_df
-
 # Helper function for CORS OPTIONS responses
 def cors_options_response():
     return Response(
@@ -116,363 +116,313 @@ async def options_top_transaction_hour():
 async def options_top_transaction_day():
     return cors_options_response()
 
+@router.options("/summary/")
+async def options_summary():
+    return cors_options_response()
+
+def statement_cube(dataset_id: str) -> pd.DataFrame | None:
+    """The aggregate cube of a statement, built once per snapshot, None without data"""
+    data = dataset_store.get(dataset_id)
+    if data is None or data.empty:
+        return None
+    return dataset_store.derived(data, "cube", build_cube)
+
+# receipt count and total amount of a group of cells
+COUNTERPARTY_TOTALS = {'Receipt No.': ('count', 'sum'), 'amount': ('amount_sum', 'sum')}
+
+def top_counterparties(cube: pd.DataFrame, transaction_type: str, **aggregations) -> pd.DataFrame:
+    """Cube cells of one transaction type aggregated per (names, numbers) counterparty"""
+    cube = cube[cube['Transaction_Type'] == transaction_type]
+    return cube.groupby(['names', 'numbers']).agg(**aggregations)
+
+def mean_amounts(groups) -> pd.DataFrame:
+    """Receipt count and mean amount of grouped cells, the mean being their amount sum over their count"""
+    totals = groups[['count', 'amount_sum']].sum()
+    return pd.DataFrame({'Receipt No.': totals['count'], 'amount': totals['amount_sum'] / totals['count']})
+
+def top_ten(data: pd.DataFrame, count_column: str = 'Receipt No.') -> list[dict]:
+    """The ten groups with the most receipts"""
+    return to_records(data.reset_index().nlargest(10, count_column))
+
+
+# Metrics, each computed from the statement's cube and returned as its route's content
+
+# number of transactions per type per amount
+def trans_type_metric(cube: pd.DataFrame):
+    # Group cells by 'Transaction_Type', aggregate count and sum of 'Amount'
+    types = cube.groupby("Transaction_Type", observed=True).agg(
+        Count=("count", "sum"),  # Count occurrences of each transaction type
+        Total_Amount=("amount_sum", "sum")      # Sum amounts for each transaction type
+    )
+    types["Total_Amount"] = to_kes(types["Total_Amount"])
+    return types.to_dict(orient='records')
+
+def total_received_metric(cube: pd.DataFrame):
+    return {"total": to_kes(cube['paid_in_sum'].sum())}
+
+def total_withdrawn_metric(cube: pd.DataFrame):
+    return {"total": to_kes(cube['withdrawn_sum'].sum())}
+
+def total_transacted_metric(cube: pd.DataFrame):
+    return {"total": to_kes(cube['paid_in_sum'].sum() + cube['withdrawn_sum'].sum())}
+
+def withdrawal_count_metric(cube: pd.DataFrame):
+    return {"no_of_withdrawals": int(cube['withdrawn_count'].sum())}
+
+def deposit_count_metric(cube: pd.DataFrame):
+    return {"number_of_deposits": int(cube['paid_in_count'].sum())}
+
+def total_transaction_count_metric(cube: pd.DataFrame):
+    return {"total_no_of_transactions": int(cube['withdrawn_count'].sum() + cube['paid_in_count'].sum())}
+
+def top_deposit_metric(cube: pd.DataFrame):
+    return {"highest_receoved_amount": to_kes(cube['paid_in_max'].max())}
+
+def lowest_deposit_metric(cube: pd.DataFrame):
+    # to prevent getting zero as the result
+    return {"lowest_amount_received": to_kes(cube['paid_in_min_nonzero'].min())}
+
+def top_withdrawal_metric(cube: pd.DataFrame):
+    return {"highest_withdrawn_amount": to_kes(cube['withdrawn_max'].max())}
+
+def lowest_withdrawal_metric(cube: pd.DataFrame):
+    # to prevent getting zero as the result
+    return {"lowest_withdrawn_amount": to_kes(cube['withdrawn_min_nonzero'].min())}
+
+def minimum_amount_transacted_metric(cube: pd.DataFrame):
+    lowest_deposit_amount = cube['paid_in_min_nonzero'].min()
+    lowest_withdrawn_amount = cube['withdrawn_min_nonzero'].min()
+
+    if lowest_withdrawn_amount < lowest_deposit_amount:
+        return {"lowest_withdrawn_amount": to_kes(lowest_withdrawn_amount)}
+    else:
+        return {"lowest_deposit_amount": to_kes(lowest_deposit_amount)}
+
+def maximum_amount_transacted_metric(cube: pd.DataFrame):
+    highest_deposit_amount = cube['paid_in_max'].max()
+    highest_withdrawn_amount = cube['withdrawn_max'].max()
+
+    if highest_withdrawn_amount > highest_deposit_amount:
+        return {"highest_withdrawn_amount": to_kes(highest_withdrawn_amount)}
+    else:
+        return {"highest_deposit_amount": to_kes(highest_deposit_amount)}
+
+def top_paybill_metric(cube: pd.DataFrame):
+    # Pay Bill cells grouped by 'names' and 'numbers'
+    data_grouped = top_counterparties(
+        cube, "Pay Bill",
+        receipt_count=('count', 'sum'),  # Count of 'Receipt No.'
+        max_amount=('amount_max', 'max')  # Max of 'amount'
+    )
+    data_grouped["max_amount"] = to_kes(data_grouped["max_amount"])
+    return {"data_final": top_ten(data_grouped, 'receipt_count')}
+
+def top_till_metric(cube: pd.DataFrame):
+    return {"data": top_ten(top_counterparties(cube, "Till No", **COUNTERPARTY_TOTALS))}
+
+def top_send_money_metric(cube: pd.DataFrame):
+    return {"data": top_ten(top_counterparties(cube, "Send Money", **COUNTERPARTY_TOTALS))}
+
+def top_customer_metric(cube: pd.DataFrame):
+    return {"data": top_ten(top_counterparties(cube, "Customer Deposit", **COUNTERPARTY_TOTALS))}
+
+def top_withdrawals_metric(cube: pd.DataFrame):
+    return {"data_final": top_ten(top_counterparties(cube, "Cash Withdrawal", **COUNTERPARTY_TOTALS))}
+
+def top_received_metric(cube: pd.DataFrame):
+    return {"data_final": top_ten(top_counterparties(cube, "Received Money", **COUNTERPARTY_TOTALS))}
+
+def top_hour_metric(cube: pd.DataFrame):
+    # group the cells by the part of the day of their hour
+    return {"data_final": top_ten(mean_amounts(cube.groupby(time_of_day(cube).rename('time_day'), observed=True)))}
+
+def top_day_metric(cube: pd.DataFrame):
+    # group the cells by weekday
+    return {"data_final": top_ten(mean_amounts(cube.groupby(["day_name"], observed=True)))}
+
+# metric name (the route it is served on) -> metric
+TRANSACTION_METRICS = {
+    "trans_type": trans_type_metric,
+    "total_recieved": total_received_metric,
+    "total_withdrawn": total_withdrawn_metric,
+    "total_transacted": total_transacted_metric,
+    "withdrawal_count": withdrawal_count_metric,
+    "deposit_count": deposit_count_metric,
+    "total_transaction_count": total_transaction_count_metric,
+    "top_deposit": top_deposit_metric,
+    "lowest_deposit": lowest_deposit_metric,
+    "top_withdrawal": top_withdrawal_metric,
+    "lowest_withdrawal": lowest_withdrawal_metric,
+    "minimum_amount_transacted": minimum_amount_transacted_metric,
+    "maximum_amount_transacted": maximum_amount_transacted_metric,
+    "top_paybill_transactions": top_paybill_metric,
+    "top_till_transactions": top_till_metric,
+    "top_send_money_transactions": top_send_money_metric,
+    "top_transactions_customer": top_customer_metric,
+    "top_withdrawals": top_withdrawals_metric,
+    "top_transactions_received": top_received_metric,
+    "top_transaction_hour": top_hour_metric,
+    "top_transaction_day": top_day_metric,
+}
+
+def cube_metric(dataset_id: str, metric, no_data_message: str = "No transaction data available"):
+    try:
+        cube = statement_cube(dataset_id)
+
+        if cube is None:
+            return {"message": no_data_message}
+
+        return metric(cube)
+
+    except Exception as e:
+        print(f"Error in {metric.__name__}: {e}")
+        return {"message": "Error processing transaction data", "error": str(e)}
+
+
 @router.get("/")
 def read_root():
     return {"Testing Setup": "Transaction Module Logic"}
 
-# number of transactions per type per amount
-@router.get("/trans_type/")
-def trans_type():
+# all the requested metrics in one document, computed from one cube
+@router.get("/summary/")
+def summary(dataset_id: str, metrics: Annotated[list[str] | None, Query()] = None):
     try:
-        data = shared_state.mpesa_statement_df
-        
-        if data is None or data.empty:
+        cube = statement_cube(dataset_id)
+
+        if cube is None:
             return {"message": "No transaction data available. Please upload a PDF statement first."}
 
-        data = transactions_helper.add_total_amount_column(data)
+        # a failing metric is reported in its own entry
+        return summarize(TRANSACTION_METRICS, metrics, cube)
 
-        # Group data by 'Transaction_Type', aggregate count and sum of 'Amount'
-        types = data.groupby("Transaction_Type").agg(
-            Count=("Transaction_Type", "count"),  # Count occurrences of each transaction type
-            Total_Amount=("amount", "sum")      # Sum amounts for each transaction type
-        )
-        return types.to_dict(orient='records')
-    
     except Exception as e:
-        print(f"Error in trans_type: {e}")
+        print(f"Error in summary: {e}")
         return {"message": "Error processing transaction data", "error": str(e)}
 
+# number of transactions per type per amount
+@router.get("/trans_type/")
+def trans_type(dataset_id: str):
+    return cube_metric(dataset_id, trans_type_metric,
+                       "No transaction data available. Please upload a PDF statement first.")
+
 # total amount transacted
 
 # total amount transacted - received
 @router.get("/total_recieved/")
-def total_received():
-    try:
-        data = shared_state.mpesa_statement_df
-
-        if data is None or data.empty:
-            return {"message": "No transaction data available. Please upload a PDF statement first."}
-        
-        total = data['Paid In'].sum()
-        return {"total": total}
-    
-    except Exception as e:
-        print(f"Error in total_received: {e}")
-        return {"message": "Error processing transaction data", "error": str(e)}
+def total_received(dataset_id: str):
+    return cube_metric(dataset_id, total_received_metric,
+                       "No transaction data available. Please upload a PDF statement first.")
 
 
 # total amount transacted - withdrawn
 @router.get('/total_withdrawn/')
-def total_withrdrawn():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    total = data['Withdrawn'].sum()
-    return {"total":total}
+def total_withrdrawn(dataset_id: str):
+    return cube_metric(dataset_id, total_withdrawn_metric)
 
 # total withdrawn plus total received
 @router.get('/total_transacted/')
-def total_transacted():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    total = total_received(data) + total_withrdrawn(data)
-    return {"total":total}
+def total_transacted(dataset_id: str):
+    return cube_metric(dataset_id, total_transacted_metric)
 
 
 # total number of transactions
 
 # total withdrawals count
 @router.get('/withdrawal_count/')
-def number_of_withdrawals():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    withdrawal_df = data[data['Withdrawn'] != 0.00]
-    num_of_withdrawals = len(withdrawal_df)
-    return {"no_of_withdrawals":num_of_withdrawals}
+def number_of_withdrawals(dataset_id: str):
+    return cube_metric(dataset_id, withdrawal_count_metric)
 
 
 # total deposits count
 @router.get('/deposit_count/')
-def number_of_deposits():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    deposits_df = data[data['Paid In'] != 0.00]
-    num_of_deposits = len(deposits_df)
-    return {"number_of_deposits":num_of_deposits}
+def number_of_deposits(dataset_id: str):
+    return cube_metric(dataset_id, deposit_count_metric)
 
 
 # withdrawal count plus deposit count
-@router.get('total_transaction_count')
-def total_number_of_transactions():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    total = number_of_withdrawals(data) + number_of_deposits(data)
-    return {"total_no_of_transactions":total}
+@router.get('/total_transaction_count/')
+def total_number_of_transactions(dataset_id: str):
+    return cube_metric(dataset_id, total_transaction_count_metric)
 
 
 # top deposit
 @router.get('/top_deposit/')
-def highest_received():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    highest_received_amount = data['Paid In'].max()
-    return {"highest_receoved_amount":highest_received_amount}
+def highest_received(dataset_id: str):
+    return cube_metric(dataset_id, top_deposit_metric)
 
 
 # lowest deposit
 @router.get('/lowest_deposit/')
-def lowest_received():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    # to prevent getting zero as the result
-    received_df = data[data['Paid In'] != 0.00]
-    lowest_received_amount = received_df['Paid In'].min()
-    return {"lowest_amount_received":lowest_received_amount}
+def lowest_received(dataset_id: str):
+    return cube_metric(dataset_id, lowest_deposit_metric)
 
 
 # top withdrawal
 @router.get('/top_withdrawal/')
-def highest_withdrawn():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    highest_withdrawn_amount = data['Withdrawn'].max()
-    return {"highest_withdrawn_amount":highest_withdrawn_amount}
+def highest_withdrawn(dataset_id: str):
+    return cube_metric(dataset_id, top_withdrawal_metric)
 
 
 # lowest withdrawal
 @router.get('/lowest_withdrawal/')
-def lowest_withdrawn():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    # to prevent getting zero as the result
-    withdrawal_df = data[data['Withdrawn'] != 0.00]
-    lowest_withdrawn_amount = withdrawal_df['Withdrawn'].min()
-    return {"lowest_withdrawn_amount":lowest_withdrawn_amount}
+def lowest_withdrawn(dataset_id: str):
+    return cube_metric(dataset_id, lowest_withdrawal_metric)
 
 
 # minimum amount transacted
 @router.get('/minimum_amount_transacted/')
-def min_amount_transacted():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    lowest_deposit_amount = lowest_received(data)
-    lowest_withdrawn_amount = lowest_withdrawn(data)
-
-    if lowest_withdrawn_amount < lowest_deposit_amount:
-        return lowest_withdrawn_amount
-    else:
-        return {"lowest_deposit_amount":lowest_deposit_amount}
+def min_amount_transacted(dataset_id: str):
+    return cube_metric(dataset_id, minimum_amount_transacted_metric)
     
 
 # maximum amount transacted
 @router.get('/maximum_amount_transacted/')
-def max_amount_transacted(data):
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    highest_deposit_amount = highest_received(data)
-    highest_withdrawn_amount = highest_withdrawn(data)
-
-    if highest_withdrawn_amount > highest_deposit_amount:
-        return highest_withdrawn_amount
-    else:
-        return {"highest_deposit_amount": highest_deposit_amount}
+def max_amount_transacted(dataset_id: str):
+    return cube_metric(dataset_id, maximum_amount_transacted_metric)
 
 
 # top paybill transactions
 @router.get('/top_paybill_transactions/')
-def top_transactions():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    # Filter rows where Transaction_Type is "Pay Bill"
-    data = data[data['Transaction_Type'] == "Pay Bill"]
-    
-    # Group by 'names' and 'numbers' and aggregate
-    data_grouped = data.groupby(['names', 'numbers']).agg(
-        receipt_count=('Receipt No.', 'count'),  # Count of 'Receipt No.'
-        max_amount=('amount', 'max')  # Max of 'amount'
-    ).reset_index()  # Reset index after aggregation
-    
-    # Get the top 10 rows based on receipt_count
-    data_final = data_grouped.nlargest(10, 'receipt_count')
-    
-    return {"data_final": data_final}
+def top_transactions(dataset_id: str):
+    return cube_metric(dataset_id, top_paybill_metric)
 
 
 # top till transactions
 @router.get('/top_till_transactions/')
-def top_transactions_till ():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    data = data[data['Transaction_Type'] == "Till No"]
-    # group the data
-    data = data.groupby(["names","numbers"])
-    # aggregate the data 
-    data =data.agg({'Receipt No.': 'count', 'amount': 'sum'})
-    # reset the index
-
-    # Get the top 10 rows based on the 'amount' column
-    data = data.nlargest(10, 'Receipt No.')
-
-    return {"data": data}
+def top_transactions_till (dataset_id: str):
+    return cube_metric(dataset_id, top_till_metric)
 
 
 # top send money transactions
 @router.get('/top_send_money_transactions/')
-def top_transactions_send_money ():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    data = data[data['Transaction_Type'] == "Send Money"]
-    # group the data
-    data = data.groupby(["names","numbers"])
-    # aggregate the data 
-    data =data.agg({'Receipt No.': 'count', 'amount': 'sum'})
-    # reset the index
-
-    # Get the top 10 rows based on the 'amount' column
-    data = data.nlargest(10, 'Receipt No.')
-
-    return {"data":data}
+def top_transactions_send_money (dataset_id: str):
+    return cube_metric(dataset_id, top_send_money_metric)
 
 
 # top transaction customer
 @router.get('/top_transactions_customer/')
-def top_transactions_customer ():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    data = data[data['Transaction_Type'] == "Customer Deposit"]
-    # group the data
-    data = data.groupby(["names","numbers"])
-    # aggregate the data 
-    data =data.agg({'Receipt No.': 'count', 'amount': 'sum'})
-    # reset the index
-    data = data.reset_index()
-    # Get the top 10 rows based on the 'amount' column
-    data = data.nlargest(10, 'Receipt No.')
-
-    return {"data":data}
+def top_transactions_customer (dataset_id: str):
+    return cube_metric(dataset_id, top_customer_metric)
 
 
 ## top 10 withdrawals
 @router.get('/top_withdrawals/')
-def top_transactions_withrawals ():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    data = data[data['Transaction_Type'] == "Cash Withdrawal"]
-    # group the data
-    data_group= data.groupby(["names","numbers"])
-    # aggregate the data 
-    data_agg=data_group.agg({'Receipt No.': 'count', 'amount': 'sum'})
-    # reset the index
-    data_res= data_agg.reset_index()
-    # Get the top 10 rows based on the 'amount' column
-    data_final = data_res.nlargest(10, 'Receipt No.')
-
-    return {"data_final":data_final}
+def top_transactions_withrawals (dataset_id: str):
+    return cube_metric(dataset_id, top_withdrawals_metric)
 
 
 @router.get('/top_transactions_received/')
-def top_transactions_recieved():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    data = data[data['Transaction_Type'] == "Received Money"]
-    # group the data
-    data_group= data.groupby(["names","numbers"])
-    # aggregate the data 
-    data_agg=data_group.agg({'Receipt No.': 'count', 'amount': 'sum'})
-    # reset the index
-    data_res= data_agg.reset_index()
-    # Get the top 10 rows based on the 'amount' column
-    data_final = data_res.nlargest(10, 'Receipt No.')
+def top_transactions_recieved(dataset_id: str):
+    return cube_metric(dataset_id, top_received_metric)
 
-    return {"data_final":data_final}
 
-
-	
 ## Getting the  number of transactions transacted per day (time of day)
 @router.get('/top_transaction_hour/')
-def top_transactions_hour():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    # group the data
-    data_group= data.groupby(["time_day"])
-    # aggregate the data 
-    data_agg=data_group.agg({'Receipt No.': 'count', 'amount': 'mean'})
-    # reset the index
-    data_res= data_agg.reset_index()
-    # Get the top 10 rows based on the 'amount' column
-    data_final = data_res.nlargest(10, 'Receipt No.')
-
-    return {"data_final":data_final}
+def top_transactions_hour(dataset_id: str):
+    return cube_metric(dataset_id, top_hour_metric)
 
 
 # getting the transactions distributed per week
 @router.get('/top_transaction_day/')
-def top_transactions_day():
-    data = shared_state.mpesa_statement_df
-
-    if data is None or data.empty:
-        return {"message" : "No transaction data available"}
-    
-    # group the data
-    data_group= data.groupby(["day_name"])
-    # aggregate the data 
-    data_agg=data_group.agg({'Receipt No.': 'count', 'amount': 'mean'})
-    # reset the index
-    data_res= data_agg.reset_index()
-    # Get the top 10 rows based on the 'amount' column
-    data_final = data_res.nlargest(10, 'Receipt No.')
-
-    return {"data_final":data_final}
+def top_transactions_day(dataset_id: str):
+    return cube_metric(dataset_id, top_day_metric)
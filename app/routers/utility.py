@@ -1,9 +1,11 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query
 from typing import Annotated
 import pandas as pd
-from .helpers import utility_helper
-from .state import shared_state
+from .helpers.dataset_helper import dataset_store
+from .helpers.summary_helper import spending_stats, summarize
+from .helpers.serializer_helper import FastJSONResponse, check_listing, frame_content, frame_page, ndjson_response
 import re
+from functools import partial
 from fastapi.responses import Response
 
 router = APIRouter(
@@ -62,208 +64,158 @@ async def options_fuel():
 async def options_fuel_metrics():
     return cors_options_response()
 
-@router.get('/data_bills/')
-def data_bills():
-
-    data = shared_state.mpesa_statement_df
+@router.options("/summary/")
+async def options_summary():
+    return cors_options_response()
 
+def bills_df(data):
     # get paybills and tills from statement
+    # amount, paybill/till numbers and names are derived at ingestion
     data_utility = data[data["Transaction_Type"].isin(["Pay Bill", "Till No"])]
 
-    data_utility = utility_helper.add_total_amount_column(data_utility)
+    return data_utility
 
-    # Apply the function conditionally
-    data_utility["names"] = data_utility.apply(
-        lambda row: utility_helper.get_names(row["Details"]),
-        axis=1
-    )
 
-    if data_utility is None or data_utility.empty:
-        return {"message": "No data bills data"}
-    
-    data_bills_df = data_utility
-    return data_utility.to_dict(orient='records')
+def statement_bills(dataset_id: str) -> pd.DataFrame | None:
+    """The paybill and till transactions of a statement, computed once per snapshot, None without data"""
+    data = dataset_store.get(dataset_id)
 
+    if data is None or data.empty:
+        return None
 
-@router.get('/kplc/')
-# getting the kplc transactions 
-def kplc ():
-  data_bills_df = pd.DataFrame(data_bills())
-  till_numbers_and_paybill = utility_helper.get_paybill_and_till_numbers(data_bills_df, 'Details')
-  data_kplc = till_numbers_and_paybill[till_numbers_and_paybill["numbers"].isin(["888888", "888880"])]
+    return dataset_store.derived(data, "data_bills", bills_df)
 
-  if data_kplc is None or data_kplc.empty:
-     return {"message": "No client KPLC data"}
-  
-  return data_kplc.to_dict(orient='records')
 
+# the bills of each utility
+def kplc_bills(data_bills: pd.DataFrame) -> pd.DataFrame:
+    return data_bills[data_bills["numbers"].isin(["888888", "888880"])]
 
-@router.get('/kplc_metrics/')
-def utility_analysis():
+def safaricom_wifi_bills(data_bills: pd.DataFrame) -> pd.DataFrame:
+    return data_bills[data_bills["numbers"].isin(["150501"])]
+
+def zuku_bills(data_bills: pd.DataFrame) -> pd.DataFrame:
+    return data_bills[data_bills["numbers"].isin(["320320"])]
+
+def fuel_bills(data_bills: pd.DataFrame) -> pd.DataFrame:
+    # Filter fuel transactions
+    fuel_mask = data_bills["names"].str.contains(
+            "Rubis|Shell|Total|Astrol", 
+            case=False, 
+            na=False
+    )
+    return data_bills[fuel_mask]
+
+# utility -> (its bills, message when the client has none)
+UTILITIES = {
+    "kplc": (kplc_bills, "No client KPLC data"),
+    "safaricom_wifi": (safaricom_wifi_bills, "No client Safaricom wifi data"),
+    "zuku_wifi": (zuku_bills, "No client Zuku data"),
+    "fuel": (fuel_bills, "No client Safaricom wifi data"),
+}
+
+def bills_response(bills: pd.DataFrame, format: str = "records", limit: int | None = None, cursor: int | None = None):
+    # one page of the bills, all of them without a limit, written as they are, column arrays included
+    rows, headers = frame_page(bills, limit, cursor)
+    if format == "ndjson":
+        return ndjson_response(rows, headers)
+    return FastJSONResponse(frame_content(rows, format), headers=headers)
+
+def utility_metric(data_bills: pd.DataFrame, utility: str):
     # calculating the  metrics 
-    data_kplc = kplc()
+    select, message = UTILITIES[utility]
+    bills = select(data_bills)
 
-    # check for error message
-    if isinstance(data_kplc, dict) and ("message" in data_kplc or "error" in data_kplc):
-        return data_kplc
-    
-    
-    data_kplc = pd.DataFrame(data_kplc)
-    transactions_per_month = data_kplc.groupby('month_name').size()
-    
-    # Calculate the average number of transactions per month
-    avg_no_transactions_per_month = transactions_per_month.mean()
-    transactions_count =  data_kplc.shape[0]
-    transactions_amount = data_kplc["amount"].sum()
-    max_transacted = data_kplc["amount"].max()
-    min_transacted = data_kplc["amount"].min()
-    avg_transacted = data_kplc["amount"].mean()
-
-    return{
-        "total_transactions":transactions_count,
-        "average_transactions_per_month": avg_no_transactions_per_month,
-        "total_tranasacted_amount":transactions_amount,
-        "highest_transacted_amount":max_transacted,
-        "minimum_transacted_amount":min_transacted,
-        "average_transacted_amount":avg_transacted
-    }
+    if bills.empty:
+        return {"message": message}
 
+    return spending_stats(bills)
 
-@router.get('/safaricom_wifi/')
-# getting the kplc transactions 
-def safaricom_wifi():
-    data_bills_df = pd.DataFrame(data_bills())
-    till_numbers_and_paybill = utility_helper.get_paybill_and_till_numbers(data_bills_df, 'Details')
-    data_safaricom_wifi = till_numbers_and_paybill[till_numbers_and_paybill["numbers"].isin(["150501"])]
+# metric name (the route it is served on) -> metric of the bills
+UTILITY_METRICS = {
+    f"{utility}_metrics": partial(utility_metric, utility=utility)
+    for utility in UTILITIES
+}
 
-    if data_safaricom_wifi is None or data_safaricom_wifi.empty:
-        return {"message":"No client Safaricom wifi data"}
-    
-    return data_safaricom_wifi.to_dict(orient='records')
 
+# all the requested utility metrics in one document
+@router.get('/summary/')
+def summary(dataset_id: str, metrics: Annotated[list[str] | None, Query()] = None):
+    data_bills_df = statement_bills(dataset_id)
+
+    if data_bills_df is None or data_bills_df.empty:
+        return {"message": "No data bills data"}
+
+    return summarize(UTILITY_METRICS, metrics, data_bills_df)
 
-@router.get('/safaricom_wifi_metrics/')
-def utility_analysis():
-    # calculating the  metrics 
 
-    data_safaricom_wifi = safaricom_wifi()
+@router.get('/data_bills/')
+def data_bills(dataset_id: str, format: str = "records", limit: int | None = None, cursor: int | None = None):
+    check_listing(format, limit)
 
-    # check for error message
-    if isinstance(data_safaricom_wifi, dict) and ("message" in data_safaricom_wifi or "error" in data_safaricom_wifi):
-        return data_safaricom_wifi   
+    data_utility = statement_bills(dataset_id)
 
-    data_safaricom_wifi = pd.DataFrame(data_safaricom_wifi)
-    transactions_per_month = data_safaricom_wifi.groupby('month_name').size()
+    if data_utility is None or data_utility.empty:
+        return {"message": "No data bills data"}
     
-    # Calculate the average number of transactions per month
-    avg_no_transactions_per_month = transactions_per_month.mean()
-    transactions_count =  data_safaricom_wifi.shape[0]
-    transactions_amount = data_safaricom_wifi["amount"].sum()
-    max_transacted = data_safaricom_wifi["amount"].max()
-    min_transacted = data_safaricom_wifi["amount"].min()
-    avg_transacted = data_safaricom_wifi["amount"].mean()
-
-    return{
-        "total_transactions":transactions_count,
-        "average_transactions_per_month": avg_no_transactions_per_month,
-        "total_tranasacted_amount":transactions_amount,
-        "highest_transacted_amount":max_transacted,
-        "minimum_transacted_amount":min_transacted,
-        "average_transacted_amount":avg_transacted
-    }
+    return bills_response(data_utility, format, limit, cursor)
 
 
-@router.get('/zuku_wifi/')
-def zuku ():
-    data_bills_df = pd.DataFrame(data_bills())
-    till_numbers_and_paybill = utility_helper.get_paybill_and_till_numbers(data_bills_df, 'Details')
-    data_zuku = till_numbers_and_paybill[till_numbers_and_paybill["numbers"].isin(["320320"])]
+def bills_route(dataset_id: str, utility: str, metrics: bool = False, format: str = "records", limit: int | None = None, cursor: int | None = None):
+    check_listing(format, limit)
 
-    if data_zuku is None or data_zuku.empty:
-        return {"message": "No client Zuku data"}
-    
-    return data_zuku.to_dict(orient="records")
+    data_bills_df = statement_bills(dataset_id)
 
+    if data_bills_df is None or data_bills_df.empty:
+        return {"message": "No data bills data"}
 
-@router.get('/zuku_wifi_metrics/')
-def utility_analysis():
-    # calculating the  metrics 
-    data_zuku_wifi = safaricom_wifi()
+    if metrics:
+        return utility_metric(data_bills_df, utility)
 
-    # check for error message
-    if isinstance(data_zuku_wifi, dict) and ("message" in data_zuku_wifi or "error" in data_zuku_wifi):
-        return data_zuku_wifi   
+    select, message = UTILITIES[utility]
+    bills = select(data_bills_df)
 
-    data_zuku_wifi - pd.DataFrame(data_zuku_wifi)
-    transactions_per_month = data_zuku_wifi.groupby('month_name').size()
-    
-    # Calculate the average number of transactions per month
-    avg_no_transactions_per_month = transactions_per_month.mean()
-    transactions_count =  data_zuku_wifi.shape[0]
-    transactions_amount = data_zuku_wifi["amount"].sum()
-    max_transacted = data_zuku_wifi["amount"].max()
-    min_transacted = data_zuku_wifi["amount"].min()
-    avg_transacted = data_zuku_wifi["amount"].mean()
-
-    return{
-        "total_transactions":transactions_count,
-        "average_transactions_per_month": avg_no_transactions_per_month,
-        "total_tranasacted_amount":transactions_amount,
-        "highest_transacted_amount":max_transacted,
-        "minimum_transacted_amount":min_transacted,
-        "average_transacted_amount":avg_transacted
-    }
+    if bills.empty:
+        return {"message": message}
 
-@router.get('/fuel/')
-def fuel():
-    # Use regular expression to filter rows that contain any of the specified names
+    return bills_response(bills, format, limit, cursor)
 
-    data_fuel = data_bills()
 
-    if isinstance(data_fuel, dict) and "message" in data_fuel:
-        return {"message": "No fuel data available"}
-    
-    data_fuel = pd.DataFrame(data_fuel)
-    # Filter fuel transactions
-    fuel_mask = data_fuel["names"].str.contains(
-            "Rubis|Shell|Total|Astrol", 
-            case=False, 
-            na=False
-    )
-    data_fuel = data_fuel[fuel_mask]
+@router.get('/kplc/')
+# getting the kplc transactions 
+def kplc (dataset_id: str, format: str = "records", limit: int | None = None, cursor: int | None = None):
+    return bills_route(dataset_id, "kplc", format=format, limit=limit, cursor=cursor)
 
-    if data_fuel is None or data_fuel.empty:
-        return {"message":"No client Safaricom wifi data"}
 
-    return data_fuel.to_dict(orient="records")
+@router.get('/kplc_metrics/')
+def kplc_metrics(dataset_id: str):
+    return bills_route(dataset_id, "kplc", metrics=True)
 
 
-@router.get('/fuel_metrics/')
-def utility_analysis():
-    # calculating the  metrics 
+@router.get('/safaricom_wifi/')
+def safaricom_wifi(dataset_id: str, format: str = "records", limit: int | None = None, cursor: int | None = None):
+    return bills_route(dataset_id, "safaricom_wifi", format=format, limit=limit, cursor=cursor)
 
-    data_fuel = fuel()
 
-    # check for error message
-    if isinstance(data_fuel, dict) and ("message" in data_fuel or "error" in data_fuel):
-        return data_fuel
-      
-    data_fuel = pd.DataFrame(data_fuel)
-    transactions_per_month = data_fuel.groupby('month_name').size()
-    
-    # Calculate the average number of transactions per month
-    avg_no_transactions_per_month = transactions_per_month.mean()
-    transactions_count =  data_fuel.shape[0]
-    transactions_amount = data_fuel["amount"].sum()
-    max_transacted = data_fuel["amount"].max()
-    min_transacted = data_fuel["amount"].min()
-    avg_transacted = data_fuel["amount"].mean()
-
-    return{
-        "total_transactions":transactions_count,
-        "average_transactions_per_month": avg_no_transactions_per_month,
-        "total_tranasacted_amount":transactions_amount,
-        "highest_transacted_amount":max_transacted,
-        "minimum_transacted_amount":min_transacted,
-        "average_transacted_amount":avg_transacted
-    }
\ No newline at end of file
+@router.get('/safaricom_wifi_metrics/')
+def safaricom_wifi_metrics(dataset_id: str):
+    return bills_route(dataset_id, "safaricom_wifi", metrics=True)
+
+
+@router.get('/zuku_wifi/')
+def zuku (dataset_id: str, format: str = "records", limit: int | None = None, cursor: int | None = None):
+    return bills_route(dataset_id, "zuku_wifi", format=format, limit=limit, cursor=cursor)
+
+
+@router.get('/zuku_wifi_metrics/')
+def zuku_wifi_metrics(dataset_id: str):
+    return bills_route(dataset_id, "zuku_wifi", metrics=True)
+
+
+@router.get('/fuel/')
+def fuel(dataset_id: str, format: str = "records", limit: int | None = None, cursor: int | None = None):
+    return bills_route(dataset_id, "fuel", format=format, limit=limit, cursor=cursor)
+
+
+@router.get('/fuel_metrics/')
+def fuel_metrics(dataset_id: str):
+    return bills_route(dataset_id, "fuel", metrics=True)
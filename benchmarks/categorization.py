@@ -0,0 +1,88 @@
+"""Categorization of Details: the per-phrase str.contains loop (last match wins) against
+PhraseTable, checked to give the same result on every row.
+
+Run from the repository root:
+
+    python benchmarks/categorization.py [rows ...]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.routers.helpers.categorization_helper import TRANSACTION_CATEGORIES, transaction_types
+from app.routers.helpers.financial_institutions_helper import bank_names
+
+TEMPLATES = [
+    "Customer Transfer to 2547******{n:03d} - {name}",
+    "Customer Transfer Fuliza M-Pesa to 2547******{n:03d} - {name}",
+    "Pay Bill Online to {n} - KPLC PREPAID Acc. {acc}",
+    "Pay Bill to 290290 - SportPesa Acc. {acc}",
+    "Pay Bill Fuliza M-Pesa to {n} - {name} Acc. {acc}",
+    "Merchant Payment to {n} - NAIVAS SUPERMARKET {name}",
+    "Merchant Payment Online to {n} - {name}",
+    "Funds received from 2547******{n:03d} - {name}",
+    "Business Payment from 222111 - Equity Bulk Account via API",
+    "Business Payment from 522522 - KCB Bank {name}",
+    "Customer Withdrawal At Agent Till {n} - {name}",
+    "Airtime Purchase",
+    "Airtime Purchase For Other 2547******{n:03d}",
+    "OverDraft of Credit Party",
+    "OD Loan Repayment to 232323 - M-PESA Overdraw",
+    "M-Shwari Deposit",
+    "M-Shwari Loan Repayment",
+    "Customer Send Money to Micro SME Business {name}",
+    "Recharge for Customer With Fuliza",
+    "Customer Transfer of Funds Charge",
+    "Promotion Payment from 123123 - {name}",
+    "Reversal of transaction {acc}",
+]
+NAMES = ["JOHN DOE", "MARY WANJIRU", "PETER OTIENO", "GRACE MOTHER", "SAMUEL KIPROTICH", "Shell Westlands"]
+
+
+def synthetic_details(rows: int, seed: int = 11) -> pd.Series:
+    """Details in the shapes statements have, with a pool of counterparties growing with the statement"""
+    rng = np.random.default_rng(seed)
+    counterparties = max(rows // 20, 10)
+    texts = [
+        TEMPLATES[template].format(n=n, name=NAMES[n % len(NAMES)], acc=n * 7)
+        for template, n in zip(rng.integers(0, len(TEMPLATES), rows), rng.integers(0, counterparties, rows))
+    ]
+    return pd.Series(texts, dtype=pd.StringDtype("pyarrow"))
+
+
+def last_wins(details: pd.Series, rules: dict, default=None) -> pd.Series:
+    """The loop the table replaces: one str.contains per phrase, later phrases overwrite earlier ones"""
+    phrase = pd.Series(None, index=details.index, dtype=object)
+    for keyword in rules:
+        phrase[details.str.contains(keyword, case=False, na=False)] = keyword
+    return phrase.map(rules).fillna(default) if default is not None else phrase.map(rules)
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main(sizes: list[int]):
+    for rows in sizes:
+        details = synthetic_details(rows)
+
+        expected, loop_seconds = timed(lambda: last_wins(details, TRANSACTION_CATEGORIES, "Other"))
+        actual, table_seconds = timed(lambda: transaction_types.classify(details))
+        same = expected.equals(actual.astype(object))
+
+        # the bank table shares the engine, check it against its own loop too
+        rules = dict(zip(bank_names.phrases, bank_names.values))
+        same &= last_wins(details, rules, bank_names.default).equals(bank_names.classify(details).astype(object))
+
+        print(f"{rows:>9} rows, {details.nunique():>7} distinct: loop {loop_seconds * 1000:9.1f} ms, "
+              f"table {table_seconds * 1000:8.1f} ms, x{loop_seconds / table_seconds:5.1f}, same result: {same}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
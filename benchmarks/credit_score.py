@@ -0,0 +1,85 @@
+"""Credit score feature extraction: the row-wise save_or_spend apply and five str.contains filters
+the score used to run, against the one-pass feature vector, checked to give the same score.
+
+Run from the repository root:
+
+    python benchmarks/credit_score.py [rows ...]
+"""
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.serialization import synthetic_statement
+from app.routers.helpers.credit_score_helper import calculate_mpesa_fico_score, credit_features
+from app.routers.helpers.schema_helper import to_kes
+
+
+def save_or_spend(row):
+    """The per-row classification the enrichment stage replaced"""
+    keywords = "M-Shwari Lock Deposit|Saving|savings|mmf|M-shwari Deposit|Sanlam"
+    if pd.Series(row['Details']).str.contains(keywords, case=False, regex=True, na=False).any():
+        return 'save'
+    return 'spend'
+
+
+def filtered_score(data: pd.DataFrame) -> int:
+    """The score as computed before the feature vector: one filtered frame per feature"""
+    data_spent = data[data["save/spend"] == "spend"]
+    data_save = data[data["save/spend"] == "save"]
+    data_loans = data[data["Transaction_Type"].str.contains("Fuliza Loan|Hustler", case=False, na=False)]
+    data_fuliza_loans = data[data["Transaction_Type"].str.contains("Fuliza Loan Repayment|Hustler Repayment", case=False, na=False)]
+
+    total_loans = to_kes(data_loans['Paid In'].sum())
+    total_repayments = to_kes(data_fuliza_loans['Withdrawn'].sum())
+    loan_requests = len(data_loans)
+    total_income = max(to_kes(data['Paid In'].sum()), 1)
+    total_expense = to_kes(data_spent['Withdrawn'].sum())
+    total_saved = to_kes(data_save['Withdrawn'].sum())
+    total_loan_income = to_kes(data_loans['Paid In'].sum())
+
+    payment_history_score = min(1, total_repayments / (total_loan_income * 0.3)) if total_loan_income else 1
+    income_spending_ratio = max(0, (total_income - total_expense) / total_income)
+    credit_score = max(0, 1 - loan_requests / max(1, len(data)))
+    saving_ratio = min(1, total_saved / total_income)
+    debt_score = max(0, 1 - min(1, total_loans / total_income))
+    final_score = (payment_history_score * 0.25 + income_spending_ratio * 0.20 + credit_score * 0.10 +
+                   saving_ratio * 0.10 + debt_score * 0.10)
+    return int(300 + final_score * 550)
+
+
+def row_wise_score(data: pd.DataFrame) -> int:
+    data = data.assign(**{"save/spend": data.apply(save_or_spend, axis=1)})
+    return filtered_score(data)
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main(rows: int):
+    statement = synthetic_statement(rows)
+
+    row_wise, row_wise_seconds = timed(lambda: row_wise_score(statement))
+    filtered, filtered_seconds = timed(lambda: filtered_score(statement))
+    vector, vector_seconds = timed(lambda: calculate_mpesa_fico_score(statement))
+
+    # the score of every prefix of the statement must match too, not just the full one
+    same = row_wise == filtered == vector and all(
+        filtered_score(statement.iloc[:end]) == calculate_mpesa_fico_score(statement.iloc[:end])
+        for end in range(rows // 10, rows + 1, rows // 10)
+    )
+    print(f"{rows:>8} rows: row-wise apply {row_wise_seconds * 1000:9.1f} ms, "
+          f"filters {filtered_seconds * 1000:7.1f} ms, features {vector_seconds * 1000:6.1f} ms, "
+          f"x{row_wise_seconds / vector_seconds:6.0f} / x{filtered_seconds / vector_seconds:4.1f}, "
+          f"score {vector}, same result: {same}")
+    print(f"{'':>8} {credit_features(statement)}")
+
+
+if __name__ == "__main__":
+    for rows in [int(size) for size in sys.argv[1:]] or [100_000]:
+        main(rows)
@@ -0,0 +1,74 @@
+"""Aggregation speed of the money columns: float KES (and the object columns the old NaN -> None
+replacement produced) against int64 cents.
+
+Run from the repository root:
+
+    python benchmarks/money_aggregation.py [rows]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.routers.helpers.schema_helper import CENTS_PER_KES, to_kes
+
+TRANSACTION_TYPES = ["Send Money", "Pay Bill", "Till No", "Received Money", "Cash Withdrawal",
+                     "Airtime Purchase", "Fuliza Loan", "Fuliza Loan Repayment", "Mshwari Deposit"]
+
+
+def synthetic_statement(rows: int, seed: int = 7) -> pd.DataFrame:
+    """A statement with one side of every transaction set, amounts in cents"""
+    rng = np.random.default_rng(seed)
+    cents = rng.integers(1, 5_000_000, rows)
+    paid_in = rng.random(rows) < 0.3
+    return pd.DataFrame({
+        "Paid In": np.where(paid_in, cents, 0),
+        "Withdrawn": np.where(paid_in, 0, cents),
+        "Transaction_Type": pd.Categorical.from_codes(
+            rng.integers(0, len(TRANSACTION_TYPES), rows), TRANSACTION_TYPES
+        ),
+    })
+
+
+def aggregate(data: pd.DataFrame):
+    """The reductions the modules run: totals, extremes and per-type sums of amount"""
+    amount = data["Paid In"] + data["Withdrawn"]
+    return (
+        data["Paid In"].sum(),
+        data["Withdrawn"].sum(),
+        data["Paid In"].max(),
+        amount.mean(),
+        amount.groupby(data["Transaction_Type"], observed=True).sum(),
+    )
+
+
+def best_of(function, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(rows: int):
+    cents = synthetic_statement(rows)
+
+    kes = cents.assign(**{column: cents[column] / CENTS_PER_KES for column in ["Paid In", "Withdrawn"]})
+    as_object = kes.assign(**{column: kes[column].astype(object) for column in ["Paid In", "Withdrawn"]})
+
+    results = {}
+    for name, data in [("object KES", as_object), ("float64 KES", kes), ("int64 cents", cents)]:
+        results[name] = aggregate(data)
+        print(f"{name:>12}: {best_of(lambda: aggregate(data)) * 1000:9.1f} ms")
+
+    # cents give the exact total, the float sum can be off in the last digits
+    exact = to_kes(results["int64 cents"][0])
+    print(f"total received: {exact:.2f} KES, float64 difference {results['float64 KES'][0] - exact:.2e} KES")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
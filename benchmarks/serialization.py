@@ -0,0 +1,99 @@
+"""Response serialization of an enriched statement: to_records written by the stdlib JSONResponse
+against the orjson serializer, as row records and as column arrays, the NDJSON stream's time
+to first chunk and peak memory, and the Arrow, Parquet and CSV exports.
+
+Run from the repository root:
+
+    python benchmarks/serialization.py [rows ...]
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.categorization import synthetic_details
+from app.routers.helpers.enrichment_helper import enrichment_stage
+from app.routers.helpers.schema_helper import enforce_statement_schema, to_records
+from app.routers.helpers.serializer_helper import FastJSONResponse, frame_content, ndjson_chunks
+from app.routers.helpers.export_helper import EXPORT_FORMATS, export_chunks
+
+
+def synthetic_statement(rows: int, seed: int = 5) -> pd.DataFrame:
+    """A cleaned and enriched statement, as the upload pipeline hands it to the modules"""
+    rng = np.random.default_rng(seed)
+    cents = rng.integers(1, 5_000_000, rows)
+    paid_in = rng.random(rows) < 0.3
+    seconds = np.sort(rng.integers(0, 180 * 24 * 3600, rows))
+    statement = pd.DataFrame({
+        "Receipt No.": [f"S{number:09d}" for number in range(rows)],
+        "Completion Time": pd.Timestamp("2024-01-01") + pd.to_timedelta(seconds, unit="s"),
+        "Details": synthetic_details(rows),
+        "Paid In": np.where(paid_in, cents, 0),
+        "Withdrawn": np.where(paid_in, 0, cents),
+        "Balance": rng.integers(0, 50_000_000, rows),
+    })
+    return enforce_statement_schema(enrichment_stage.enrich(statement))
+
+
+def best_of(function, repeat: int = 3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def main(rows: int):
+    statement = synthetic_statement(rows)
+
+    paths = {
+        "to_records + json": lambda: JSONResponse(to_records(statement)).body,
+        "orjson records": lambda: FastJSONResponse(frame_content(statement)).body,
+        "orjson columns": lambda: FastJSONResponse(frame_content(statement, "columns")).body,
+    }
+    bodies = {}
+    for name, path in paths.items():
+        bodies[name], seconds = best_of(path)
+        print(f"{name:>18}: {seconds * 1000:8.1f} ms, {len(bodies[name]) / 1e6:6.2f} MB")
+
+    today = json.loads(bodies["to_records + json"])
+    columns = json.loads(bodies["orjson columns"])["data"]
+    same = today == json.loads(bodies["orjson records"]) and all(
+        columns[name] == [row[name] for row in today] for name in statement.columns
+    )
+    same &= [json.loads(line) for line in b"".join(ndjson_chunks(statement)).splitlines()] == today
+    print(f"{rows} rows, same content: {same}")
+
+    # the stream encodes one chunk at a time: its first byte and its memory do not grow with the statement
+    start = time.perf_counter()
+    next(ndjson_chunks(statement))
+    first_chunk = time.perf_counter() - start
+    print(f"{'ndjson':>18}: first chunk {first_chunk * 1000:6.1f} ms, "
+          f"peak {peak_megabytes(lambda: sum(map(len, ndjson_chunks(statement)))):6.1f} MB, "
+          f"records response peak {peak_megabytes(paths['orjson records']):6.1f} MB")
+
+    # exports are written from the column buffers, the readers of the data team skip JSON parsing
+    for format in EXPORT_FORMATS:
+        body, seconds = best_of(lambda: b"".join(export_chunks(statement, format)))
+        print(f"{format + ' export':>18}: {seconds * 1000:8.1f} ms, {len(body) / 1e6:6.2f} MB, "
+              f"x{len(bodies['orjson records']) / len(body):4.1f} smaller than records")
+
+
+def peak_megabytes(function) -> float:
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+if __name__ == "__main__":
+    for rows in [int(size) for size in sys.argv[1:]] or [50_000]:
+        main(rows)
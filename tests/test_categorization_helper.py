@@ -0,0 +1,81 @@
+import pandas as pd
+from app.routers.helpers.categorization_helper import PhraseTable, TRANSACTION_CATEGORIES, transaction_types
+
+
+def last_wins(details: pd.Series, rules: dict, default=None) -> pd.Series:
+    """The loop PhraseTable replaces: one str.contains per phrase, later phrases overwrite earlier ones"""
+    phrase = pd.Series(None, index=details.index, dtype=object)
+    for keyword in rules:
+        phrase[details.str.contains(keyword, case=False, na=False)] = keyword
+    return phrase.map(rules).fillna(default) if default is not None else phrase.map(rules)
+
+
+def details(texts) -> pd.Series:
+    return pd.Series(texts, dtype=pd.StringDtype("pyarrow"))
+
+
+DETAILS = details([
+    "Customer Transfer to 2547******123 - JOHN DOE",
+    "Customer Transfer Fuliza M-Pesa to 2547******123 - JOHN DOE",
+    "Customer Transfer of Funds Charge",
+    "Pay Bill Online to 888880 - KPLC PREPAID Acc. 42",
+    "Pay Bill Fuliza M-Pesa to 888880 - KPLC PREPAID Acc. 42",
+    "Merchant Payment Fuliza M-Pesa to 555555 - NAIVAS",
+    "Merchant Payment Online to 555555 - NAIVAS",
+    "Airtime Purchase For Other 2547******123",
+    "Recharge for Customer With Fuliza",
+    "M-Shwari Loan Repayment",
+    "KCB M-PESA Target First Deposit",
+    "OD Loan Repayment to 232323 - M-PESA Overdraw",
+    "Reversal of transaction 77",
+    "customer transfer to 2547******999 - lower case",
+    "Something no rule knows",
+    None,
+    "Customer Transfer to 2547******123 - JOHN DOE",
+])
+
+
+def test_overlapping_phrases_last_match_wins():
+    rules = {"Pay Bill": "bill", "Pay Bill Online": "online bill", "Online": "online", "KPLC": "power"}
+    table = PhraseTable(rules, default="none")
+    texts = details(["Pay Bill Online to 888880 - KPLC", "Pay Bill to 1", "Pay Bill Online to 2", "Online", "nothing"])
+
+    assert table.classify(texts).tolist() == ["power", "bill", "online", "online", "none"]
+
+
+def test_rule_order_decides_the_winner():
+    texts = details(["M-Shwari Loan Repayment"])
+    assert PhraseTable({"M-Shwari Loan": "loan", "M-Shwari Loan Repayment": "repayment"}).classify(texts)[0] == "repayment"
+    assert PhraseTable({"M-Shwari Loan Repayment": "repayment", "M-Shwari Loan": "loan"}).classify(texts)[0] == "loan"
+
+
+def test_transaction_types_match_the_loop():
+    expected = last_wins(DETAILS, TRANSACTION_CATEGORIES, "Other")
+    assert transaction_types.classify(DETAILS).astype(object).equals(expected)
+
+
+def test_many_overlapping_rules_match_the_loop():
+    # every rule occurs in several texts and later rules overlap earlier ones, through every halving step
+    rules = {f"word{number}": f"value{number % 7}" for number in range(40)}
+    texts = details([" ".join(f"word{number}" for number in range(start, 40, step))
+                     for start in range(40) for step in (1, 3, 11)] + ["word4", "WORD39 word0", ""])
+    table = PhraseTable(rules, default="none")
+
+    assert table.classify(texts).astype(object).equals(last_wins(texts, rules, "none"))
+
+
+def test_missing_and_unmatched_texts():
+    table = PhraseTable({"Airtime": "airtime"}, default="other")
+    assert table.classify(details([None, "Airtime Purchase", "Pay Bill"])).tolist() == ["other", "airtime", "other"]
+
+    without_default = PhraseTable({"Airtime": "airtime"}).classify(details([None, "Pay Bill"]))
+    assert without_default.isna().all()
+
+
+def test_categories_keep_the_index():
+    texts = pd.Series(["Airtime Purchase", "Reversal"], index=[10, 3], dtype=pd.StringDtype("pyarrow"))
+    result = transaction_types.classify(texts)
+
+    assert result.index.tolist() == [10, 3]
+    assert isinstance(result.dtype, pd.CategoricalDtype)
+    assert list(result.dtype.categories) == sorted(set(TRANSACTION_CATEGORIES.values()))
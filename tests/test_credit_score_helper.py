@@ -0,0 +1,47 @@
+import pandas as pd
+from app.routers.helpers.credit_score_helper import calculate_mpesa_fico_score, credit_features
+
+
+def statement(rows):
+    """A statement of (Transaction_Type, Paid In, Withdrawn, save/spend) rows, amounts in cents"""
+    return pd.DataFrame(rows, columns=["Transaction_Type", "Paid In", "Withdrawn", "save/spend"]).astype(
+        {"Transaction_Type": "category", "save/spend": "category"}
+    )
+
+
+NO_LOANS = statement([
+    ("Received Money", 1_000_000, 0, "spend"),
+    ("Pay Bill", 0, 200_000, "spend"),
+    ("Mshwari Deposit", 0, 100_000, "save"),
+    ("Send Money", 0, 300_000, "spend"),
+])
+
+
+def test_features_in_kes():
+    features = credit_features(NO_LOANS)
+    assert features.transactions == 4
+    assert features.loan_requests == 0
+    assert features.total_income == 10_000
+    assert features.total_expense == 5_000
+    assert features.total_saved == 1_000
+    assert features.total_loans == 0
+    assert features.total_repayments == 0
+
+
+def test_statement_without_loans_scores_as_before():
+    # nothing to repay gives a full payment history, as numpy's min(1, nan) did before amounts were floats
+    assert calculate_mpesa_fico_score(NO_LOANS) == 608
+
+
+def test_statement_with_loans():
+    with_loans = statement([
+        *NO_LOANS.itertuples(index=False),
+        ("Fuliza Loan", 200_000, 0, "spend"),
+        ("Fuliza Loan Repayment", 0, 30_000, "spend"),
+    ])
+    features = credit_features(with_loans)
+    # "Fuliza Loan" also matches the repayment, as the score has always counted it
+    assert features.loan_requests == 2
+    assert features.total_loans == 2_000
+    assert features.total_repayments == 300
+    assert calculate_mpesa_fico_score(with_loans) == 517
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+from app.routers.helpers.cube_helper import CUBE_DIMENSIONS, CUBE_MEASURES, build_cube
+
+TEXT = pd.StringDtype("pyarrow")
+
+
+def statement(rows: int = 400, seed: int = 3) -> pd.DataFrame:
+    """The columns the cube is built from, with counterparties missing a name, a number or both"""
+    rng = np.random.default_rng(seed)
+    paid_in = rng.random(rows) < 0.4
+    cents = rng.integers(1, 200_000, rows)
+    names = pd.Series(rng.choice(["JOHN DOE", "KPLC PREPAID", "NAIVAS", None], rows), dtype=TEXT)
+    numbers = pd.Series(rng.choice(["888880", "555555", None], rows), dtype=TEXT)
+    phone = pd.Series(rng.choice(["2547******123", None], rows), dtype=TEXT)
+    return pd.DataFrame({
+        "Transaction_Type": pd.Categorical(rng.choice(["Pay Bill", "Send Money", "Till No"], rows),
+                                           categories=["Pay Bill", "Received Money", "Send Money", "Till No"]),
+        "month_name": pd.Categorical(rng.choice(["January", "February"], rows)),
+        "day_name": pd.Categorical(rng.choice(["Monday", "Friday", None], rows)),
+        "Hour": rng.choice([8, 13, 23], rows).astype(np.int8),
+        "names": names,
+        "numbers": numbers,
+        "phone": phone,
+        "Paid In": np.where(paid_in, cents, 0),
+        "Withdrawn": np.where(paid_in, 0, cents),
+        "amount": cents,
+    })
+
+
+def key(values) -> tuple:
+    return tuple(None if pd.isna(value) else value for value in values)
+
+
+def grouped(data: pd.DataFrame) -> dict:
+    """The cube's measures from a plain groupby, keyed by cell"""
+    data = data.assign(numbers=data["numbers"].fillna(data["phone"]))
+    # a counterparty is a (names, numbers) pair, missing when either is
+    missing = data["names"].isna() | data["numbers"].isna()
+    data.loc[missing, ["names", "numbers"]] = pd.NA
+
+    cells = {}
+    for cell, rows in data.groupby(CUBE_DIMENSIONS, observed=True, dropna=False):
+        measures = {"count": len(rows)}
+        for column, prefix in CUBE_MEASURES.items():
+            nonzero = rows.loc[rows[column] != 0, column]
+            measures[f"{prefix}_count"] = len(nonzero)
+            measures[f"{prefix}_sum"] = int(rows[column].sum())
+            measures[f"{prefix}_max"] = int(rows[column].max())
+            measures[f"{prefix}_min_nonzero"] = int(nonzero.min()) if len(nonzero) else None
+        cells[key(cell)] = measures
+    return cells
+
+
+def test_cube_matches_groupby():
+    data = statement()
+    cube = build_cube(data)
+    expected = grouped(data)
+
+    measures = [name for name in cube.columns if name not in CUBE_DIMENSIONS]
+    actual = {
+        key(row[:len(CUBE_DIMENSIONS)]): dict(zip(measures, key(row[len(CUBE_DIMENSIONS):])))
+        for row in cube[CUBE_DIMENSIONS + measures].itertuples(index=False)
+    }
+    assert actual == expected
+    assert cube["count"].sum() == len(data)
+
+
+def test_cube_keeps_dimension_types():
+    data = statement()
+    cube = build_cube(data)
+
+    for name in ["Transaction_Type", "month_name", "day_name"]:
+        assert cube[name].dtype == data[name].dtype
+    assert cube["Hour"].dtype == data["Hour"].dtype
+    assert cube["paid_in_sum"].dtype == np.int64
+
+
+def test_empty_statement():
+    cube = build_cube(statement().iloc[:0])
+    assert cube.empty
+    assert "amount_min_nonzero" in cube.columns
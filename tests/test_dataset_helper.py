@@ -0,0 +1,24 @@
+import os
+import pandas as pd
+from app.routers.helpers.dataset_helper import DatasetStore
+
+
+def statement() -> pd.DataFrame:
+    return pd.DataFrame({"Receipt No.": ["S1", "S2"], "Paid In": [100, 0], "Withdrawn": [0, 250]})
+
+
+def test_statement_is_only_served_by_its_id(tmp_path):
+    store = DatasetStore(str(tmp_path), max_bytes=1 << 30, memory_budget=1 << 30)
+    store.put("upload-1", statement())
+
+    assert store.get("upload-1")["Paid In"].tolist() == [100, 0]
+    # another client's request without an id, or with a bad one, gets nothing
+    for dataset_id in [None, "", "upload-2", "../upload-1"]:
+        assert store.get(dataset_id) is None
+    assert os.listdir(tmp_path) == ["upload-1.parquet"]
+
+
+def test_stale_latest_pointer_is_removed(tmp_path):
+    (tmp_path / "LATEST").write_text("upload-1")
+    DatasetStore(str(tmp_path), max_bytes=1 << 30, memory_budget=1 << 30)
+    assert not (tmp_path / "LATEST").exists()
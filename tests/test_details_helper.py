@@ -0,0 +1,54 @@
+import pandas as pd
+from app.routers.helpers.details_helper import PARSED_COLUMNS, parse_details
+
+
+def parsed(*details) -> list[dict]:
+    frame = parse_details(pd.Series(details, dtype=pd.StringDtype("pyarrow")))
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+def row(phrase, numbers=None, account=None, phone=None, names=None) -> dict:
+    return {"phrase": phrase, "numbers": numbers, "account": account, "phone": phone, "names": names}
+
+
+def test_phone_transfer():
+    assert parsed("Customer Transfer to 2547******123 - JOHN DOE") == [
+        row("Customer Transfer to", phone="2547******123", names="JOHN DOE"),
+    ]
+
+
+def test_paybill_with_number_and_account():
+    assert parsed("Pay Bill Online to 888880 - KPLC PREPAID Acc. 37211", "Pay Bill to 290290 - SportPesa Acc. 0712 345") == [
+        row("Pay Bill Online to", numbers="888880", account="37211", names="KPLC PREPAID"),
+        row("Pay Bill to", numbers="290290", account="0712 345", names="SportPesa"),
+    ]
+
+
+def test_till_payment():
+    assert parsed("Merchant Payment to 5551234 - NAIVAS SUPERMARKET Westlands") == [
+        row("Merchant Payment to", numbers="5551234", names="NAIVAS SUPERMARKET Westlands"),
+    ]
+
+
+def test_no_counterparty():
+    assert parsed("Customer Transfer of Funds Charge", "Airtime Purchase") == [
+        row("Customer Transfer of Funds Charge"),
+        row("Airtime Purchase"),
+    ]
+
+
+def test_wrapped_and_missing_details():
+    # a Details cell wrapped over two lines of the PDF, and a row without Details
+    assert parsed("Funds received from 2547******077 - MARY\nWANJIRU", None) == [
+        row("Funds received from", phone="2547******077", names="MARY WANJIRU"),
+        row(None),
+    ]
+
+
+def test_columns_and_index():
+    details = pd.Series(["Airtime Purchase", "Airtime Purchase"], index=[7, 2], dtype=pd.StringDtype("pyarrow"))
+    frame = parse_details(details)
+
+    assert frame.columns.tolist() == PARSED_COLUMNS
+    assert frame.index.tolist() == [7, 2]
+    assert isinstance(frame["phrase"].dtype, pd.CategoricalDtype)
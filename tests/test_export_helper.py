@@ -0,0 +1,33 @@
+import io
+import pandas as pd
+import pyarrow as pa
+from app.routers.helpers.export_helper import MONEY_UNIT_METADATA, export_chunks
+
+
+def statement() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Receipt No.": ["S1", "S2"],
+        "Completion Time": pd.to_datetime(["2024-05-01 08:30:00", "2024-05-02 19:05:00"]),
+        "Paid In": [123456, 0],
+        "Withdrawn": [0, 5],
+        "Balance": [123456, 123451],
+        "amount": [123456, 5],
+    })
+
+
+def test_csv_amounts_are_in_kes():
+    body = b"".join(export_chunks(statement(), "csv"))
+    exported = pd.read_csv(io.BytesIO(body))
+
+    assert exported.loc[0, "Paid In"] == 1234.56
+    assert exported.loc[1, "Withdrawn"] == 0.05
+    assert exported["amount"].tolist() == [1234.56, 0.05]
+    assert exported.loc[1, "Completion Time"] == "2024-05-02 19:05:00"
+
+
+def test_arrow_amounts_stay_in_cents():
+    body = b"".join(export_chunks(statement(), "arrow"))
+    table = pa.ipc.open_stream(body).read_all()
+
+    assert table.column("Paid In").to_pylist() == [123456, 0]
+    assert MONEY_UNIT_METADATA.items() <= table.schema.metadata.items()
@@ -0,0 +1,49 @@
+import threading
+from fastapi.testclient import TestClient
+from app.main import app
+from app.routers.helpers import extraction_helper
+
+
+def ready_event() -> threading.Event:
+    event = threading.Event()
+    event.set()
+    return event
+
+
+def test_readiness_is_per_engine(monkeypatch):
+    monkeypatch.setattr(extraction_helper, "engine_ready", ready_event())
+    monkeypatch.setattr(extraction_helper, "DEFAULT_ENGINE", "native")
+    monkeypatch.setattr(extraction_helper, "tabula_available", False)
+
+    assert extraction_helper.is_ready()
+    assert extraction_helper.is_ready("native")
+    assert not extraction_helper.is_ready("tabula")
+
+    monkeypatch.setattr(extraction_helper, "engine_ready", threading.Event())
+    assert not extraction_helper.is_ready("native")
+
+
+def test_skipped_tabula_warm_up_is_available(monkeypatch):
+    monkeypatch.setattr(extraction_helper, "engine_ready", threading.Event())
+    monkeypatch.setattr(extraction_helper, "DEFAULT_ENGINE", "tabula")
+    monkeypatch.setattr(extraction_helper, "TABULA_WARMUP", False)
+    monkeypatch.setattr(extraction_helper, "EXTRACTION_PROCESSES", 1)
+    monkeypatch.setattr(extraction_helper, "tabula_available", False)
+
+    extraction_helper.warm_up_engines()
+
+    assert extraction_helper.tabula_available
+    assert extraction_helper.is_ready()
+
+
+def test_upload_with_an_unavailable_engine_is_refused(monkeypatch):
+    monkeypatch.setattr(extraction_helper, "engine_ready", ready_event())
+    monkeypatch.setattr(extraction_helper, "tabula_available", False)
+
+    response = TestClient(app).post(
+        "/file/uploadfileandclean",
+        files={"file": ("statement.pdf", b"%PDF-1.4", "application/pdf")},
+        data={"password": "1234", "engine": "tabula"},
+    )
+    assert response.status_code == 503
+    assert "tabula" in response.json()["detail"]
@@ -0,0 +1,52 @@
+from app.routers.helpers.get_name_helper import HEADER_PAGES, extract_statement_header
+
+HEADER = """M-PESA STATEMENT
+Customer Name: JOHN DOE
+Mobile Number: 254712345678
+Email Address: john@example.com
+Statement Period: 01 May 2024 - 01 Nov 2024
+Request Date: 01 Nov 2024
+SUMMARY
+TRANSACTION TYPE PAID IN PAID OUT
+Send Money: 0.00 1,250.00
+Pay Bill: 0.00 300.50
+DETAILED STATEMENT
+"""
+
+
+class Document:
+    """The pages of a statement, recording which ones are read"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.read = []
+
+    @property
+    def page_count(self):
+        return len(self.pages)
+
+    def page_text(self, number):
+        self.read.append(number)
+        return self.pages[number]
+
+
+def test_header_from_the_first_page():
+    document = Document([HEADER, "Receipt No. Completion Time", "Receipt No. Completion Time"])
+    header = extract_statement_header(document)
+
+    assert document.read == [0]
+    assert header["customer_name"] == "JOHN DOE"
+    assert header["mobile_number"] == "254712345678"
+    assert header["email"] == "john@example.com"
+    assert header["summary"] == [
+        {"transaction_type": "Send Money", "paid_in": 0.0, "paid_out": 1250.0},
+        {"transaction_type": "Pay Bill", "paid_in": 0.0, "paid_out": 300.5},
+    ]
+
+
+def test_missing_header_stops_after_the_header_pages():
+    document = Document(["Receipt No. Completion Time"] * 50)
+    header = extract_statement_header(document)
+
+    assert document.read == list(range(HEADER_PAGES))
+    assert header["customer_name"] is None and header["mobile_number"] is None
@@ -0,0 +1,44 @@
+import asyncio
+from app.routers.helpers.scheduler_helper import LARGE_JOB_AGING, Job, UploadScheduler
+
+
+def test_large_job_is_not_starved_by_small_ones():
+    started = []
+
+    async def scenario():
+        scheduler = UploadScheduler(max_concurrent=1, max_queued=50)
+        release = asyncio.Event()
+
+        async def run(job):
+            started.append(job.task_id)
+            if job.task_id == "blocker":
+                await release.wait()
+
+        scheduler.submit(Job("blocker", "small", run))
+        scheduler.submit(Job("large", "large", run))
+        for number in range(3 * LARGE_JOB_AGING):
+            scheduler.submit(Job(f"small-{number}", "small", run))
+
+        # the reported position is where the large job actually starts
+        assert scheduler.position("large") == LARGE_JOB_AGING + 1
+        expected = [job.task_id for job in scheduler.order()]
+
+        release.set()
+        while scheduler.queue or scheduler.running:
+            await asyncio.sleep(0)
+        return expected
+
+    expected = asyncio.run(scenario())
+    assert started == ["blocker"] + expected
+    assert started.index("large") == LARGE_JOB_AGING + 1
+
+
+def test_small_jobs_go_first_until_a_large_one_has_waited():
+    scheduler = UploadScheduler(max_concurrent=0, max_queued=50)
+    for task_id, lane in [("small-1", "small"), ("large-1", "large"), ("small-2", "small"), ("large-2", "large")]:
+        scheduler.submit(Job(task_id, lane, None))
+
+    assert scheduler.positions() == {"small-1": 1, "small-2": 2, "large-1": 3, "large-2": 4}
+
+    scheduler.cancel("small-1")
+    assert scheduler.positions() == {"small-2": 1, "large-1": 2, "large-2": 3}
@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from app.routers.helpers.serializer_helper import NEXT_CURSOR_HEADER, check_listing, frame_page
+
+
+def statement(rows: int = 25) -> pd.DataFrame:
+    return pd.DataFrame({"Receipt No.": [f"S{number:03d}" for number in range(rows)], "Paid In": range(rows)})
+
+
+def pages(frame: pd.DataFrame, limit: int) -> list[pd.DataFrame]:
+    """Every page of a frame, each requested with the cursor the previous one returned"""
+    result, cursor = [], None
+    while True:
+        rows, headers = frame_page(frame, limit, cursor)
+        result.append(rows)
+        if NEXT_CURSOR_HEADER not in headers:
+            return result
+        cursor = int(headers[NEXT_CURSOR_HEADER])
+
+
+def test_without_limit_returns_every_row():
+    frame = statement()
+    rows, headers = frame_page(frame)
+    assert rows.equals(frame)
+    assert headers == {}
+
+
+def test_pages_cover_the_frame_once():
+    frame = statement()
+    result = pages(frame, 10)
+
+    assert [len(page) for page in result] == [10, 10, 5]
+    assert pd.concat(result).equals(frame)
+
+
+def test_cursor_is_the_last_index_of_the_page():
+    rows, headers = frame_page(statement(), 10, 4)
+    assert rows.index.tolist() == list(range(5, 15))
+    assert headers == {NEXT_CURSOR_HEADER: "14"}
+
+
+def test_last_full_page_has_no_next_cursor():
+    rows, headers = frame_page(statement(20), 10, 9)
+    assert len(rows) == 10
+    assert headers == {}
+
+
+def test_filtered_frame_keeps_statement_positions():
+    # listings page a filtered statement, a cursor is a position in the statement, not in the listing
+    frame = statement(30)
+    listing = frame[frame["Paid In"] % 3 == 0]
+
+    rows, headers = frame_page(listing, 4)
+    assert rows.index.tolist() == [0, 3, 6, 9]
+    assert headers == {NEXT_CURSOR_HEADER: "9"}
+
+    rows, _ = frame_page(listing, 4, 10)
+    assert rows.index.tolist() == [12, 15, 18, 21]
+    assert pd.concat(pages(listing, 4)).equals(listing)
+
+
+def test_unsorted_frame_is_paged_in_index_order():
+    frame = statement(12).sample(frac=1, random_state=1)
+    assert pd.concat(pages(frame, 5)).equals(frame.sort_index())
+
+
+def test_cursor_past_the_end():
+    rows, headers = frame_page(statement(), 10, 99)
+    assert rows.empty
+    assert headers == {}
+
+
+def test_check_listing_rejects_bad_requests():
+    check_listing("columns", 1)
+    for format, limit in [("xml", None), ("records", 0)]:
+        with pytest.raises(HTTPException) as error:
+            check_listing(format, limit)
+        assert error.value.status_code == 400
@@ -0,0 +1,54 @@
+import pandas as pd
+from app.routers.helpers import task_store_helper
+from app.routers.helpers.task_store_helper import TaskStore
+
+
+def statement(rows: int = 3) -> pd.DataFrame:
+    return pd.DataFrame({"Receipt No.": [f"S{number}" for number in range(rows)], "Paid In": range(rows)})
+
+
+def store(tmp_path, cache_bytes: int = 1 << 30) -> TaskStore:
+    return TaskStore(str(tmp_path / "tasks.sqlite3"), ttl_seconds=3600, max_result_bytes=1 << 30, cache_bytes=cache_bytes)
+
+
+def test_result_is_decoded_once(tmp_path, monkeypatch):
+    tasks = store(tmp_path)
+    tasks.create("task", "processing", "Waiting in queue")
+    tasks.complete("task", {"customer_name": "JOHN DOE"}, statement(), "done")
+
+    decodes = []
+    decode = task_store_helper.ipc_to_dataframe
+    monkeypatch.setattr(task_store_helper, "ipc_to_dataframe", lambda data: decodes.append(1) or decode(data))
+
+    for _ in range(3):
+        header, mpesa_df = tasks.result("task")
+        assert header == {"customer_name": "JOHN DOE"}
+        assert mpesa_df["Paid In"].tolist() == [0, 1, 2]
+    assert len(decodes) == 1
+
+    # a result written again is decoded again
+    tasks.complete("task", {"customer_name": "JOHN DOE"}, statement(5), "done")
+    assert len(tasks.result("task")[1]) == 5
+    assert len(decodes) == 2
+
+
+def test_views_do_not_change_the_cached_result(tmp_path):
+    tasks = store(tmp_path)
+    tasks.create("task", "processing", "Waiting in queue")
+    tasks.complete("task", {}, statement(), "done")
+
+    _, mpesa_df = tasks.result("task")
+    mpesa_df["Paid In"] = 0
+    assert tasks.result("task")[1]["Paid In"].tolist() == [0, 1, 2]
+
+
+def test_deleted_and_oversized_results(tmp_path):
+    tasks = store(tmp_path, cache_bytes=1)
+    tasks.create("task", "processing", "Waiting in queue")
+    tasks.complete("task", {}, statement(), "done")
+
+    assert tasks.result("task") is not None
+    assert tasks.stats()["decoded_results"] == 0
+
+    tasks.delete("task")
+    assert tasks.result("task") is None